@@ -5,20 +5,29 @@ from flask import Flask, render_template, request, redirect, url_for, flash, jso
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
-import mysql.connector
 from dotenv import load_dotenv
 import uuid
 import logging
 
 # Import model handlers
 from models.chat_model import process_text_query, get_welcome_message, db, ChatSession, ChatMessage, PlantImage, SoilReport
-from models.speech_handler import speech_to_text, text_to_speech
+from models.speech_handler import speech_to_text, text_to_speech, text_to_speech_chunks, stt_stats
+from models.audio_prompts import prompt_text, prompt_audio, tts_language_code
 from models.image_diagnosis import analyze_plant_image
 from models.soil_report import process_soil_report, predict_crop, generate_fertilizer_recommendations, get_crop_varieties, convert_file_to_image
+from models.mandi_dashboard import build_dashboard_data
 from models.fetch_weather import get_location_name, get_weather_condition, get_weather_icon, get_current_humidity, get_current_precipitation, get_hourly_weather_codes, format_time, generate_farming_advice
 from models.auction_models import CropForSale, Commodity, District, Bid
 from models.user import User as UserModel  # SQLAlchemy User model
-from models.database import db
+from models.database import db, migrate_schema
+from models.job_queue import JobContext, enqueue_job, get_job, register_job_handler, JOB_QUEUE_MODE
+from models.cooperative import is_cooperative, run_blocking
+from models.http_client import http_client
+from models.tts_cache import tts_cache
+from models.audio_decode import decode_stats, AudioDecodeError
+from models.vad import vad_stats
+from models.local_stt import get_local_stt
+from models.voice_stream import StreamingRecognizer
 
 # Load environment variables
 load_dotenv()
@@ -36,6 +45,25 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Synchronous voice requests return the text answer without waiting for its speech, which is
+# synthesized as a 'speech' job the client polls (needs a JOB_QUEUE_MODE other than off)
+TTS_IN_BACKGROUND = os.getenv('TTS_IN_BACKGROUND', 'true').lower() == 'true'
+# How often (seconds) a streaming voice connection checks for newly recognized segments
+VOICE_STREAM_POLL_SECONDS = float(os.getenv('VOICE_STREAM_POLL_SECONDS', '0.25'))
+
+# Streaming voice input over /ws/voice: 'auto' serves it only under gevent workers, as each
+# connection holds its worker while the farmer speaks; 'true' serves it anyway, 'false' never
+VOICE_STREAMING = os.getenv('VOICE_STREAMING', 'auto').lower()
+
+# flask-sock is optional; without it /ws/voice is not served and chat.js uploads whole recordings
+try:
+    from flask_sock import Sock
+    sock = Sock(app)
+    VOICE_STREAMING_AVAILABLE = VOICE_STREAMING == 'true' or (VOICE_STREAMING == 'auto' and is_cooperative())
+except ImportError:
+    sock = None
+    VOICE_STREAMING_AVAILABLE = False
+
 # Create upload folders if they don't exist
 os.makedirs(os.path.join(UPLOAD_FOLDER, 'crops'), exist_ok=True)
 
@@ -43,8 +71,8 @@ def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-# MySQL Database Configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://{}:{}@{}:{}/{}'.format(
+# MySQL Database Configuration (DATABASE_URL overrides it, e.g. sqlite:///loadtest.db for the load benchmark)
+app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL') or 'mysql+pymysql://{}:{}@{}:{}/{}'.format(
     os.getenv('DB_USER'),
     os.getenv('DB_PASSWORD'),
     os.getenv('DB_HOST'),
@@ -52,6 +80,11 @@ app.config['SQLALCHEMY_DATABASE_URI'] = 'mysql+pymysql://{}:{}@{}:{}/{}'.format(
     os.getenv('DB_NAME')
 )
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Connections per worker process; gevent workers serve many requests each, so raise these with it
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+    'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+    'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10'))
+}
 
 # Ensure upload directories exist
 os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'voice'), exist_ok=True)
@@ -60,17 +93,27 @@ os.makedirs(os.path.join(app.config['UPLOAD_FOLDER'], 'soil_reports'), exist_ok=
 
 # Setup MySQL connection
 def get_db_connection():
+    import mysql.connector
     return mysql.connector.connect(
         host=os.getenv('DB_HOST'),  # 'db' is the service name!
         user=os.getenv('DB_USER'),
         password=os.getenv('DB_PASSWORD'),
         database=os.getenv('DB_NAME'),
-        port=os.getenv('PORT')
+        port=os.getenv('PORT'),
+        # The C extension blocks the whole gevent worker; the pure-Python driver yields on I/O
+        use_pure=is_cooperative()
     )
 
 # Initialize
 db.init_app(app)
 
+# Add columns that existing databases created before them are missing
+with app.app_context():
+    try:
+        migrate_schema()
+    except Exception as e:
+        print(f"Schema migration failed: {e}")
+
 # Login manager setup
 login_manager = LoginManager()
 login_manager.init_app(app)
@@ -266,7 +309,8 @@ def chat():
                             chat_history=chat_history,
                             current_chat_id=chat_id,
                             messages=messages,
-                            language=language)
+                            language=language,
+                            voice_streaming=VOICE_STREAMING_AVAILABLE)
     except Exception as e:
         import traceback
         print(f"Error in chat route: {str(e)}")
@@ -352,7 +396,7 @@ def process_text():
             db.session.flush()  # Flush without committing
             
             # Process the message and get response
-            response = process_text_query(message, language)
+            response = process_text_query(message, language, chat_id)
             
             # Get system user id for bot messages
             system_user_id = get_or_create_system_user()
@@ -389,6 +433,82 @@ def process_text():
             'response': error_message
         }), 500
 
+def preferred_audio_format():
+    """
+    Format for spoken answers: 'ogg' (Opus, a fraction of the size) when the
+    client says it can play it, through an audio_format=ogg field or audio/ogg
+    or audio/opus in its Accept header; otherwise 'mp3'
+    """
+    flag = request.values.get('audio_format', '').lower()
+    if flag in ('ogg', 'mp3'):
+        return flag
+    for mimetype, quality in request.accept_mimetypes:
+        if quality > 0 and mimetype.split(';')[0].strip() in ('audio/ogg', 'audio/opus'):
+            return 'ogg'
+    return 'mp3'
+
+def wants_async_job():
+    """Whether the client asked for a job ID instead of waiting for the result"""
+    return JOB_QUEUE_MODE != 'off' and request.form.get('async', 'false').lower() == 'true'
+
+def enqueue_job_response(kind, payload, user_id, chat_id):
+    """Queue a job and return the 202 response the client polls from"""
+    job_id = enqueue_job(kind, payload, user_id=user_id, chat_id=chat_id)
+    return jsonify({
+        'job_id': job_id,
+        'status': 'queued',
+        'status_url': url_for('job_status', job_id=job_id),
+        'chat_id': chat_id
+    }), 202
+
+@app.route('/api/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """Poll a voice, image, speech or soil report job for its stage results and final response"""
+    job = get_job(job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict())
+
+def metrics_authorized():
+    """Metrics endpoints require 'Authorization: Bearer <METRICS_TOKEN>' when METRICS_TOKEN is set"""
+    metrics_token = os.getenv('METRICS_TOKEN')
+    return not metrics_token or request.headers.get('Authorization') == f'Bearer {metrics_token}'
+
+@app.route('/metrics/http')
+def http_metrics():
+    """Outbound HTTP metrics for this worker process (JSON, or Prometheus text with ?format=prometheus)"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if request.args.get('format') == 'prometheus':
+        return http_client.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+    return jsonify(http_client.metrics())
+
+@app.route('/metrics/tts')
+def tts_metrics():
+    """TTS cache hits, misses, evictions and size for this worker process (JSON or ?format=prometheus)"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if request.args.get('format') == 'prometheus':
+        return tts_cache.render_prometheus(), 200, {'Content-Type': 'text/plain; version=0.0.4'}
+    return jsonify(tts_cache.metrics())
+
+@app.route('/metrics/audio')
+def audio_metrics():
+    """Voice decodes per format, silence trimmed, STT upload bytes and latency (JSON or ?format=prometheus)"""
+    if not metrics_authorized():
+        return jsonify({'error': 'Unauthorized'}), 401
+    if request.args.get('format') == 'prometheus':
+        metrics = decode_stats.render_prometheus() + vad_stats.render_prometheus() + stt_stats.render_prometheus()
+        return metrics, 200, {'Content-Type': 'text/plain; version=0.0.4'}
+    return jsonify({
+        'pid': os.getpid(),
+        'formats': decode_stats.to_dict(),
+        'vad': vad_stats.to_dict(),
+        'stt': stt_stats.to_dict(),
+        'local_stt': get_local_stt().metrics()
+    })
+
 @app.route('/api/process_voice', methods=['POST'])
 @login_required
 def process_voice():
@@ -402,27 +522,11 @@ def process_voice():
     # Get user_id if authenticated
     user_id = current_user.id if current_user.is_authenticated else None
     
-    # Get system user id for bot messages
-    system_user_id = get_or_create_system_user()
-    
-    # Validate chat_id to avoid foreign key constraint errors
-    if not chat_id or chat_id == 'null' or chat_id == 'undefined':
-        # Create a new chat session if none is specified
-        try:
-            new_chat = ChatSession(language=language, user_id=user_id)
-            db.session.add(new_chat)
-            db.session.commit()
-            chat_id = new_chat.id
-            print(f"Created new chat session with ID: {chat_id}")
-        except Exception as e:
-            print(f"Error creating chat session: {e}")
-            return jsonify({'error': 'Failed to create chat session'}), 500
-    else:
-        # Verify the chat session exists
-        chat_session = db.session.get(ChatSession, chat_id)
-        if not chat_session:
-            return jsonify({'error': f'Chat session {chat_id} not found'}), 404
+    chat_id, error = voice_chat_id(chat_id, language, user_id)
+    if error:
+        return jsonify(error[0]), error[1]
     
+    payload = {'language': language, 'chat_id': chat_id, 'user_id': user_id, 'audio_format': preferred_audio_format()}
     try:
         # Create directory if it doesn't exist
         voice_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'voice')
@@ -465,9 +569,180 @@ def process_voice():
         print(f"File size: {os.path.getsize(audio_path)} bytes")
         print(f"Content type: {content_type}")
         
-        # Process audio to text using our local model
-        transcribed_text = speech_to_text(audio_path, language)
+        payload['audio_path'] = audio_path
+        if wants_async_job():
+            return enqueue_job_response('voice', payload, user_id, chat_id)
+        
+        body, status_code = run_voice_job(payload, JobContext())
+        return jsonify(body), status_code
+    
+    except Exception as e:
+        import traceback
+        print(f"Error in process_voice: {str(e)}")
+        print(traceback.format_exc())
+        db.session.rollback()  # Rollback any pending database changes
+        
+        body, status_code = voice_job_failed(payload, e)
+        return jsonify(body), status_code
+
+def voice_chat_id(chat_id, language, user_id):
+    """
+    Chat session a voice message belongs to, created if the client has none yet
+    
+    Returns:
+        tuple: (chat_id, None), or (None, (error body, status code))
+    """
+    # Validate chat_id to avoid foreign key constraint errors
+    if not chat_id or chat_id == 'null' or chat_id == 'undefined':
+        # Create a new chat session if none is specified
+        try:
+            new_chat = ChatSession(language=language, user_id=user_id)
+            db.session.add(new_chat)
+            db.session.commit()
+            print(f"Created new chat session with ID: {new_chat.id}")
+            return new_chat.id, None
+        except Exception as e:
+            print(f"Error creating chat session: {e}")
+            return None, ({'error': 'Failed to create chat session'}, 500)
+    
+    # Verify the chat session exists
+    chat_session = db.session.get(ChatSession, chat_id)
+    if not chat_session:
+        return None, ({'error': f'Chat session {chat_id} not found'}, 404)
+    return chat_id, None
+
+def voice_stream(ws):
+    """
+    Voice message streamed over a WebSocket while it is being recorded.
+    
+    Query parameters are those of /api/process_voice (language, chat_id,
+    audio_format). Binary messages are consecutive pieces of the recording
+    (Ogg Opus pages or WebM chunks) and the text message {"type": "stop"}
+    ends it. Segments are recognized as pauses are detected, so the server
+    sends {"type": "partial", "text"} while the farmer is still talking and
+    {"type": "transcript", "text"} right after stop, and finally
+    {"type": "result", "status", "body"}. The answer is queued as a 'voice'
+    job that starts from the transcript, so the result is the 202 body an
+    async upload gets, with the status_url to poll; errors, and answers
+    when JOB_QUEUE_MODE is off, come with the body /api/process_voice
+    would have returned.
+    
+    Each connection holds its worker for the whole recording, so it is only
+    served under gevent workers unless VOICE_STREAMING=true.
+    """
+    from simple_websocket import ConnectionClosed
+    
+    def send(message_type, **values):
+        ws.send(json.dumps({'type': message_type, **values}, ensure_ascii=False))
+    
+    if not current_user.is_authenticated:
+        send('result', status=401, body={'error': 'Login required'})
+        return
+    
+    language = request.args.get('language', 'hindi')
+    user_id = current_user.id
+    chat_id, error = voice_chat_id(request.args.get('chat_id'), language, user_id)
+    if error:
+        send('result', status=error[1], body=error[0])
+        return
+    
+    payload = {'language': language, 'chat_id': chat_id, 'user_id': user_id, 'audio_format': preferred_audio_format()}
+    recognizer = StreamingRecognizer(language)
+    try:
+        partial_text = ''
+        while True:
+            message = ws.receive(timeout=VOICE_STREAM_POLL_SECONDS)
+            if isinstance(message, str):
+                if json.loads(message).get('type') == 'stop':
+                    break
+            elif message:
+                recognizer.feed(message)
+            text = recognizer.partial_text()
+            if text != partial_text:
+                partial_text = text
+                send('partial', text=text)
+        
+        transcribed_text = recognizer.finish()
         print(f"Transcription result: {transcribed_text}")
+        send('transcript', text=transcribed_text)
+        
+        # Keep the recording, as uploaded voice messages are kept
+        voice_dir = os.path.join(app.config['UPLOAD_FOLDER'], 'voice')
+        os.makedirs(voice_dir, exist_ok=True)
+        audio_path = os.path.join(voice_dir, f"{uuid.uuid4()}.{'webm' if recognizer.audio_format == 'webm' else 'ogg'}")
+        with open(audio_path, 'wb') as f:
+            f.write(recognizer.recording)
+        print(f"Streamed audio saved at: {audio_path} ({len(recognizer.recording)} bytes)")
+        
+        payload['audio_path'] = audio_path
+        if JOB_QUEUE_MODE != 'off':
+            # Answer in the job queue like uploads, rather than holding the connection for the LLM and TTS
+            job_id = enqueue_job('voice', payload, user_id=user_id, chat_id=chat_id,
+                                 partial={'transcribed_text': transcribed_text})
+            body, status_code = {
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('job_status', job_id=job_id),
+                'chat_id': chat_id
+            }, 202
+        else:
+            body, status_code = run_voice_job(payload, JobContext(partial={'transcribed_text': transcribed_text}))
+    except ConnectionClosed:
+        print("Voice stream closed by the client before it stopped")
+        return
+    except AudioDecodeError as e:
+        print(f"Voice stream rejected: {e}")
+        body, status_code = voice_job_failed(payload, e)
+    except Exception as e:
+        import traceback
+        print(f"Error in voice_stream: {str(e)}")
+        print(traceback.format_exc())
+        db.session.rollback()  # Rollback any pending database changes
+        body, status_code = voice_job_failed(payload, e)
+    finally:
+        recognizer.close()
+    
+    try:
+        send('result', status=status_code, body=body)
+    except ConnectionClosed:
+        # The answer is saved (or still being made by the job); the client sees it when it reloads the chat
+        print("Voice stream closed by the client before the result was sent")
+
+if VOICE_STREAMING_AVAILABLE:
+    sock.route('/ws/voice')(voice_stream)
+
+def run_voice_job(payload, job):
+    """
+    Transcribe a saved voice message, answer it and synthesize the spoken reply.
+    
+    Stages reported to polling clients: 'transcribed' (transcribed_text),
+    'answered' (response, once both messages are saved), 'audio_<n>'
+    (audio_playlist with the first n spoken chunks) and the final body with
+    audio_playlist. A retried job resumes after the last completed stage.
+    
+    Run synchronously (not as a job), it returns as soon as the answer is
+    saved, with audio_pending and the audio_status_url of a 'speech' job
+    that synthesizes it, unless TTS_IN_BACKGROUND is off.
+    """
+    audio_path = payload['audio_path']
+    language = payload['language']
+    chat_id = payload['chat_id']
+    user_id = payload['user_id']
+    
+    # Get system user id for bot messages
+    system_user_id = get_or_create_system_user()
+    
+    if 'response' in job.partial:
+        # Messages were saved by an earlier attempt; only the speech is left
+        transcribed_text = job.partial['transcribed_text']
+        response = job.partial['response']
+    else:
+        if 'transcribed_text' in job.partial:
+            transcribed_text = job.partial['transcribed_text']
+        else:
+            # Process audio to text using our local model
+            transcribed_text = speech_to_text(audio_path, language)
+            print(f"Transcription result: {transcribed_text}")
         
         # Check for specific error indicators
         error_indicators = [
@@ -494,7 +769,7 @@ def process_voice():
             db.session.add(user_message)
             
             # Add a helpful bot response
-            help_text = "I couldn't understand your audio. Please try typing your message or speaking more clearly." if language == 'english' else "मुझे आपकी आवाज़ समझ नहीं आई। कृपया अपना संदेश टाइप करें या स्पष्ट रूप से बोलें।"
+            help_text = prompt_text('voice_help', language)
             bot_message = ChatMessage(
                 chat_id=chat_id,
                 user_id=system_user_id,  # Use system user instead of None
@@ -505,12 +780,19 @@ def process_voice():
             db.session.commit()
             
             # Return the response to show in UI, but with a warning
-            return jsonify({
+            body = {
                 'transcribed_text': transcribed_text,
                 'response': help_text,
                 'chat_id': chat_id,
                 'warning': 'Audio could not be transcribed properly'
-            })
+            }
+            # Spoken version, if the prompts have been generated
+            help_audio = prompt_audio(help_text, tts_language_code(language))
+            if help_audio:
+                body['audio_url'] = url_for('static', filename=help_audio.replace('static/', '', 1))
+            return body, 200
+        
+        job.report('transcribed', transcribed_text=transcribed_text)
         
         # Save user message with transcribed text
         user_message = ChatMessage(
@@ -523,7 +805,7 @@ def process_voice():
         db.session.add(user_message)
         
         # Get response from text processing
-        response = process_text_query(transcribed_text, language)
+        response = process_text_query(transcribed_text, language, chat_id)
         print(response)
         # Save bot response
         bot_message = ChatMessage(
@@ -535,65 +817,100 @@ def process_voice():
         db.session.add(bot_message)
         db.session.commit()
         
-        # Generate TTS - now using local TTS model
-        audio_response_path = text_to_speech(response, language)
-        print(audio_response_path)
-        # Check if the file exists and is a valid audio file
-        audio_valid = False
-        if os.path.exists(audio_response_path):
-            if audio_response_path.lower().endswith(('.mp3', '.wav')):
-                # Basic validation - check file size
-                if os.path.getsize(audio_response_path) > 1000:  # More than 1KB
-                    audio_valid = True
-        
-        # Get the audio URL for the client
-        if audio_valid:
-            # Make sure to normalize path for URLs
-            audio_response_path = audio_response_path.replace('\\', '/')
-            if audio_response_path.startswith('static/'):
-                audio_url = url_for('static', filename=audio_response_path.replace('static/', ''))
-            else:
-                # Handle non-static paths
-                audio_url = audio_response_path
-
-            # print that we are returning the the response
-            print("Returning the response", {
-                'transcribed_text': transcribed_text,
-                'response': response,
-                'audio_url': audio_url,
-                'chat_id': chat_id
-            })
-                
-            return jsonify({
-                'transcribed_text': transcribed_text,
-                'response': response,
-                'audio_url': audio_url,
-                'chat_id': chat_id
-            })
-        else:
-            # No valid audio, just return the text response
-
+        job.report('answered', response=response, chat_id=chat_id)
+    
+    if job.job_id is None and TTS_IN_BACKGROUND and JOB_QUEUE_MODE != 'off':
+        # Answer now and let the client poll for the speech instead of waiting for it
+        speech_job_id = enqueue_job('speech', {
+            'text': response,
+            'language': language,
+            'audio_format': payload.get('audio_format', 'mp3')
+        }, user_id=user_id, chat_id=chat_id)
+        return {
+            'transcribed_text': transcribed_text,
+            'response': response,
+            'chat_id': chat_id,
+            'audio_pending': True,
+            'audio_status_url': url_for('job_status', job_id=speech_job_id)
+        }, 200
+    
+    playlist = speak_answer(response, language, payload.get('audio_format', 'mp3'), job)
+    
+    if playlist:
+        # print that we are returning the the response
+        print("Returning the response", {
+            'transcribed_text': transcribed_text,
+            'response': response,
+            'audio_playlist': playlist,
+            'chat_id': chat_id
+        })
+            
+        return {
+            'transcribed_text': transcribed_text,
+            'response': response,
+            'audio_url': playlist[0],  # first chunk, for clients that play a single file
+            'audio_playlist': playlist,
+            'chat_id': chat_id
+        }, 200
+    else:
+        # No valid audio, just return the text response
+        return {
+            'transcribed_text': transcribed_text,
+            'response': response,
+            'chat_id': chat_id,
+            'warning': 'Text-to-speech output is not available'
+        }, 200
+
+def speak_answer(text, language, audio_format, job):
+    """
+    Speak an answer sentence by sentence. Each chunk is reported as stage
+    'audio_<n>' as soon as it and the ones before it are ready, so polling
+    clients start playing the first one while the rest are still being
+    synthesized.
+    
+    Returns:
+        list: URLs of the spoken chunks in playback order
+    """
+    playlist = []
+    def chunk_ready(index, audio_path, total):
+        audio_url = audio_file_url(audio_path)
+        if audio_url:
+            playlist.append(audio_url)
+            job.report(f'audio_{len(playlist)}', audio_playlist=list(playlist), audio_chunks=total)
+    text_to_speech_chunks(text, language, on_chunk=chunk_ready, audio_format=audio_format)
+    return playlist
+
+def run_speech_job(payload, job):
+    """Synthesize the spoken version of an answer that was already returned as text"""
+    playlist = speak_answer(payload['text'], payload['language'], payload.get('audio_format', 'mp3'), job)
+    if not playlist:
+        return {'warning': 'Text-to-speech output is not available'}, 200
+    return {'audio_url': playlist[0], 'audio_playlist': playlist}, 200
+
+def audio_file_url(audio_path):
+    """URL for a generated audio file, or None if it is missing or not a valid audio file"""
+    # Basic validation - check the extension and that it is not truncated (Opus of a short sentence is a few hundred bytes)
+    if not os.path.exists(audio_path) or not audio_path.lower().endswith(('.mp3', '.wav', '.ogg')):
+        return None
+    if os.path.getsize(audio_path) <= (200 if audio_path.lower().endswith('.ogg') else 1000):
+        return None
+    
+    # Make sure to normalize path for URLs
+    audio_path = audio_path.replace('\\', '/')
+    if audio_path.startswith('static/'):
+        return url_for('static', filename=audio_path.replace('static/', '', 1))
+    # Handle non-static paths
+    return audio_path
 
-            return jsonify({
-                'transcribed_text': transcribed_text,
-                'response': response,
-                'chat_id': chat_id,
-                'warning': 'Text-to-speech output is not available'
-            })
+def voice_job_failed(payload, error):
+    """Response body for a voice message that could not be processed"""
+    # Provide a user-friendly error message based on language
+    error_msg = "Error processing voice: Please try again or type your message." if payload.get('language') == 'english' else "आवाज़ प्रोसेसिंग में त्रुटि: कृपया पुनः प्रयास करें या अपना संदेश टाइप करें।"
     
-    except Exception as e:
-        import traceback
-        print(f"Error in process_voice: {str(e)}")
-        print(traceback.format_exc())
-        db.session.rollback()  # Rollback any pending database changes
-        
-        # Provide a user-friendly error message based on language
-        error_msg = "Error processing voice: Please try again or type your message." if language == 'english' else "आवाज़ प्रोसेसिंग में त्रुटि: कृपया पुनः प्रयास करें या अपना संदेश टाइप करें।"
-        
-        return jsonify({
-            'error': error_msg,
-            'detail': str(e)
-        }), 500
+    return {
+        'error': error_msg,
+        'detail': str(error)
+    }, 500
 
 @app.route('/api/process_image', methods=['POST'])
 @login_required
@@ -608,9 +925,6 @@ def process_image():
     # Get user_id if authenticated
     user_id = current_user.id if current_user.is_authenticated else None
     
-    # Get system user id for bot messages
-    system_user_id = get_or_create_system_user()
-    
     # Validate chat_id to avoid foreign key constraint errors
     if not chat_id or chat_id == 'null' or chat_id == 'undefined':
         # Create a new chat session if none is specified
@@ -644,11 +958,54 @@ def process_image():
     url_path = f"uploads/images/{filename}".replace("\\", "/")
     image_url = url_for('static', filename=url_path)
 
+    payload = {
+        'image_path': image_path,
+        'image_url': image_url,
+        'language': language,
+        'chat_id': chat_id,
+        'user_id': user_id,
+        'need_audio': request.form.get('need_audio', 'false').lower() == 'true',
+        'audio_format': preferred_audio_format()
+    }
+    if wants_async_job():
+        return enqueue_job_response('image', payload, user_id, chat_id)
+
     # Analyze image
     try:
+        body, status_code = run_image_job(payload, JobContext())
+        return jsonify(body), status_code
+    
+    except Exception as e:
+        import traceback
+        print(f"Error in process_image: {str(e)}")
+        print(traceback.format_exc())
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+def run_image_job(payload, job):
+    """
+    Diagnose a saved plant image and store the result in the chat.
+    
+    Reports the 'diagnosed' stage (result) once the messages are saved, so a
+    retried job only has to redo the optional speech.
+    """
+    image_path = payload['image_path']
+    image_url = payload['image_url']
+    language = payload['language']
+    chat_id = payload['chat_id']
+    user_id = payload['user_id']
+    
+    if 'result' in job.partial:
+        # Saved by an earlier attempt
+        result = job.partial['result']
+        response_text = job.partial['response_text']
+    else:
         result = analyze_plant_image(image_path, language)
         
         print(result)
+        
+        # Get system user id for bot messages
+        system_user_id = get_or_create_system_user()
 
         # Create user message - include image URL in the message for persistence
         user_message = ChatMessage(
@@ -690,25 +1047,20 @@ def process_image():
         db.session.add(plant_image)
         db.session.commit()
         
-        # Generate TTS if needed
-        audio_url = None
-        if request.form.get('need_audio', 'false').lower() == 'true':
-            audio_path = text_to_speech(response_text, language)
-            audio_url = url_for('static', filename=audio_path.replace('static/', ''))
-        
-        return jsonify({
-            'result': result,
-            'image_url': image_url,
-            'audio_url': audio_url,
-            'chat_id': chat_id  # Return the chat_id for client tracking
-        })
+        job.report('diagnosed', result=result, response_text=response_text, image_url=image_url, chat_id=chat_id)
     
-    except Exception as e:
-        import traceback
-        print(f"Error in process_image: {str(e)}")
-        print(traceback.format_exc())
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    # Generate TTS if needed
+    audio_url = None
+    if payload.get('need_audio'):
+        audio_path = text_to_speech(response_text, language, payload.get('audio_format', 'mp3'))
+        audio_url = url_for('static', filename=audio_path.replace('static/', ''))
+    
+    return {
+        'result': result,
+        'image_url': image_url,
+        'audio_url': audio_url,
+        'chat_id': chat_id  # Return the chat_id for client tracking
+    }, 200
 
 
 @app.route('/profile', methods=['GET', 'POST'])
@@ -1006,48 +1358,87 @@ def analyze_soil_report():
     soil_file.save(file_path)
     file_path = file_path.replace("\\", "/")
     
-    # Convert file to image for processing
-    success, result = convert_file_to_image(file_path)
-    
-    if not success:
-        # If conversion failed, return the error message
-        return jsonify({'error': result}), 400
+    payload = {
+        'file_path': file_path,
+        'district': district,
+        'state': state,
+        'language': language,
+        'chat_id': chat_id,
+        'user_id': user_id
+    }
+    if wants_async_job():
+        # The job runs in another session, so the new chat session has to be saved first
+        db.session.commit()
+        return enqueue_job_response('soil_report', payload, user_id, chat_id)
     
-    # Now result contains the image as a numpy array
-    # Process soil report using OpenRouter's Gemini Pro Vision model
     try:
-        import requests
+        body, status_code = run_soil_job(payload, JobContext())
+        return jsonify(body), status_code
+    
+    except Exception as e:
+        import traceback
+        print(f"Error in analyze_soil_report: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({'error': str(e)}), 500
+
+def run_soil_job(payload, job):
+    """
+    Extract soil parameters from a saved report and build the recommendations.
+    
+    Reports the 'extracted' stage (soil_params) after the vision model call,
+    so a retried job does not call the model again.
+    """
+    file_path = payload['file_path']
+    district = payload['district']
+    state = payload['state']
+    language = payload['language']
+    chat_id = payload['chat_id']
+    user_id = payload['user_id']
+    
+    if 'soil_params' in job.partial:
+        # Extracted by an earlier attempt
+        soil_params = dict(job.partial['soil_params'])
+    else:
+        # Convert file to image for processing
+        success, result = run_blocking(convert_file_to_image, file_path)
+    
+        if not success:
+            # If conversion failed, return the error message
+            return {'error': result}, 400
+        
+        # Now result contains the image as a numpy array
+        # Process soil report using OpenRouter's Gemini Pro Vision model
         import base64
         from PIL import Image as PILImage
         import io
         import numpy as np
-        
+    
         # Get OpenRouter API key
         openrouter_api_key = os.getenv('OPENROUTER_API_KEY')
         if not openrouter_api_key:
-            return jsonify({'error': 'OpenRouter API key not configured'}), 500
-        
+            return {'error': 'OpenRouter API key not configured'}, 500
+    
         # Convert numpy array to PIL Image
         image = PILImage.fromarray(result)
-        
+    
         # Resize image if it's too large (max dimension 768px for better compatibility)
         max_size = 768
         if max(image.size) > max_size:
             ratio = max_size / max(image.size)
             new_size = (int(image.size[0] * ratio), int(image.size[1] * ratio))
             image = image.resize(new_size, PILImage.LANCZOS)
-        
+    
         # Convert image to base64
         buffered = io.BytesIO()
         image.save(buffered, format="JPEG", quality=90)
         img_str = base64.b64encode(buffered.getvalue()).decode('utf-8')
-        
+    
         # Prepare the OpenRouter API request
         headers = {
             "Authorization": f"Bearer {openrouter_api_key}",
             "Content-Type": "application/json"
         }
-        
+    
         # Prepare the prompt
         prompt = """
         You're a soil analysis expert. Extract all available soil parameters from this soil report image.
@@ -1063,7 +1454,7 @@ def analyze_soil_report():
         - Iron
         - Manganese
         - Sulphur
-        
+    
         ALSO, look for and extract location information ONLY if the words "District" and "State" are EXPLICITLY mentioned in the report:
         - District (only if labeled as "District" or "DISTRICT" in the report)
         - State (only if labeled as "State" or "STATE" in the report)
@@ -1073,7 +1464,7 @@ def analyze_soil_report():
         For district and state, use string values with quotes.
 
         IMPORTANT: If a parameter is not visible or clearly mentioned in the report, set its value to null (not 0 or any default value).
-        
+    
         Example response format:
         {
             "ph": 7.2,
@@ -1088,12 +1479,12 @@ def analyze_soil_report():
             "manganese": 2.2,
             "sulphur": 20,
         }
-        
+    
         If no district or state is explicitly mentioned, return null for those fields like:
         "district": null,
         "state": null
         """
-        
+    
         # Create the request payload
         payload = {
             "model": "qwen/qwen2.5-vl-3b-instruct:free",
@@ -1107,17 +1498,18 @@ def analyze_soil_report():
                 }
             ]
         }
-        
+    
         # Send the request to OpenRouter
-        response = requests.post(
-            "https://openrouter.ai/api/v1/chat/completions",
+        response = http_client.post(
+            'openrouter_vision',
+            http_client.url('openrouter_vision', '/api/v1/chat/completions'),
             headers=headers,
             json=payload
         )
-        
+    
         if response.status_code != 200:
             raise Exception(f"OpenRouter API error: {response.text}")
-        
+    
         # Extract the text response
         response_data = response.json()
         print(response_data)
@@ -1125,7 +1517,7 @@ def analyze_soil_report():
         print(response_text)
         # Extract the JSON part from the response
         import re
-        
+    
         json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
         if json_match:
             soil_params_json = json_match.group(1)
@@ -1135,196 +1527,193 @@ def analyze_soil_report():
                 soil_params_json = json_match.group(0)
             else:
                 soil_params_json = '{}'
-        
+    
         # Parse the JSON
         try:
             soil_params = json.loads(soil_params_json)
-            
+        
             # Ensure district and state are proper values, not literal strings "null"
             if soil_params.get('district') == "null" or soil_params.get('district') == "None":
                 soil_params['district'] = None
-                
+            
             if soil_params.get('state') == "null" or soil_params.get('state') == "None":
                 soil_params['state'] = None
-                
+            
         except json.JSONDecodeError as e:
             print(f"Error decoding JSON: {e}")
             print(f"Attempted to parse: {soil_params_json}")
             soil_params = {}
         
-        # Extract district and state from soil_params if available, otherwise use form inputs
-        extracted_district = soil_params.get('district')
-        extracted_state = soil_params.get('state')
-        
-        # Track if location information was extracted from the report
-        # Only consider a value extracted if it's not None and not the string "null"
-        district_extracted = (extracted_district is not None and 
-                            extracted_district != "null" and 
-                            str(extracted_district).lower() != "none" and
-                            str(extracted_district).strip() != "")
-        
-        state_extracted = (extracted_state is not None and 
-                          extracted_state != "null" and 
-                          str(extracted_state).lower() != "none" and
-                          str(extracted_state).strip() != "")
-        
-        # If location was provided in the form, use that; otherwise use extracted values
-        final_district = district if district and district.strip() != '' else (extracted_district if district_extracted else '')
-        final_state = state if state and state.strip() != '' else (extracted_state if state_extracted else '')
-        
-        # Check if we have both district and state information
-        missing_location = (not final_district or not final_state or 
-                           final_district.strip() == '' or final_state.strip() == '')
-        
-        # Remove district and state from soil_params to avoid confusion
-        if 'district' in soil_params:
-            del soil_params['district']
-        if 'state' in soil_params:
-            del soil_params['state']
-            
-        # If location information is missing, return what we have extracted so far 
-        # so the frontend can show a popup to collect the missing information
-        if missing_location:
-            return jsonify({
-                'soil_params': soil_params,
-                'location': {
-                    'district': final_district or '',
-                    'state': final_state or '',
-                    'district_extracted': district_extracted,
-                    'state_extracted': state_extracted
-                },
-                'missing_location': True,
-                'report_path': file_path,
-                'language': language
-            })
-        
-        # Make sure all required parameters have at least default values
-        if soil_params.get('ph') is None:
-            soil_params['ph'] = 7.0
-        if soil_params.get('ec') is None:
-            soil_params['ec'] = 0.5
-        if soil_params.get('organic_carbon') is None:
-            soil_params['organic_carbon'] = 0.5
-        if soil_params.get('nitrogen') is None:
-            soil_params['nitrogen'] = 250.0
-        if soil_params.get('phosphorus') is None:
-            soil_params['phosphorus'] = 30.0
-        if soil_params.get('potassium') is None:
-            soil_params['potassium'] = 40.0
-        if soil_params.get('zinc') is None:
-            soil_params['zinc'] = 1.0
-        if soil_params.get('copper') is None:
-            soil_params['copper'] = 0.5
-        if soil_params.get('iron') is None:
-            soil_params['iron'] = 4.0
-        if soil_params.get('manganese') is None:
-            soil_params['manganese'] = 2.0
-        if soil_params.get('sulphur') is None:
-            soil_params['sulphur'] = 20.0
-            
-        # Get crop prediction
-        predicted_crop = predict_crop(
-            distt=final_district,
-            state=final_state,
-            ph=soil_params.get('ph', 7.0),
-            ec=soil_params.get('ec', 0.5),
-            oc=soil_params.get('organic_carbon', 0.5),
-            av_p=soil_params.get('phosphorus', 30.0),
-            av_k=soil_params.get('potassium', 40.0),
-            zinc=soil_params.get('zinc', 1.0),
-            cu=soil_params.get('copper', 0.5),
-            iron=soil_params.get('iron', 4.0),
-            mn=soil_params.get('manganese', 2.0)
-        )
-        print(predicted_crop)
-        # Get crop variety information
-        crop_variety_data = get_crop_varieties(predicted_crop)
-        print(crop_variety_data)
-        # Add additional crop suggestions based on soil parameters
-        recommended_crops = [predicted_crop]
-        predicted_crop = predicted_crop.lower()
-        if predicted_crop != "wheat":
-            recommended_crops.append("Wheat")
-        if predicted_crop != "rice":
-            recommended_crops.append("Rice") 
-        if predicted_crop != "maize":
-            recommended_crops.append("Maize")
-        
-        print(recommended_crops)
-
-        # Generate fertilizer recommendations
-        fertilizer_recommendations = generate_fertilizer_recommendations(soil_params)
-        fertilizer_rec = fertilizer_recommendations.get('summary', 
-            "Based on the soil analysis, apply balanced NPK fertilizer.")
-        
-        # Store the full fertilizer report for later use
-        full_fertilizer_report = fertilizer_recommendations.get('full_report', "")
-        json_fertilizer_report = fertilizer_recommendations.get('json_report', None)
-        # Convert json_fertilizer_report to string if it's a dictionary
-        if isinstance(json_fertilizer_report, dict):
-            json_fertilizer_report = json.dumps(json_fertilizer_report)
-        
-        # Get soil type based on pH
-        soil_type = "Neutral Soil"
-        if soil_params.get('ph', 7.0) < 6.0:
-            soil_type = "Acidic Soil"
-        elif soil_params.get('ph', 7.0) > 7.5:
-            soil_type = "Alkaline Soil"
-        
-        # Create a new SoilReport record in the database
-        soil_report = SoilReport(
-            user_id=user_id,
-            chat_id=chat_id,  # Use the valid chat_id we ensured above
-            report_path=file_path,
-            district=final_district,
-            state=final_state,
-            soil_type=soil_type,
-            ph_value=soil_params.get('ph'),  # Changed from ph to ph_value
-            ec=soil_params.get('ec'),
-            organic_carbon=soil_params.get('organic_carbon'),
-            phosphorus=soil_params.get('phosphorus'),
-            potassium=soil_params.get('potassium'),
-            zinc=soil_params.get('zinc'),
-            copper=soil_params.get('copper'),
-            iron=soil_params.get('iron'),
-            manganese=soil_params.get('manganese'),
-            nitrogen=soil_params.get('nitrogen'),  # Added nitrogen field
-            sulphur=soil_params.get('sulphur'),      # Added sulphur field
-            predicted_crop=predicted_crop,
-            crop_recommendations=json.dumps(recommended_crops),
-            fertilizer_recommendations=json.dumps({"summary": fertilizer_rec}),
-            full_fertilizer_report=full_fertilizer_report,
-            json_fertilizer_report=json_fertilizer_report
-        )
-        
-        db.session.add(soil_report)
-        db.session.commit()
-        
-        # Prepare the response
-        result = {
+        job.report('extracted', soil_params=soil_params)
+    
+    # Extract district and state from soil_params if available, otherwise use form inputs
+    extracted_district = soil_params.get('district')
+    extracted_state = soil_params.get('state')
+    
+    # Track if location information was extracted from the report
+    # Only consider a value extracted if it's not None and not the string "null"
+    district_extracted = (extracted_district is not None and 
+                        extracted_district != "null" and 
+                        str(extracted_district).lower() != "none" and
+                        str(extracted_district).strip() != "")
+    
+    state_extracted = (extracted_state is not None and 
+                      extracted_state != "null" and 
+                      str(extracted_state).lower() != "none" and
+                      str(extracted_state).strip() != "")
+    
+    # If location was provided in the form, use that; otherwise use extracted values
+    final_district = district if district and district.strip() != '' else (extracted_district if district_extracted else '')
+    final_state = state if state and state.strip() != '' else (extracted_state if state_extracted else '')
+    
+    # Check if we have both district and state information
+    missing_location = (not final_district or not final_state or 
+                       final_district.strip() == '' or final_state.strip() == '')
+    
+    # Remove district and state from soil_params to avoid confusion
+    if 'district' in soil_params:
+        del soil_params['district']
+    if 'state' in soil_params:
+        del soil_params['state']
+        
+    # If location information is missing, return what we have extracted so far 
+    # so the frontend can show a popup to collect the missing information
+    if missing_location:
+        return {
             'soil_params': soil_params,
             'location': {
-                'district': final_district,
-                'state': final_state,
+                'district': final_district or '',
+                'state': final_state or '',
                 'district_extracted': district_extracted,
                 'state_extracted': state_extracted
             },
-            'recommendations': {
-                'crops': recommended_crops,
-                'fertilizer': fertilizer_rec
-            },
-            'crop_varieties': crop_variety_data,
-            'soil_report_id': soil_report.id  # Add the ID for the fertilizer report link
-        }
-        print(result)
-        
-        return jsonify(result)
+            'missing_location': True,
+            'report_path': file_path,
+            'language': language
+        }, 200
+    
+    # Make sure all required parameters have at least default values
+    if soil_params.get('ph') is None:
+        soil_params['ph'] = 7.0
+    if soil_params.get('ec') is None:
+        soil_params['ec'] = 0.5
+    if soil_params.get('organic_carbon') is None:
+        soil_params['organic_carbon'] = 0.5
+    if soil_params.get('nitrogen') is None:
+        soil_params['nitrogen'] = 250.0
+    if soil_params.get('phosphorus') is None:
+        soil_params['phosphorus'] = 30.0
+    if soil_params.get('potassium') is None:
+        soil_params['potassium'] = 40.0
+    if soil_params.get('zinc') is None:
+        soil_params['zinc'] = 1.0
+    if soil_params.get('copper') is None:
+        soil_params['copper'] = 0.5
+    if soil_params.get('iron') is None:
+        soil_params['iron'] = 4.0
+    if soil_params.get('manganese') is None:
+        soil_params['manganese'] = 2.0
+    if soil_params.get('sulphur') is None:
+        soil_params['sulphur'] = 20.0
+        
+    # Get crop prediction
+    predicted_crop = run_blocking(
+        predict_crop,
+        distt=final_district,
+        state=final_state,
+        ph=soil_params.get('ph', 7.0),
+        ec=soil_params.get('ec', 0.5),
+        oc=soil_params.get('organic_carbon', 0.5),
+        av_p=soil_params.get('phosphorus', 30.0),
+        av_k=soil_params.get('potassium', 40.0),
+        zinc=soil_params.get('zinc', 1.0),
+        cu=soil_params.get('copper', 0.5),
+        iron=soil_params.get('iron', 4.0),
+        mn=soil_params.get('manganese', 2.0)
+    )
+    print(predicted_crop)
+    # Get crop variety information
+    crop_variety_data = get_crop_varieties(predicted_crop)
+    print(crop_variety_data)
+    # Add additional crop suggestions based on soil parameters
+    recommended_crops = [predicted_crop]
+    predicted_crop = predicted_crop.lower()
+    if predicted_crop != "wheat":
+        recommended_crops.append("Wheat")
+    if predicted_crop != "rice":
+        recommended_crops.append("Rice") 
+    if predicted_crop != "maize":
+        recommended_crops.append("Maize")
+    
+    print(recommended_crops)
+
+    # Generate fertilizer recommendations
+    fertilizer_recommendations = generate_fertilizer_recommendations(soil_params)
+    fertilizer_rec = fertilizer_recommendations.get('summary', 
+        "Based on the soil analysis, apply balanced NPK fertilizer.")
+    
+    # Store the full fertilizer report for later use
+    full_fertilizer_report = fertilizer_recommendations.get('full_report', "")
+    json_fertilizer_report = fertilizer_recommendations.get('json_report', None)
+    # Convert json_fertilizer_report to string if it's a dictionary
+    if isinstance(json_fertilizer_report, dict):
+        json_fertilizer_report = json.dumps(json_fertilizer_report)
+    
+    # Get soil type based on pH
+    soil_type = "Neutral Soil"
+    if soil_params.get('ph', 7.0) < 6.0:
+        soil_type = "Acidic Soil"
+    elif soil_params.get('ph', 7.0) > 7.5:
+        soil_type = "Alkaline Soil"
+    
+    # Create a new SoilReport record in the database
+    soil_report = SoilReport(
+        user_id=user_id,
+        chat_id=chat_id,  # Use the valid chat_id we ensured above
+        report_path=file_path,
+        district=final_district,
+        state=final_state,
+        soil_type=soil_type,
+        ph_value=soil_params.get('ph'),  # Changed from ph to ph_value
+        ec=soil_params.get('ec'),
+        organic_carbon=soil_params.get('organic_carbon'),
+        phosphorus=soil_params.get('phosphorus'),
+        potassium=soil_params.get('potassium'),
+        zinc=soil_params.get('zinc'),
+        copper=soil_params.get('copper'),
+        iron=soil_params.get('iron'),
+        manganese=soil_params.get('manganese'),
+        nitrogen=soil_params.get('nitrogen'),  # Added nitrogen field
+        sulphur=soil_params.get('sulphur'),      # Added sulphur field
+        predicted_crop=predicted_crop,
+        crop_recommendations=json.dumps(recommended_crops),
+        fertilizer_recommendations=json.dumps({"summary": fertilizer_rec}),
+        full_fertilizer_report=full_fertilizer_report,
+        json_fertilizer_report=json_fertilizer_report
+    )
     
-    except Exception as e:
-        import traceback
-        print(f"Error in analyze_soil_report: {str(e)}")
-        print(traceback.format_exc())
-        return jsonify({'error': str(e)}), 500
+    db.session.add(soil_report)
+    db.session.commit()
+    
+    # Prepare the response
+    result = {
+        'soil_params': soil_params,
+        'location': {
+            'district': final_district,
+            'state': final_state,
+            'district_extracted': district_extracted,
+            'state_extracted': state_extracted
+        },
+        'recommendations': {
+            'crops': recommended_crops,
+            'fertilizer': fertilizer_rec
+        },
+        'crop_varieties': crop_variety_data,
+        'soil_report_id': soil_report.id  # Add the ID for the fertilizer report link
+    }
+    print(result)
+    
+    return result, 200
 
 @app.route('/api/clear_chat', methods=['POST'])
 @login_required
@@ -1776,16 +2165,15 @@ def get_weather():
             return jsonify({'error': 'Invalid coordinates format'}), 400
         
         # Call Meteo API
-        import requests
         from datetime import datetime, timedelta
         
         # Basic location name lookup based on coordinates (simplified)
         location_name = get_location_name(lat, lon)
         
         # Meteo API URL
-        url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,relativehumidity_2m,precipitation,windspeed_10m&daily=weathercode,temperature_2m_max,temperature_2m_min,sunrise,sunset,uv_index_max,precipitation_sum&current_weather=true&timezone=auto"
+        url = http_client.url('open_meteo', f"/v1/forecast?latitude={lat}&longitude={lon}&hourly=temperature_2m,relativehumidity_2m,precipitation,windspeed_10m&daily=weathercode,temperature_2m_max,temperature_2m_min,sunrise,sunset,uv_index_max,precipitation_sum&current_weather=true&timezone=auto")
         
-        response = requests.get(url)
+        response = http_client.get('open_meteo', url)
         
         if response.status_code != 200:
             return jsonify({'error': f'Weather API error: {response.status_code}'}), 500
@@ -1903,27 +2291,21 @@ def get_weather():
 # Add this helper function for system user at the top of the file, after the get_db_connection function
 def get_or_create_system_user():
     """Get or create a system user for bot messages"""
-    conn = get_db_connection()
-    cursor = conn.cursor(dictionary=True)
-    
-    # Check if system user exists
-    cursor.execute("SELECT id FROM users WHERE email = 'system@farmerchatbot.com'")
-    system_user = cursor.fetchone()
-    
-    if system_user:
-        system_user_id = system_user['id']
-    else:
+    # Through the app's session rather than a new MySQL connection per message
+    system_user = UserModel.query.filter_by(email='system@farmerchatbot.com').first()
+
+    if system_user is None:
         # Create system user if it doesn't exist
-        cursor.execute(
-            "INSERT INTO users (username, email, password_hash, preferred_language) VALUES (%s, %s, %s, %s)",
-            ('System', 'system@farmerchatbot.com', 'SYSTEM_USER_NOT_FOR_LOGIN', 'english')
+        system_user = UserModel(
+            username='System',
+            email='system@farmerchatbot.com',
+            password_hash='SYSTEM_USER_NOT_FOR_LOGIN',
+            preferred_language='english'
         )
-        conn.commit()
-        system_user_id = cursor.lastrowid
-    
-    cursor.close()
-    conn.close()
-    return system_user_id
+        db.session.add(system_user)
+        db.session.flush()
+
+    return system_user.id
 
 # Mandi Dashboard Routes
 @app.route('/mandi')
@@ -2036,62 +2418,7 @@ def get_mandi_dashboard_data(state=None, district=None, commodity=None, analysis
         cursor.execute(query, params)
         data = cursor.fetchall()
 
-        # Process data for different visualizations
-        result = {
-            'table_data': [],
-            'price_trends': {'labels': [], 'modal_prices': []},
-            'commodity_distribution': {'labels': [], 'values': []},
-            'market_comparison': {'labels': [], 'prices': []},
-            'price_ranges': {'labels': [], 'ranges': []}
-        }
-
-        # Process data for table and charts
-        for row in data:
-            # Table data
-            result['table_data'].append({
-                'market': row[0],
-                'commodity': row[1],
-                'variety': row[2],
-                'grade': row[3],
-                'arrival_date': row[4],
-                'min_price': row[5],
-                'max_price': row[6],
-                'modal_price': row[7]
-            })
-
-            # Price trends (only for past analysis)
-            if analysis_type == 'past':
-                result['price_trends']['labels'].append(row[4].strftime('%Y-%m-%d'))
-                result['price_trends']['modal_prices'].append(float(row[7]))
-
-            # Commodity distribution
-            if row[1] not in result['commodity_distribution']['labels']:
-                result['commodity_distribution']['labels'].append(row[1])
-                result['commodity_distribution']['values'].append(1)
-            else:
-                idx = result['commodity_distribution']['labels'].index(row[1])
-                result['commodity_distribution']['values'][idx] += 1
-
-            # Market comparison
-            if row[0] not in result['market_comparison']['labels']:
-                result['market_comparison']['labels'].append(row[0])
-                result['market_comparison']['prices'].append(float(row[7]))
-            else:
-                idx = result['market_comparison']['labels'].index(row[0])
-                result['market_comparison']['prices'][idx] = (result['market_comparison']['prices'][idx] + float(row[7])) / 2
-
-            # Price ranges
-            if row[1] not in result['price_ranges']['labels']:
-                result['price_ranges']['labels'].append(row[1])
-                result['price_ranges']['ranges'].append([float(row[5]), float(row[7]), float(row[6])])
-            else:
-                idx = result['price_ranges']['labels'].index(row[1])
-                current_range = result['price_ranges']['ranges'][idx]
-                current_range[0] = min(current_range[0], float(row[5]))
-                current_range[1] = (current_range[1] + float(row[7])) / 2
-                current_range[2] = max(current_range[2], float(row[6]))
-
-        return result
+        return build_dashboard_data(data, analysis_type)
 
     except Exception as e:
         print(f"Error in get_mandi_dashboard_data: {str(e)}")
@@ -2141,13 +2468,11 @@ def get_user_location():
             return jsonify({'error': 'Location not set'}), 404
             
         # Use reverse geocoding to get state
-        import requests
-        
         # Using Nominatim for reverse geocoding
-        url = f"https://nominatim.openstreetmap.org/reverse?format=json&lat={latitude}&lon={longitude}"
+        url = http_client.url('nominatim', f"/reverse?format=json&lat={latitude}&lon={longitude}")
         headers = {'User-Agent': 'GreenSathi/1.0'}
         
-        response = requests.get(url, headers=headers)
+        response = http_client.get('nominatim', url, headers=headers)
         
         if response.status_code != 200:
             return jsonify({'error': 'Geocoding service error'}), 500
@@ -2723,5 +3048,11 @@ def delete_crop(crop_id):
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# Background job handlers for the voice, image and soil report endpoints
+register_job_handler('voice', run_voice_job, voice_job_failed)
+register_job_handler('speech', run_speech_job)
+register_job_handler('image', run_image_job)
+register_job_handler('soil_report', run_soil_job)
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=8004)
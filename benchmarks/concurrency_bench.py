@@ -0,0 +1,175 @@
+"""
+Concurrency benchmark: sync vs gevent gunicorn workers against stubbed upstreams.
+
+Starts a local stub upstream that answers every request after a fixed
+latency, then for each worker class runs gunicorn with benchmarks/io_bound_app.py
+and fires concurrent requests at it. With sync workers throughput is capped at
+workers / request latency; with gevent one worker keeps hundreds of upstream
+waits in flight.
+
+    python benchmarks/concurrency_bench.py --requests 400 --concurrency 200 --latency 0.3
+    python benchmarks/concurrency_bench.py --modes gevent --workers 1 --json results.json
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STUB_COMPLETION = json.dumps({
+    'choices': [{'message': {'role': 'assistant', 'content': 'Sow wheat between late October and mid November.'}}]
+}).encode('utf-8')
+STUB_AUDIO = b'\xff\xfb' + b'\x00' * 4096
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_stub_upstream(port, latency):
+    """Serve OpenRouter- and TTS-shaped responses after a fixed delay"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, body, content_type):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            self._reply(STUB_COMPLETION, 'application/json')
+
+        def do_GET(self):
+            self._reply(STUB_AUDIO, 'audio/mpeg')
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_app(mode, port, workers, upstream_url):
+    env = dict(os.environ, BENCH_UPSTREAM_URL=upstream_url)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-k', mode, '-w', str(workers),
+         '--worker-connections', '1000', '--backlog', '2048', '--timeout', '300',
+         '-b', f'127.0.0.1:{port}', 'benchmarks.io_bound_app:app'],
+        cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1).read()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) did not start on port {port}")
+
+
+def run_load(url, total, concurrency):
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one_request(_):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            urllib.request.urlopen(url, timeout=300).read()
+            ok = True
+        except OSError:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_request, range(total)))
+    wall = time.perf_counter() - started
+    return latencies, errors, wall
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default='sync,gevent', help='Comma-separated gunicorn worker classes')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes')
+    parser.add_argument('--requests', type=int, default=200, help='Total requests per mode')
+    parser.add_argument('--concurrency', type=int, default=100, help='Concurrent client connections')
+    parser.add_argument('--latency', type=float, default=0.2, help='Stub upstream latency per call (seconds)')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = start_stub_upstream(stub_port, args.latency)
+    upstream_url = f'http://127.0.0.1:{stub_port}'
+
+    results = []
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        port = free_port()
+        process = start_app(mode, port, args.workers, upstream_url)
+        try:
+            run_load(f'http://127.0.0.1:{port}/chat', min(args.workers * 2, args.requests), args.workers)  # warm-up
+            latencies, errors, wall = run_load(f'http://127.0.0.1:{port}/chat', args.requests, args.concurrency)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+
+        result = {
+            'mode': mode,
+            'workers': args.workers,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'upstream_latency_s': args.latency,
+            'errors': errors,
+            'wall_s': round(wall, 3),
+            'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+            'p50_s': round(statistics.median(latencies), 3) if latencies else 0.0,
+            'p95_s': round(percentile(latencies, 95), 3),
+            'p99_s': round(percentile(latencies, 99), 3),
+            'max_s': round(max(latencies), 3) if latencies else 0.0
+        }
+        results.append(result)
+        print(f"{mode:>8}: {result['throughput_rps']:8.2f} req/s  p50 {result['p50_s']:.3f}s  "
+              f"p95 {result['p95_s']:.3f}s  p99 {result['p99_s']:.3f}s  errors {errors}")
+
+    stub.shutdown()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Import-time budget for the web app.
+
+Runs ``python -X importtime -c "import app"`` in a fresh interpreter, which is
+what every gunicorn worker pays before it can serve a request, and fails if
+
+  * importing the app takes longer than --budget-ms (median of --runs), or
+  * any of the heavy ML/media libraries is imported on the way, since those
+    are meant to load on first use or through models/warmup.py.
+
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --budget-ms 800 --top 20
+    python benchmarks/import_budget.py --module job_worker --allow torch
+
+The exit status is 1 when the budget is exceeded or a forbidden module shows
+up, so the script can gate CI.
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+
+# Milliseconds `import app` may take in a fresh interpreter
+IMPORT_BUDGET_MS = float(os.getenv('IMPORT_BUDGET_MS', '1500'))
+
+# Top-level packages that must not be imported when a worker boots
+FORBIDDEN_MODULES = [
+    'torch', 'torchaudio', 'transformers', 'librosa', 'soundfile', 'pydub', 'gtts',
+    'speech_recognition', 'numpy', 'pandas', 'sklearn', 'joblib', 'lightgbm',
+    'cv2', 'PIL', 'pytesseract', 'pdf2image', 'mysql',
+]
+
+
+def measure(module):
+    """
+    Import module in a fresh interpreter with -X importtime
+
+    Returns:
+        tuple: (milliseconds for the module's own import, {module name: (self ms, cumulative ms)})
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    total = None
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        stripped = name.strip()
+        modules[stripped] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+        # Top-level entries (the target itself) are indented by a single space
+        if stripped == module and name.startswith(' ') and not name.startswith('  '):
+            total = int(cumulative_us) / 1000
+    if total is None:
+        raise RuntimeError(f"no importtime entry for {module}; was it already imported at startup?")
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--module', default='app', help='Module to import (default: app)')
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS)
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to time; the median is checked')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list by self time')
+    parser.add_argument('--allow', action='append', default=[], help='Forbidden package to allow (repeatable)')
+    args = parser.parse_args()
+
+    forbidden = [name for name in FORBIDDEN_MODULES if name not in args.allow]
+    totals = []
+    modules = {}
+    for _ in range(args.runs):
+        total, modules = measure(args.module)
+        totals.append(total)
+    median = statistics.median(totals)
+
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"({', '.join(f'{t:.0f}' for t in totals)}), budget {args.budget_ms:.0f} ms")
+
+    print("\nSlowest modules by self time:")
+    slowest = sorted(modules.items(), key=lambda item: item[1][0], reverse=True)[:args.top]
+    for name, (self_ms, cumulative_ms) in slowest:
+        print(f"  {self_ms:8.1f} ms self {cumulative_ms:9.1f} ms cumulative  {name}")
+
+    offenders = sorted({name for name in modules if name.split('.')[0] in forbidden})
+    failed = False
+    if offenders:
+        failed = True
+        print(f"\nFAIL: heavy modules imported at startup: {', '.join(offenders)}")
+    if median > args.budget_ms:
+        failed = True
+        print(f"\nFAIL: import {args.module} took {median:.0f} ms, over the {args.budget_ms:.0f} ms budget")
+    if not failed:
+        print("\nOK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""
+Minimal stand-in for the chat endpoint, used by concurrency_bench.py.
+
+Each request makes the same upstream calls as /api/process_text followed by
+speech synthesis (an OpenRouter-style chat completion, then a TTS download),
+against the stub server at BENCH_UPSTREAM_URL, without needing MySQL or API
+keys.
+"""
+import os
+import requests
+from flask import Flask, jsonify
+
+BENCH_UPSTREAM_URL = os.getenv('BENCH_UPSTREAM_URL', 'http://127.0.0.1:8900')
+# Upstream calls per request (chat completion + TTS by default)
+BENCH_UPSTREAM_CALLS = int(os.getenv('BENCH_UPSTREAM_CALLS', '2'))
+
+app = Flask(__name__)
+
+
+@app.route('/health')
+def health():
+    return jsonify({'ok': True})
+
+
+@app.route('/chat')
+def chat():
+    reply = None
+    for call in range(BENCH_UPSTREAM_CALLS):
+        if call == 0:
+            response = requests.post(
+                f"{BENCH_UPSTREAM_URL}/api/v1/chat/completions",
+                json={'model': 'stub', 'messages': [{'role': 'user', 'content': 'When should I sow wheat?'}]},
+                timeout=30
+            )
+            reply = response.json()['choices'][0]['message']['content']
+        else:
+            requests.get(f"{BENCH_UPSTREAM_URL}/translate_tts", timeout=30).content
+    return jsonify({'response': reply})
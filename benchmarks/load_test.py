@@ -0,0 +1,537 @@
+"""
+End-to-end load benchmark for the main user journeys.
+
+Registers and logs in synthetic farmers and dealers, then has each of them
+loop over a weighted mix of real app requests for a fixed duration:
+
+    farmers: chat text, voice upload, image diagnosis, soil report,
+             mandi dashboard, weather
+    dealers: browse active crops, place bids, mandi dashboard, weather
+
+By default the app is started under gunicorn (gunicorn.conf.py) with every
+upstream pointed at benchmarks/stub_upstreams.py and a throwaway SQLite
+database. Pass a MySQL URL to --database-url to run against MySQL (schema
+from database_schema.sql), or --target to load an already running server
+that was started with HTTP_STUB_URL set.
+
+The mandi dashboard reads the mandi_data table through mysql.connector, so
+it is left out of the mix on SQLite. gevent workers also need MySQL: a
+greenlet waiting on SQLite's write lock blocks the whole worker, including
+the greenlet holding the lock.
+
+    python benchmarks/load_test.py --duration 60 --farmers 20 --dealers 5 --json results/main.json
+    python benchmarks/load_test.py --async-jobs --stub-latency 0.3
+    python benchmarks/load_test.py --worker-class gevent --database-url mysql+pymysql://root:pw@127.0.0.1:3306/farmers_chatbot
+    python benchmarks/load_test.py --baseline results/main.json --json results/branch.json
+
+Results are written as JSON (per-route throughput, p50/p95/p99, status
+counts, plus the run configuration and git commit) so runs on different
+commits can be diffed; --baseline prints the change per route.
+"""
+import os
+import io
+import sys
+import json
+import time
+import wave
+import math
+import random
+import socket
+import argparse
+import statistics
+import subprocess
+import tempfile
+import threading
+from datetime import datetime, timedelta
+import requests
+from sqlalchemy import create_engine, select, insert
+from sqlalchemy.schema import CreateTable, CreateIndex
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, BENCH_DIR)
+
+from stub_upstreams import create_app as create_stub_app, serve_in_thread, Profile
+
+# Relative weights of each action per role
+DEFAULT_MIX = {
+    'farmer': {'chat': 40, 'voice': 10, 'image': 10, 'soil': 5, 'mandi': 15, 'weather': 20},
+    'dealer': {'browse_crops': 30, 'bid': 40, 'mandi': 20, 'weather': 10},
+}
+
+# Routes that read through get_db_connection (mysql.connector) and cannot run on SQLite
+MYSQL_ONLY_ACTIONS = {'mandi'}
+
+CHAT_QUESTIONS = [
+    'When should I sow wheat in Uttar Pradesh?',
+    'How much urea should I apply to paddy per acre?',
+    'My tomato leaves have brown spots, what should I spray?',
+    'What is the best time to irrigate mustard?',
+    'Which pesticide is safe for cotton bollworm?',
+    'How do I improve soil organic carbon?',
+    'गेहूं में कितना पानी देना चाहिए?',
+    'धान की रोपाई का सही समय क्या है?',
+    'आलू में झुलसा रोग का इलाज बताइए',
+    'सरसों की अच्छी किस्में कौन सी हैं?',
+]
+
+LOCATIONS = [(26.85, 80.95), (22.72, 75.86), (30.90, 75.85), (19.99, 73.79), (26.91, 75.79), (29.69, 76.99)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ----------------------------------------------------------------------------
+# Fixtures
+# ----------------------------------------------------------------------------
+
+def make_wav(seconds=2.0, rate=16000):
+    """A mono 16-bit tone, standing in for a recorded question"""
+    frames = bytearray()
+    for n in range(int(seconds * rate)):
+        sample = int(8000 * math.sin(2 * math.pi * 220 * n / rate))
+        frames += sample.to_bytes(2, 'little', signed=True)
+    buf = io.BytesIO()
+    with wave.open(buf, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(frames))
+    return buf.getvalue()
+
+
+def make_image(fmt, size=(640, 480), seed=0):
+    """A noisy leaf-green image in the given PIL format"""
+    from PIL import Image
+    rng = random.Random(seed)
+    image = Image.new('RGB', size, (60, 140, 50))
+    pixels = image.load()
+    for _ in range(size[0] * size[1] // 20):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        pixels[x, y] = (rng.randrange(80, 160), rng.randrange(60, 120), 30)
+    buf = io.BytesIO()
+    image.save(buf, fmt)
+    return buf.getvalue()
+
+
+def prepare_database(url):
+    """
+    Create the schema on SQLite and make sure the rows the bidding journey
+    needs exist. Returns (commodity_id, district_id).
+    """
+    from models.database import db
+    import models  # noqa: F401  registers every table on db.metadata
+
+    engine = create_engine(url)
+    tables = db.metadata.tables
+    if engine.dialect.name == 'sqlite':
+        # Index names are global in SQLite but per table in MySQL, where the schema reuses some
+        seen = set()
+        with engine.begin() as conn:
+            for table in db.metadata.sorted_tables:
+                conn.execute(CreateTable(table, if_not_exists=True))
+                for index in table.indexes:
+                    if index.name not in seen:
+                        seen.add(index.name)
+                        conn.execute(CreateIndex(index, if_not_exists=True))
+
+    commodities, districts = tables['commodities_names'], tables['districts_names']
+    with engine.begin() as conn:
+        commodity_id = conn.execute(select(commodities.c.id).where(commodities.c.name == 'Wheat')).scalar()
+        if commodity_id is None:
+            commodity_id = conn.execute(insert(commodities).values(name='Wheat')).inserted_primary_key[0]
+        district_id = conn.execute(select(districts.c.id).where(
+            districts.c.name == 'Lucknow', districts.c.state == 'Uttar Pradesh')).scalar()
+        if district_id is None:
+            district_id = conn.execute(insert(districts).values(
+                name='Lucknow', state='Uttar Pradesh')).inserted_primary_key[0]
+    engine.dispose()
+    return commodity_id, district_id
+
+
+def active_crop_ids(url, emails):
+    from models.database import db
+    users, crops = db.metadata.tables['users'], db.metadata.tables['crops_for_sale']
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(crops.c.id).join(users, users.c.id == crops.c.farmer_id)
+            .where(users.c.email.in_(emails), crops.c.status == 'active')
+        ).scalars().all()
+    engine.dispose()
+    return list(rows)
+
+
+def start_app(port, args, env_overrides):
+    env = dict(os.environ, **env_overrides)
+    env.update(
+        GUNICORN_BIND=f'127.0.0.1:{port}',
+        GUNICORN_WORKERS=str(args.workers),
+        GUNICORN_WORKER_CLASS=args.worker_class,
+        GUNICORN_TIMEOUT='300',
+    )
+    log = open(args.app_log, 'ab') if args.app_log else subprocess.DEVNULL
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        cwd=REPO_ROOT, env=env, stdout=log, stderr=log
+    )
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}; see --app-log")
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/login', timeout=2).status_code == 200:
+                return process
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"App did not start on port {port}")
+
+
+# ----------------------------------------------------------------------------
+# Virtual users
+# ----------------------------------------------------------------------------
+
+class Recorder:
+    """Latencies and status codes per route, shared by all virtual users"""
+
+    def __init__(self):
+        self.routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, latency, status, ok):
+        with self._lock:
+            entry = self.routes.setdefault(route, {'latencies': [], 'statuses': {}, 'errors': 0})
+            entry['statuses'][str(status)] = entry['statuses'].get(str(status), 0) + 1
+            if ok:
+                entry['latencies'].append(latency)
+            else:
+                entry['errors'] += 1
+
+
+class VirtualUser:
+    """One logged-in farmer or dealer issuing requests over its own session"""
+
+    def __init__(self, index, role, base_url, args, fixtures, recorder):
+        self.index = index
+        self.role = role
+        self.base_url = base_url
+        self.args = args
+        self.fixtures = fixtures
+        self.recorder = recorder
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.session = requests.Session()
+        self.email = f'loadtest-{role}-{index}@example.com'
+        self.language = self.rng.choice(['hindi', 'english'])
+        self.lat, self.lon = LOCATIONS[index % len(LOCATIONS)]
+        self.chat_id = None
+
+    def url(self, path):
+        return self.base_url + path
+
+    def login(self):
+        form = {
+            'username': f'loadtest_{self.role}_{self.index}', 'email': self.email,
+            'password': 'loadtest-password', 'language': self.language, 'user_role': self.role,
+            'latitude': str(self.lat), 'longitude': str(self.lon),
+        }
+        self.session.post(self.url('/register'), data=form, timeout=30)
+        response = self.session.post(self.url('/login'), data={'email': self.email, 'password': form['password']},
+                                     timeout=30)
+        if response.url.rstrip('/').endswith('/login'):
+            raise RuntimeError(f"Login failed for {self.email}")
+        if self.role == 'farmer':
+            response = self.session.post(self.url('/api/create_chat'), json={'language': self.language}, timeout=30)
+            self.chat_id = response.json()['chat_id']
+
+    def list_crop(self, commodity_id, district_id):
+        """Put a crop up for auction so dealers have something to bid on"""
+        self.session.post(self.url('/farmer/crops/add'), data={
+            'commodity_id': commodity_id, 'district_id': district_id, 'quantity': '20', 'unit': 'quintal',
+            'base_price': '2000', 'expected_date': (datetime.now() + timedelta(days=14)).strftime('%Y-%m-%d'),
+            'description': 'Load test lot',
+        }, timeout=30)
+
+    def timed(self, route, method, path, ok_statuses=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.url(path), timeout=self.args.timeout, **kwargs)
+            status = response.status_code
+            if status == 202 and self.args.async_jobs:
+                status = self.wait_for_job(response.json())
+        except requests.exceptions.RequestException as e:
+            status = type(e).__name__
+        latency = time.perf_counter() - started
+        self.recorder.record(route, latency, status, status in ok_statuses)
+
+    def wait_for_job(self, accepted):
+        """Poll a queued job until it finishes; the route's latency covers the whole job"""
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            time.sleep(0.25)
+            job = self.session.get(self.url(accepted['status_url']), timeout=30).json()
+            if job.get('status') == 'done':
+                return job.get('status_code') or 200
+            if job.get('status') == 'failed':
+                return job.get('status_code') or 500
+        return 'JobTimeout'
+
+    def form(self, **fields):
+        if self.args.async_jobs:
+            fields['async'] = 'true'
+        return fields
+
+    # Actions -----------------------------------------------------------------
+
+    def chat(self):
+        self.timed('chat', 'POST', '/api/process_text', json={
+            'message': self.rng.choice(CHAT_QUESTIONS), 'chat_id': self.chat_id, 'language': self.language})
+
+    def voice(self):
+        self.timed('voice', 'POST', '/api/process_voice',
+                   data=self.form(language=self.language, chat_id=self.chat_id),
+                   files={'audio': ('question.wav', self.fixtures['wav'], 'audio/wav')})
+
+    def image(self):
+        self.timed('image', 'POST', '/api/process_image',
+                   data=self.form(language=self.language, chat_id=self.chat_id),
+                   files={'image': ('leaf.jpg', self.fixtures['jpg'], 'image/jpeg')})
+
+    def soil(self):
+        self.timed('soil', 'POST', '/api/analyze_soil_report',
+                   data=self.form(language=self.language, district='Lucknow', state='Uttar Pradesh'),
+                   files={'soil_report': ('soil_report.png', self.fixtures['png'], 'image/png')})
+
+    def mandi(self):
+        state, commodity = self.rng.choice([('Uttar Pradesh', 'Wheat'), ('Madhya Pradesh', 'Onion'),
+                                            ('Punjab', 'Paddy(Dhan)(Common)'), ('Maharashtra', 'Tomato')])
+        self.timed('mandi', 'GET', '/api/mandi/dashboard-data',
+                   params={'state': state, 'commodity': commodity, 'analysis_type': 'latest'})
+
+    def weather(self):
+        self.timed('weather', 'GET', '/api/weather', params={'lat': self.lat, 'lon': self.lon})
+
+    def browse_crops(self):
+        self.timed('browse_crops', 'GET', '/dealer/active_crops')
+
+    def bid(self):
+        crop_ids = self.fixtures['crop_ids']
+        if not crop_ids:
+            return
+        crop_id = self.rng.choice(crop_ids)
+        started = time.perf_counter()
+        try:
+            current = self.session.get(self.url(f'/api/crops/{crop_id}/highest-bid'), timeout=self.args.timeout).json()
+            amount = float(current['highest_bid'] or current['base_price']) + self.rng.randint(10, 50)
+            response = self.session.post(self.url(f'/api/crops/{crop_id}/bid'), json={'bid_amount': amount},
+                                         timeout=self.args.timeout)
+            status = response.status_code
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            status = type(e).__name__
+        # 400 is a lost race against another dealer's higher bid, which is normal under load
+        self.recorder.record('bid', time.perf_counter() - started, status, status in (200, 400))
+
+    def run(self, mix, stop_at):
+        actions, weights = zip(*mix.items())
+        while time.monotonic() < stop_at:
+            getattr(self, self.rng.choices(actions, weights)[0])()
+            if self.args.think_time:
+                time.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+
+
+# ----------------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------------
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(recorder, wall):
+    routes = {}
+    for route, entry in sorted(recorder.routes.items()):
+        latencies = entry['latencies']
+        routes[route] = {
+            'requests': len(latencies) + entry['errors'],
+            'errors': entry['errors'],
+            'statuses': dict(sorted(entry['statuses'].items())),
+            'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+            'p50_s': round(statistics.median(latencies), 3) if latencies else 0.0,
+            'p95_s': round(percentile(latencies, 95), 3),
+            'p99_s': round(percentile(latencies, 99), 3),
+            'max_s': round(max(latencies), 3) if latencies else 0.0,
+        }
+    total_ok = sum(len(entry['latencies']) for entry in recorder.routes.values())
+    return routes, {
+        'requests': sum(route['requests'] for route in routes.values()),
+        'errors': sum(route['errors'] for route in routes.values()),
+        'throughput_rps': round(total_ok / wall, 2) if wall else 0.0,
+    }
+
+
+def print_report(routes, totals, baseline=None):
+    print(f"{'route':<14}{'reqs':>7}{'errs':>6}{'req/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}")
+    for route, r in routes.items():
+        line = (f"{route:<14}{r['requests']:>7}{r['errors']:>6}{r['throughput_rps']:>9.2f}"
+                f"{r['p50_s']:>8.3f}{r['p95_s']:>8.3f}{r['p99_s']:>8.3f}")
+        before = (baseline or {}).get('routes', {}).get(route)
+        if before and before['p95_s']:
+            line += f"   p95 {100 * (r['p95_s'] - before['p95_s']) / before['p95_s']:+.1f}%"
+            if before['throughput_rps']:
+                line += f"  req/s {100 * (r['throughput_rps'] - before['throughput_rps']) / before['throughput_rps']:+.1f}%"
+        print(line)
+    print(f"{'total':<14}{totals['requests']:>7}{totals['errors']:>6}{totals['throughput_rps']:>9.2f}")
+
+
+def parse_mix(spec, role):
+    mix = dict(DEFAULT_MIX[role])
+    for item in filter(None, (spec or '').split(',')):
+        action, _, weight = item.partition('=')
+        if action.strip() in mix:
+            mix[action.strip()] = float(weight)
+    return {action: weight for action, weight in mix.items() if weight > 0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--target', help='Base URL of a running app (default: start one under gunicorn)')
+    parser.add_argument('--database-url', help='SQLAlchemy URL the app uses (default: a temporary SQLite file)')
+    parser.add_argument('--farmers', type=int, default=10)
+    parser.add_argument('--dealers', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=60, help='Seconds of load after warm-up')
+    parser.add_argument('--think-time', type=float, default=0.0, help='Mean pause between a user\'s requests')
+    parser.add_argument('--farmer-mix', help='Override farmer weights, e.g. chat=60,voice=0')
+    parser.add_argument('--dealer-mix', help='Override dealer weights, e.g. bid=80')
+    parser.add_argument('--async-jobs', action='store_true', help='Submit voice, image and soil as background jobs')
+    parser.add_argument('--timeout', type=float, default=120, help='Per-request timeout (seconds)')
+    parser.add_argument('--workers', type=int, default=2, help='Gunicorn worker processes')
+    parser.add_argument('--worker-class', default='sync', help='Gunicorn worker class (sync or gevent)')
+    parser.add_argument('--stub-latency', type=float, default=0.1, help='Base latency of every stub upstream')
+    parser.add_argument('--stub-jitter', type=float, default=0.05)
+    parser.add_argument('--stub-error-rate', type=float, default=0.0)
+    parser.add_argument('--stub-ratelimit-rate', type=float, default=0.0)
+    parser.add_argument('--app-log', help='Append the app\'s output to this file')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--baseline', help='Earlier results JSON to compare against')
+    parser.add_argument('--json', help='Write results to this file')
+    args = parser.parse_args()
+    if args.target and not args.database_url:
+        parser.error('--target needs --database-url (the database that server uses)')
+    if args.worker_class == 'gevent' and not (args.database_url or '').startswith('mysql'):
+        parser.error('gevent workers need a MySQL --database-url; SQLite lock waits block the worker')
+
+    workdir = tempfile.mkdtemp(prefix='loadtest-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}?timeout=30"
+    commodity_id, district_id = prepare_database(database_url)
+
+    stub_profile = Profile(args.stub_latency, args.stub_jitter, args.stub_error_rate, args.stub_ratelimit_rate)
+    stub_server, stub_url = serve_in_thread(create_stub_app(stub_profile, seed=args.seed))
+
+    process = None
+    base_url = args.target
+    if not base_url:
+        port = free_port()
+        process = start_app(port, args, {
+            'HTTP_STUB_URL': stub_url,
+            'DATABASE_URL': database_url,
+            'OPENROUTER_API_KEY': os.getenv('OPENROUTER_API_KEY') or 'stub-key',
+            'JOB_QUEUE_MODE': 'thread' if args.async_jobs else 'off',
+        })
+        base_url = f'http://127.0.0.1:{port}'
+    base_url = base_url.rstrip('/')
+
+    farmer_mix = parse_mix(args.farmer_mix, 'farmer')
+    dealer_mix = parse_mix(args.dealer_mix, 'dealer')
+    skipped = []
+    if database_url.startswith('sqlite'):
+        skipped = sorted(MYSQL_ONLY_ACTIONS & (set(farmer_mix) | set(dealer_mix)))
+        for mix in (farmer_mix, dealer_mix):
+            for action in MYSQL_ONLY_ACTIONS:
+                mix.pop(action, None)
+        if skipped:
+            print(f"Skipping on SQLite (needs MySQL): {', '.join(skipped)}")
+
+    fixtures = {'wav': make_wav(), 'jpg': make_image('JPEG', seed=args.seed),
+                'png': make_image('PNG', size=(800, 1100), seed=args.seed), 'crop_ids': []}
+    recorder = Recorder()
+    users = ([VirtualUser(i, 'farmer', base_url, args, fixtures, recorder) for i in range(args.farmers)] +
+             [VirtualUser(i, 'dealer', base_url, args, fixtures, recorder) for i in range(args.dealers)])
+
+    try:
+        print(f"Logging in {args.farmers} farmers and {args.dealers} dealers on {base_url}")
+        for user in users:
+            user.login()
+        farmers = [user for user in users if user.role == 'farmer']
+        for farmer in farmers[:max(1, len(farmers) // 2)]:
+            farmer.list_crop(commodity_id, district_id)
+        fixtures['crop_ids'] = active_crop_ids(database_url, [farmer.email for farmer in farmers])
+
+        # Warm-up: one pass of each action per role, not recorded
+        warm = Recorder()
+        for user in (farmers[:1] + [user for user in users if user.role == 'dealer'][:1]):
+            user.recorder = warm
+            for action in (farmer_mix if user.role == 'farmer' else dealer_mix):
+                getattr(user, action)()
+            user.recorder = recorder
+
+        print(f"Running for {args.duration:.0f}s")
+        started = time.monotonic()
+        stop_at = started + args.duration
+        threads = [threading.Thread(target=user.run, args=(farmer_mix if user.role == 'farmer' else dealer_mix, stop_at))
+                   for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.monotonic() - started
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+        stub_server.shutdown()
+
+    routes, totals = summarize(recorder, wall)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(routes, totals, baseline)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'config': {
+                    'target': args.target, 'database': database_url.split(':', 1)[0],
+                    'farmers': args.farmers, 'dealers': args.dealers, 'duration_s': args.duration,
+                    'think_time_s': args.think_time, 'async_jobs': args.async_jobs,
+                    'workers': args.workers, 'worker_class': args.worker_class,
+                    'stub': stub_profile.to_dict(), 'farmer_mix': farmer_mix, 'dealer_mix': dealer_mix,
+                    'skipped': skipped,
+                },
+                'routes': routes,
+                'totals': totals,
+            }, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
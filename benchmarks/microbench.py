@@ -0,0 +1,426 @@
+"""
+Microbenchmarks for the pure-Python hot paths behind chat, soil, mandi,
+weather and voice requests.
+
+Every case runs on fixed inputs. A case is warmed up, then timed in
+``--samples`` samples of enough iterations to last ``--min-time`` seconds
+each; the report gives mean operations per second with a 95% confidence
+interval (Student's t over the samples).
+
+    python benchmarks/microbench.py
+    python benchmarks/microbench.py --filter fertilizer --samples 30
+    python benchmarks/microbench.py --json results/micro-main.json
+    python benchmarks/microbench.py --compare results/micro-main.json
+
+With --compare, cases whose mean moved by more than --threshold (10% by
+default) are flagged, and the exit status is 1 if any got slower. Cases
+whose dependencies are missing (model file, ffmpeg, audio libraries) are
+reported as skipped.
+"""
+import os
+import io
+import sys
+import json
+import math
+import wave
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_ROOT)
+
+# Two-sided 95% critical values of Student's t by degrees of freedom
+T_95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262,
+        10: 2.228, 11: 2.201, 12: 2.179, 13: 2.160, 14: 2.145, 15: 2.131, 16: 2.120, 17: 2.110,
+        18: 2.101, 19: 2.093, 20: 2.086, 25: 2.060, 30: 2.042, 40: 2.021, 60: 2.000, 120: 1.980}
+
+
+class Skip(Exception):
+    """Raised by a case's setup when it cannot run in this environment"""
+
+
+def t_critical(df):
+    for bound in sorted(T_95):
+        if df <= bound:
+            return T_95[bound]
+    return 1.960
+
+
+# ----------------------------------------------------------------------------
+# Fixed inputs
+# ----------------------------------------------------------------------------
+
+LLM_ANSWER = (
+    "**Wheat sowing advice for Uttar Pradesh**\n\n"
+    "* Sow between *25 October* and *15 November*; late sowing after 25 December cuts yield by 25-30 kg/ha per day.\n"
+    "* Seed rate: 100 kg/ha (125 kg/ha for late sowing), treated with `carbendazim` 2 g/kg.\n"
+    "* Fertilizer: 120:60:40 kg N/P/K per hectare. Apply half the N and all P & K at sowing.\n\n\n"
+    "• Irrigate at crown root initiation (20-25 days) and at flowering.\n"
+    "• गेहूं की बुवाई के लिए HD 2967, PBW 343 और DBW 187 अच्छी किस्में हैं।\n"
+    "• खरपतवार नियंत्रण के लिए 30-35 दिन पर सल्फोसल्फ्यूरॉन 25 g/ha का छिड़काव करें।\\n\n"
+) * 3
+
+SOIL_VALUES = {'pH': 7.8, 'EC': 0.42, 'OC': 0.38, 'N': 212, 'P': 11.5, 'K': 148,
+               'Zn': 0.52, 'Cu': 0.21, 'Fe': 3.9, 'Mn': 6.2, 'S': 9.8}
+
+CROP_SAMPLE = ('LUCKNOW', 'UTTAR PRADESH', 7.8, 0.42, 0.38, 11.5, 148, 0.52, 0.21, 3.9, 6.2)
+
+MARKETS = ['Lucknow', 'Kanpur', 'Agra', 'Varanasi', 'Bareilly', 'Meerut', 'Gorakhpur', 'Jhansi']
+COMMODITIES = ['Wheat', 'Paddy(Dhan)(Common)', 'Onion', 'Potato', 'Tomato', 'Mustard']
+
+
+def mandi_rows(count=500):
+    """Rows shaped like the mandi_data query (market ... modal_price)"""
+    start = datetime(2025, 5, 1)
+    rows = []
+    for i in range(count):
+        base = 1000 + 400 * (i % len(COMMODITIES))
+        rows.append((MARKETS[i % len(MARKETS)], COMMODITIES[(i // 3) % len(COMMODITIES)], 'Other', 'FAQ',
+                     start + timedelta(days=i % 30), base - 120 + i % 50, base + 180 + i % 70, base + i % 60))
+    return rows
+
+
+def weather_payload():
+    start = datetime(2025, 5, 1)
+    hourly = {'time': [(start + timedelta(hours=h)).strftime('%Y-%m-%dT%H:%M') for h in range(24 * 7)]}
+    full = {'hourly': hourly, 'daily': {'weathercode': [2, 3, 61, 1, 0, 80, 2]}}
+    return hourly, full
+
+
+def tone_wav(path, seconds=4.0, rate=48000):
+    """A mono 16-bit tone, about the length of a spoken question"""
+    frames = bytearray()
+    for n in range(int(seconds * rate)):
+        frames += int(6000 * math.sin(2 * math.pi * 220 * n / rate)).to_bytes(2, 'little', signed=True)
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(bytes(frames))
+
+
+# ----------------------------------------------------------------------------
+# Cases: each setup returns (callable, items per call)
+# ----------------------------------------------------------------------------
+
+def case_preprocess_text():
+    from models.chat_model import preprocess_text
+    return lambda: preprocess_text(LLM_ANSWER), 1
+
+
+def case_fertilizer_report():
+    from models.fertilizer_rec import AdvancedFertilizerRecommender
+    recommender = AdvancedFertilizerRecommender()
+    return lambda: recommender.generate_report(SOIL_VALUES, 'Wheat', 'Ramesh', 'Village Bakshi, District Lucknow'), 1
+
+
+def case_fertilizer_report_json():
+    from models.fertilizer_rec import AdvancedFertilizerRecommender
+    recommender = AdvancedFertilizerRecommender()
+    return lambda: recommender.generate_report_json(SOIL_VALUES, 'Wheat', 'Ramesh', 'Village Bakshi, District Lucknow'), 1
+
+
+def case_crop_varieties():
+    from models.soil_report import get_crop_varieties, CROP_VARIETY_PATH
+    if not os.path.exists(CROP_VARIETY_PATH):
+        raise Skip(f'{CROP_VARIETY_PATH} not present')
+    return lambda: get_crop_varieties('Wheat'), 1
+
+
+def _crop_model():
+    from models.soil_report import MODEL_PATH
+    if not os.path.exists(MODEL_PATH):
+        raise Skip(f'{MODEL_PATH} not present')
+
+
+def case_predict_crop():
+    _crop_model()
+    from models.soil_report import predict_crop
+    return lambda: predict_crop(*CROP_SAMPLE), 1
+
+
+def case_predict_crop_batch(size=100):
+    _crop_model()
+    from models.soil_report import predict_crops
+    samples = [CROP_SAMPLE[:2] + tuple(v * (1 + (i % 7) / 20) for v in CROP_SAMPLE[2:]) for i in range(size)]
+    return lambda: predict_crops(samples), size
+
+
+def case_mandi_dashboard_latest():
+    from models.mandi_dashboard import build_dashboard_data
+    rows = mandi_rows()
+    return lambda: build_dashboard_data(rows, 'latest'), len(rows)
+
+
+def case_mandi_dashboard_past():
+    from models.mandi_dashboard import build_dashboard_data
+    rows = mandi_rows()
+    return lambda: build_dashboard_data(rows, 'past'), len(rows)
+
+
+def case_hourly_weather_codes():
+    from models.fetch_weather import get_hourly_weather_codes
+    hourly, full = weather_payload()
+    return lambda: get_hourly_weather_codes(hourly, full), 1
+
+
+def _audio_fixture(workdir):
+    """speech_handler and a WebM recording, the format browsers upload"""
+    try:
+        from models import speech_handler
+    except Exception as e:
+        raise Skip(f'speech_handler unavailable: {e}')
+    wav = os.path.join(workdir, 'question.wav')
+    if not os.path.exists(wav):
+        tone_wav(wav)
+    if not shutil.which('ffmpeg'):
+        raise Skip('ffmpeg not found')
+    path = os.path.join(workdir, 'question.webm')
+    if not os.path.exists(path):
+        subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-i', wav, path], check=True)
+    return speech_handler, path
+
+
+def _without_temp_output(convert):
+    """Run a conversion and remove the temporary directory it wrote into"""
+    def run():
+        output = convert()
+        if output:
+            shutil.rmtree(os.path.dirname(str(output)), ignore_errors=True)
+    return run
+
+
+def case_audio_preprocess_webm(workdir):
+    speech_handler, path = _audio_fixture(workdir)
+    return _without_temp_output(lambda: speech_handler.preprocess_audio(path)), 1
+
+
+def case_audio_decode_wav_16k(workdir):
+    """A WAV already at 16 kHz mono is read with the wave module, no ffmpeg"""
+    try:
+        from models.audio_decode import decode_audio_file
+    except Exception as e:
+        raise Skip(f'audio_decode unavailable: {e}')
+    path = os.path.join(workdir, 'question16k.wav')
+    if not os.path.exists(path):
+        tone_wav(path, rate=16000)
+    return lambda: decode_audio_file(path), 1
+
+
+def case_audio_vad_trim(workdir):
+    """Energy VAD over 2 s of silence, a 4 s tone and 3 s of silence at 16 kHz"""
+    try:
+        import numpy as np
+        from models.vad import trim_silence
+    except Exception as e:
+        raise Skip(f'vad unavailable: {e}')
+    tone = (6000 * np.sin(2 * np.pi * 220 * np.arange(4 * 16000) / 16000)).astype(np.int16)
+    samples = np.concatenate([np.zeros(2 * 16000, np.int16), tone, np.zeros(3 * 16000, np.int16)])
+    return lambda: trim_silence(samples, 16000), 1
+
+
+def _speech_samples():
+    import numpy as np
+    return (6000 * np.sin(2 * np.pi * 220 * np.arange(4 * 16000) / 16000)).astype(np.int16)
+
+
+def case_audio_flac_encode(workdir):
+    """FLAC request body for 4 s of 16 kHz speech, encoded in memory from the samples"""
+    try:
+        from models.audio_decode import encode_flac
+    except Exception as e:
+        raise Skip(f'audio_decode unavailable: {e}')
+    samples = _speech_samples()
+    return lambda: encode_flac(samples), 1
+
+
+def case_audio_flac_encode_speech_recognition(workdir):
+    """The same body as speech_recognition builds it (WAV in memory, then its bundled flac binary)"""
+    try:
+        import speech_recognition as sr
+    except ImportError as e:
+        raise Skip(f'speech_recognition unavailable: {e}')
+    audio = sr.AudioData(_speech_samples().tobytes(), 16000, 2)
+    return lambda: audio.get_flac_data(convert_width=2), 1
+
+
+def case_audio_decode_in_memory(workdir):
+    speech_handler, path = _audio_fixture(workdir)
+    return lambda: speech_handler.load_audio_data(path), 1
+
+
+CASES = {
+    'text.preprocess_text': case_preprocess_text,
+    'soil.fertilizer_generate_report': case_fertilizer_report,
+    'soil.fertilizer_generate_report_json': case_fertilizer_report_json,
+    'soil.get_crop_varieties': case_crop_varieties,
+    'soil.predict_crop': case_predict_crop,
+    'soil.predict_crop_batch100': case_predict_crop_batch,
+    'mandi.dashboard_latest_500rows': case_mandi_dashboard_latest,
+    'mandi.dashboard_past_500rows': case_mandi_dashboard_past,
+    'weather.hourly_weather_codes': case_hourly_weather_codes,
+    'audio.preprocess_webm': case_audio_preprocess_webm,
+    'audio.decode_wav_16k': case_audio_decode_wav_16k,
+    'audio.decode_in_memory': case_audio_decode_in_memory,
+    'audio.vad_trim': case_audio_vad_trim,
+    'audio.flac_encode': case_audio_flac_encode,
+    'audio.flac_encode_speech_recognition': case_audio_flac_encode_speech_recognition,
+}
+AUDIO_CASES = {name for name in CASES if name.startswith('audio.')}
+
+
+# ----------------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------------
+
+def measure(fn, samples, min_time, warmup):
+    """Time ``fn`` in samples of calibrated iteration counts; returns (iterations, ops/sec per sample)"""
+    deadline = time.perf_counter() + warmup
+    calls = 0
+    while time.perf_counter() < deadline or calls == 0:
+        fn()
+        calls += 1
+
+    iterations = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        iterations = max(iterations + 1, int(iterations * min_time / max(elapsed, 1e-9) * 1.2))
+
+    rates = [iterations / elapsed]
+    for _ in range(samples - 1):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        rates.append(iterations / (time.perf_counter() - started))
+    return iterations, rates
+
+
+def summarize(rates, iterations, items):
+    mean = statistics.fmean(rates)
+    stdev = statistics.stdev(rates) if len(rates) > 1 else 0.0
+    margin = t_critical(len(rates) - 1) * stdev / math.sqrt(len(rates)) if len(rates) > 1 else 0.0
+    return {
+        'ops_per_sec': round(mean, 3),
+        'ci95_low': round(mean - margin, 3),
+        'ci95_high': round(mean + margin, 3),
+        'rel_margin_pct': round(100 * margin / mean, 2) if mean else 0.0,
+        'stdev': round(stdev, 3),
+        'samples': len(rates),
+        'iterations_per_sample': iterations,
+        'items_per_op': items,
+        'items_per_sec': round(mean * items, 3),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change per case against a baseline; returns the names of regressions"""
+    regressions = []
+    print(f"\n{'case':<40}{'baseline':>14}{'current':>14}{'change':>10}")
+    for name, current in results.items():
+        before = baseline.get('cases', {}).get(name)
+        if not before or 'ops_per_sec' not in before or 'ops_per_sec' not in current:
+            continue
+        change = (current['ops_per_sec'] - before['ops_per_sec']) / before['ops_per_sec']
+        # Overlapping intervals mean the difference may be noise even past the threshold
+        overlap = current['ci95_low'] <= before['ci95_high'] and before['ci95_low'] <= current['ci95_high']
+        flag = ''
+        if abs(change) > threshold:
+            flag = 'FASTER' if change > 0 else 'SLOWER'
+            if overlap:
+                flag += ' (CIs overlap)'
+            elif change < 0:
+                regressions.append(name)
+        print(f"{name:<40}{before['ops_per_sec']:>14.1f}{current['ops_per_sec']:>14.1f}{100 * change:>+9.1f}%  {flag}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', help='Only run cases whose name contains this text')
+    parser.add_argument('--list', action='store_true', help='List case names and exit')
+    parser.add_argument('--samples', type=int, default=15)
+    parser.add_argument('--min-time', type=float, default=0.1, help='Minimum seconds per sample')
+    parser.add_argument('--warmup', type=float, default=0.3, help='Seconds of untimed calls per case')
+    parser.add_argument('--json', help='Write results to this file')
+    parser.add_argument('--compare', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Relative change that gets flagged')
+    args = parser.parse_args()
+
+    names = [name for name in CASES if not args.filter or args.filter in name]
+    if args.list:
+        print('\n'.join(names))
+        return
+
+    # Case code resolves data and model paths relative to the repository root
+    os.chdir(REPO_ROOT)
+    workdir = tempfile.mkdtemp(prefix='microbench-')
+    results = {}
+    print(f"{'case':<40}{'ops/s':>14}{'95% CI':>26}")
+    try:
+        for name in names:
+            setup = CASES[name]
+            # The app's code prints freely; keep it out of the report
+            with redirect_stdout(io.StringIO()):
+                try:
+                    fn, items = setup(workdir) if name in AUDIO_CASES else setup()
+                except Skip as e:
+                    fn, reason = None, str(e)
+                except ImportError as e:
+                    fn, reason = None, f'missing dependency: {e}'
+            if fn is None:
+                results[name] = {'skipped': reason}
+                print(f"{name:<40}{'skipped':>14}  {reason}")
+                continue
+            with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+                iterations, rates = measure(fn, args.samples, args.min_time, args.warmup)
+            results[name] = summarize(rates, iterations, items)
+            r = results[name]
+            print(f"{name:<40}{r['ops_per_sec']:>14.1f}   [{r['ci95_low']:>10.1f}, {r['ci95_high']:>10.1f}]"
+                  f"  ±{r['rel_margin_pct']:.1f}%")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'started_at': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'config': {'samples': args.samples, 'min_time_s': args.min_time, 'warmup_s': args.warmup},
+                'cases': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower by more than {100 * args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
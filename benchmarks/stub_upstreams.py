@@ -0,0 +1,384 @@
+"""
+Local stand-ins for every external API the app calls, for offline load testing.
+
+Each upstream is served under its service name from models/http_client.py
+(/openrouter, /openrouter_vision, /huggingface, /google_stt, /gtts,
+/nominatim, /open_meteo, /data_gov) with canned payloads in the shape the
+app parses. Point the app at it with:
+
+    HTTP_STUB_URL=http://127.0.0.1:8099
+
+Every response can be delayed and made to fail. A profile has a base
+latency, random jitter, an error rate (answered with 503) and a rate-limit
+rate (answered with 429 and Retry-After). Profiles are set globally or per
+service on the command line, and can be changed while the server runs:
+
+    python benchmarks/stub_upstreams.py --port 8099 --latency 0.2 --jitter 0.1
+    python benchmarks/stub_upstreams.py --profile openrouter:latency=1.5,error=0.1 --profile gtts:ratelimit=0.2
+    curl -X POST localhost:8099/_stub/profile -d '{"service": "open_meteo", "latency": 2}'
+    curl localhost:8099/_stub/stats
+"""
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from datetime import datetime, timedelta
+from flask import Flask, Response, jsonify, request
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+SERVICES = ('openrouter', 'openrouter_vision', 'huggingface', 'google_stt',
+            'gtts', 'nominatim', 'open_meteo', 'data_gov')
+
+
+class Profile:
+    """Latency and failure behaviour for one stubbed service"""
+
+    FIELDS = ('latency', 'jitter', 'error', 'ratelimit')
+
+    def __init__(self, latency=0.0, jitter=0.0, error=0.0, ratelimit=0.0):
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.error = float(error)
+        self.ratelimit = float(ratelimit)
+
+    def update(self, **values):
+        for field, value in values.items():
+            if field not in self.FIELDS:
+                raise ValueError(f"Unknown profile field: {field}")
+            setattr(self, field, float(value))
+        return self
+
+    def copy(self):
+        return Profile(**self.to_dict())
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+
+def parse_profile(spec):
+    """Parse ``service:latency=0.5,error=0.1`` into (service, values)"""
+    service, _, fields = spec.partition(':')
+    if service not in SERVICES:
+        raise argparse.ArgumentTypeError(f"Unknown service '{service}'; expected one of {', '.join(SERVICES)}")
+    values = {}
+    for item in filter(None, fields.split(',')):
+        key, _, value = item.partition('=')
+        values[key.strip()] = float(value)
+    return service, values
+
+
+# ----------------------------------------------------------------------------
+# Canned payloads
+# ----------------------------------------------------------------------------
+
+CHAT_ANSWER = (
+    "For wheat, sow between late October and mid November. Apply 120 kg nitrogen, "
+    "60 kg phosphorus and 40 kg potassium per hectare, with half the nitrogen at sowing "
+    "and the rest at first irrigation."
+)
+
+PLANT_DIAGNOSIS = {
+    'plant_type': 'Tomato',
+    'disease': 'Early Blight',
+    'confidence': 0.87,
+    'recommendation': 'Remove infected leaves and spray mancozeb at 2 g per litre every 10 days.'
+}
+
+SOIL_PARAMETERS = {
+    'ph': 7.2, 'ec': 0.45, 'organic_carbon': 0.52, 'nitrogen': 240, 'phosphorus': 18.5,
+    'potassium': 160, 'zinc': 0.7, 'copper': 0.5, 'iron': 4.8, 'manganese': 2.1,
+    'sulphur': 12, 'district': None, 'state': None
+}
+
+TRANSCRIPTS = {
+    'hi': 'गेहूं की बुवाई कब करनी चाहिए',
+    'en': 'when should I sow wheat',
+}
+
+MANDI_STATES = (
+    ('Uttar Pradesh', 'Lucknow', 'Lucknow'), ('Madhya Pradesh', 'Indore', 'Indore'),
+    ('Punjab', 'Ludhiana', 'Khanna'), ('Maharashtra', 'Nashik', 'Lasalgaon'),
+    ('Rajasthan', 'Jaipur', 'Chomu'), ('Haryana', 'Karnal', 'Karnal'),
+)
+MANDI_COMMODITIES = (
+    ('Wheat', 'Dara', 2150), ('Paddy(Dhan)(Common)', 'Common', 2050), ('Onion', 'Red', 1400),
+    ('Potato', 'Desi', 900), ('Tomato', 'Hybrid', 1200), ('Mustard', 'Black', 5200),
+)
+
+
+def silent_mp3(frames=40):
+    """Silent MPEG-1 Layer III frames (128 kbps, 44.1 kHz), about one second"""
+    frame = b'\xff\xfb\x90\x44' + b'\x00' * 413
+    return frame * frames
+
+
+def chat_completion(content):
+    return {
+        'id': 'stub-completion',
+        'object': 'chat.completion',
+        'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+    }
+
+
+def request_text(payload):
+    """All text parts of an OpenAI-style messages payload"""
+    parts = []
+    for message in (payload or {}).get('messages', []):
+        content = message.get('content')
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(part.get('text', '') for part in content if isinstance(part, dict))
+    return ' '.join(parts)
+
+
+def forecast(lat, lon):
+    """Open-Meteo forecast for seven days in the app's requested variables"""
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    hours = [start + timedelta(hours=h) for h in range(24 * 7)]
+    days = [start + timedelta(days=d) for d in range(7)]
+    return {
+        'latitude': lat,
+        'longitude': lon,
+        'timezone': 'Asia/Kolkata',
+        'current_weather': {
+            'temperature': 29.4, 'windspeed': 11.2, 'winddirection': 240,
+            'weathercode': 2, 'time': datetime.now().strftime('%Y-%m-%dT%H:00')
+        },
+        'hourly': {
+            'time': [h.strftime('%Y-%m-%dT%H:%M') for h in hours],
+            'temperature_2m': [round(31 - 9 * abs(14 - h.hour) / 14, 1) for h in hours],
+            'relativehumidity_2m': [60 + (h.hour % 12) for h in hours],
+            'precipitation': [0.4 if h.day % 3 == 0 and 14 <= h.hour <= 17 else 0.0 for h in hours],
+            'windspeed_10m': [8 + (h.hour % 6) for h in hours],
+        },
+        'daily': {
+            'time': [d.strftime('%Y-%m-%d') for d in days],
+            'weathercode': [2, 3, 61, 1, 0, 80, 2],
+            'temperature_2m_max': [33.1, 32.4, 29.8, 31.0, 34.2, 30.5, 32.0],
+            'temperature_2m_min': [21.3, 22.0, 20.4, 19.8, 22.5, 21.1, 20.9],
+            'sunrise': [d.strftime('%Y-%m-%dT06:12') for d in days],
+            'sunset': [d.strftime('%Y-%m-%dT18:04') for d in days],
+            'uv_index_max': [7.1, 6.4, 3.2, 6.9, 7.5, 4.0, 6.8],
+            'precipitation_sum': [0.0, 0.8, 12.4, 0.0, 0.0, 6.2, 0.4],
+        },
+    }
+
+
+def mandi_records(offset, limit, total, arrival_date):
+    """A page of data.gov.in mandi price records; empty once ``total`` is reached"""
+    records = []
+    for index in range(offset, min(offset + limit, total)):
+        state, district, market = MANDI_STATES[index % len(MANDI_STATES)]
+        commodity, variety, base_price = MANDI_COMMODITIES[(index // len(MANDI_STATES)) % len(MANDI_COMMODITIES)]
+        spread = (index * 37) % 300
+        records.append({
+            'State': state, 'District': district, 'Market': market,
+            'Commodity': commodity, 'Variety': variety, 'Grade': 'FAQ',
+            'Arrival_Date': arrival_date,
+            'Min_Price': str(base_price - 150 + spread // 3),
+            'Max_Price': str(base_price + 150 + spread // 2),
+            'Modal_Price': str(base_price + spread // 4),
+        })
+    return records
+
+
+# ----------------------------------------------------------------------------
+# App
+# ----------------------------------------------------------------------------
+
+def create_app(default=None, overrides=None, mandi_total=12000, seed=None):
+    """
+    Build the stub app.
+
+    Args:
+        default: Profile applied to every service without an override
+        overrides: Dict of service name -> Profile
+        mandi_total: Number of mandi records served across all pages
+        seed: Seed for the failure injection, for repeatable runs
+    """
+    app = Flask(__name__)
+    default = default or Profile()
+    profiles = {service: (overrides or {}).get(service) or default.copy() for service in SERVICES}
+    stats = {service: {'requests': 0, 'errors': 0, 'rate_limited': 0} for service in SERVICES}
+    lock = threading.Lock()
+    rng = random.Random(seed)
+
+    def inject(service):
+        """Apply the service's profile; returns a failure response or None"""
+        profile = profiles[service]
+        with lock:
+            stats[service]['requests'] += 1
+            roll = rng.random()
+            delay = profile.latency + (rng.uniform(0, profile.jitter) if profile.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if roll < profile.ratelimit:
+            with lock:
+                stats[service]['rate_limited'] += 1
+            return Response(json.dumps({'error': {'code': 429, 'message': 'Rate limit exceeded'}}), status=429,
+                            mimetype='application/json', headers={'Retry-After': '1'})
+        if roll < profile.ratelimit + profile.error:
+            with lock:
+                stats[service]['errors'] += 1
+            return Response(json.dumps({'error': 'Service unavailable'}), status=503, mimetype='application/json')
+        return None
+
+    @app.route('/openrouter/api/v1/chat/completions', methods=['POST'])
+    def openrouter_chat():
+        failure = inject('openrouter')
+        if failure:
+            return failure
+        return jsonify(chat_completion(CHAT_ANSWER))
+
+    @app.route('/openrouter_vision/api/v1/chat/completions', methods=['POST'])
+    def openrouter_vision():
+        failure = inject('openrouter_vision')
+        if failure:
+            return failure
+        prompt = request_text(request.get_json(silent=True))
+        canned = SOIL_PARAMETERS if 'soil' in prompt.lower() else PLANT_DIAGNOSIS
+        return jsonify(chat_completion('```json\n' + json.dumps(canned) + '\n```'))
+
+    @app.route('/huggingface/models/<path:model>', methods=['POST'])
+    def huggingface(model):
+        failure = inject('huggingface')
+        if failure:
+            return failure
+        prompt = (request.get_json(silent=True) or {}).get('inputs', '')
+        return jsonify([{'generated_text': f"{prompt}\n{CHAT_ANSWER}"}])
+
+    @app.route('/google_stt/speech-api/v2/recognize', methods=['POST'])
+    def google_stt():
+        failure = inject('google_stt')
+        if failure:
+            return failure
+        request.get_data()
+        language = request.args.get('lang', 'en-US').split('-')[0]
+        transcript = TRANSCRIPTS.get(language, TRANSCRIPTS['en'])
+        result = {'result': [{'alternative': [{'transcript': transcript, 'confidence': 0.92}], 'final': True}],
+                  'result_index': 0}
+        body = json.dumps({'result': []}) + '\n' + json.dumps(result, ensure_ascii=False) + '\n'
+        return Response(body, mimetype='application/json')
+
+    audio = silent_mp3()
+
+    @app.route('/gtts/translate_tts', methods=['GET'])
+    def gtts():
+        failure = inject('gtts')
+        if failure:
+            return failure
+        return Response(audio, mimetype='audio/mpeg')
+
+    @app.route('/nominatim/reverse', methods=['GET'])
+    def nominatim():
+        failure = inject('nominatim')
+        if failure:
+            return failure
+        return jsonify({
+            'display_name': 'Bakshi Ka Talab, Lucknow, Uttar Pradesh, India',
+            'lat': request.args.get('lat'),
+            'lon': request.args.get('lon'),
+            'address': {'village': 'Bakshi Ka Talab', 'county': 'Lucknow', 'state_district': 'Lucknow',
+                        'state': 'Uttar Pradesh', 'country': 'India', 'country_code': 'in'}
+        })
+
+    @app.route('/open_meteo/v1/forecast', methods=['GET'])
+    def open_meteo():
+        failure = inject('open_meteo')
+        if failure:
+            return failure
+        return jsonify(forecast(request.args.get('latitude', type=float), request.args.get('longitude', type=float)))
+
+    @app.route('/data_gov/resource/<resource_id>', methods=['GET'])
+    def data_gov(resource_id):
+        failure = inject('data_gov')
+        if failure:
+            return failure
+        offset = request.args.get('offset', 0, type=int)
+        limit = request.args.get('limit', 10, type=int)
+        arrival = request.args.get('filters[Arrival_Date]') or datetime.now().strftime('%Y-%m-%d')
+        try:
+            arrival = datetime.strptime(arrival, '%Y-%m-%d').strftime('%d/%m/%Y')
+        except ValueError:
+            pass
+        records = mandi_records(offset, limit, mandi_total, arrival)
+        return jsonify({'index_name': resource_id, 'total': mandi_total, 'count': len(records),
+                        'offset': offset, 'limit': limit, 'records': records})
+
+    @app.route('/_stub/profile', methods=['GET', 'POST'])
+    def stub_profile():
+        if request.method == 'POST':
+            values = request.get_json(silent=True) or {}
+            service = values.pop('service', None)
+            targets = [service] if service else list(SERVICES)
+            if service and service not in SERVICES:
+                return jsonify({'error': f'Unknown service {service}'}), 400
+            try:
+                with lock:
+                    for target in targets:
+                        profiles[target].update(**values)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        with lock:
+            return jsonify({service: profile.to_dict() for service, profile in profiles.items()})
+
+    @app.route('/_stub/stats', methods=['GET', 'DELETE'])
+    def stub_stats():
+        with lock:
+            if request.method == 'DELETE':
+                for counters in stats.values():
+                    counters.update(requests=0, errors=0, rate_limited=0)
+            return jsonify(stats)
+
+    return app
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve_in_thread(app, host='127.0.0.1', port=0):
+    """Run the stub app on a background thread without request logging; returns (server, base_url)"""
+    server = make_server(host, port, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=int(os.getenv('STUB_PORT', '8099')))
+    parser.add_argument('--latency', type=float, default=float(os.getenv('STUB_LATENCY', '0')),
+                        help='Base delay in seconds before every response')
+    parser.add_argument('--jitter', type=float, default=float(os.getenv('STUB_JITTER', '0')),
+                        help='Extra random delay of up to this many seconds')
+    parser.add_argument('--error-rate', type=float, default=float(os.getenv('STUB_ERROR_RATE', '0')),
+                        help='Fraction of requests answered with 503')
+    parser.add_argument('--ratelimit-rate', type=float, default=float(os.getenv('STUB_RATELIMIT_RATE', '0')),
+                        help='Fraction of requests answered with 429')
+    parser.add_argument('--profile', type=parse_profile, action='append', default=[],
+                        help='Per-service override, e.g. openrouter:latency=1.5,error=0.1')
+    parser.add_argument('--mandi-records', type=int, default=12000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    default = Profile(args.latency, args.jitter, args.error_rate, args.ratelimit_rate)
+    overrides = {service: default.copy().update(**values) for service, values in args.profile}
+    app = create_app(default, overrides, mandi_total=args.mandi_records, seed=args.seed)
+
+    print(f"Stub upstreams on http://{args.host}:{args.port} (set HTTP_STUB_URL to this address)")
+    for service in SERVICES:
+        print(f"  /{service}: {(overrides.get(service) or default).to_dict()}")
+    server = make_server(args.host, args.port, app, threaded=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
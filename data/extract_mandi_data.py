@@ -1,5 +1,5 @@
 import os
-import requests
+import sys
 import json
 from datetime import datetime
 import mysql.connector
@@ -20,6 +20,10 @@ logging.basicConfig(
 # Load environment variables
 load_dotenv()
 
+# Run from anywhere: make the app's models package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.http_client import http_client
+
 def get_db_connection():
     """Create and return a database connection"""
     return mysql.connector.connect(
@@ -45,7 +49,7 @@ def fetch_mandi_data():
         if not api_key:
             raise ValueError("MANDI_API_KEY not found in environment variables")
 
-        base_url = "https://api.data.gov.in/resource/35985678-0d79-46b4-9ed6-6f13308a1d24"
+        base_url = http_client.url('data_gov', "/resource/35985678-0d79-46b4-9ed6-6f13308a1d24")
         limit = 5000
         offset = 0
         all_records = []
@@ -55,7 +59,7 @@ def fetch_mandi_data():
 
         while True:
             url = f"{base_url}?api-key={api_key}&format=json&limit={limit}&offset={offset}&filters%5BArrival_Date%5D={today_date}"
-            response = requests.get(url)
+            response = http_client.get('data_gov', url)
             response.raise_for_status()
 
             data = response.json()
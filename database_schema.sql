@@ -21,6 +21,8 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
     user_id INT NOT NULL,
     title VARCHAR(255) DEFAULT 'New Chat',
     language ENUM('english', 'hindi', 'bhojpuri', 'bundelkhandi', 'marathi', 'haryanvi', 'bengali', 'tamil', 'telugu', 'kannada', 'gujarati', 'urdu', 'malayalam', 'punjabi') DEFAULT 'hindi',
+    summary TEXT NULL,
+    summary_upto_id INT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
@@ -95,6 +97,30 @@ CREATE TABLE IF NOT EXISTS soil_reports (
     FOREIGN KEY (chat_id) REFERENCES chat_sessions(id) ON DELETE CASCADE
 );
 
+-- Background jobs for voice, image and soil report processing
+CREATE TABLE IF NOT EXISTS jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    kind VARCHAR(20) NOT NULL,
+    status VARCHAR(10) NOT NULL DEFAULT 'queued',
+    stage VARCHAR(30),
+    user_id INT,
+    chat_id VARCHAR(36),
+    payload TEXT NOT NULL,
+    partial TEXT,
+    result TEXT,
+    status_code INT,
+    error TEXT,
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_after TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    lease_expires_at TIMESTAMP NULL,
+    worker_id VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_status (status),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- Mandi data table
 CREATE TABLE IF NOT EXISTS mandi_data (
     id INT AUTO_INCREMENT PRIMARY KEY,
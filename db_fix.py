@@ -23,6 +23,7 @@ def update_schema():
         with conn.cursor() as cursor:
             # Drop existing tables if they exist to recreate with proper schema
             print("Dropping existing tables...")
+            cursor.execute("DROP TABLE IF EXISTS jobs")
             cursor.execute("DROP TABLE IF EXISTS soil_reports")
             cursor.execute("DROP TABLE IF EXISTS plant_images")
             cursor.execute("DROP TABLE IF EXISTS chat_history")
@@ -37,6 +38,8 @@ def update_schema():
                 user_id INT NULL,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 language VARCHAR(20) DEFAULT 'hindi',
+                summary TEXT NULL,
+                summary_upto_id INT NULL,
                 INDEX idx_user_id (user_id)
             )
             """)
@@ -98,6 +101,32 @@ def update_schema():
             )
             """)
             
+            print("Creating jobs table...")
+            cursor.execute("""
+            CREATE TABLE jobs (
+                id VARCHAR(36) PRIMARY KEY,
+                kind VARCHAR(20) NOT NULL,
+                status VARCHAR(10) NOT NULL DEFAULT 'queued',
+                stage VARCHAR(30) NULL,
+                user_id INT NULL,
+                chat_id VARCHAR(36) NULL,
+                payload TEXT NOT NULL,
+                partial TEXT NULL,
+                result TEXT NULL,
+                status_code INT NULL,
+                error TEXT NULL,
+                attempts INT NOT NULL DEFAULT 0,
+                max_attempts INT NOT NULL DEFAULT 3,
+                run_after DATETIME NOT NULL,
+                lease_expires_at DATETIME NULL,
+                worker_id VARCHAR(100) NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_status (status),
+                INDEX idx_user_id (user_id)
+            )
+            """)
+            
             # Create a test chat session (not associated with a user)
             test_chat_id = str(uuid.uuid4())
             print(f"Creating test chat session with ID: {test_chat_id}")
@@ -0,0 +1,113 @@
+"""
+Pre-generate the spoken fixed prompts (welcome, audio error, voice help) for
+every supported language into static/audio/prompts/<version>/.
+
+Run it when building the image or after changing a prompt text; the web app
+only looks these files up and never writes them:
+
+    python generate_audio_prompts.py
+    python generate_audio_prompts.py --languages hindi,tamil --force
+    python generate_audio_prompts.py --dry-run
+
+Files are named by a hash of (TTS language code, text), so prompts that share
+a text and voice (e.g. the Hindi-fallback languages) are generated once.
+Existing files are kept unless --force is given. Exits with status 1 if any
+prompt could not be synthesized, or with 0 and a warning under
+--allow-failures, which the image build uses since gTTS needs the network.
+A prompt that is missing is spoken through the TTS cache like any other
+answer until this is run again (by hand, or by gunicorn at startup with
+AUDIO_PROMPTS_GENERATE_ON_START=true).
+"""
+import os
+import sys
+import json
+import argparse
+import traceback
+from datetime import datetime
+
+from models.audio_prompts import AUDIO_PROMPTS_VERSION, prompts_dir, prompt_key, fixed_prompts
+from models.speech_handler import LANGUAGE_CODES, synthesize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--version', default=AUDIO_PROMPTS_VERSION, help='Asset directory to write (default: AUDIO_PROMPTS_VERSION)')
+    parser.add_argument('--languages', help='Comma separated languages (default: all)')
+    parser.add_argument('--force', action='store_true', help='Synthesize again even if the file exists')
+    parser.add_argument('--dry-run', action='store_true', help='List the prompts without synthesizing')
+    parser.add_argument('--allow-failures', action='store_true',
+                        help='Exit with status 0 and a warning if some prompts could not be synthesized')
+    args = parser.parse_args()
+
+    languages = list(LANGUAGE_CODES)
+    if args.languages:
+        languages = [language.strip().lower() for language in args.languages.split(',') if language.strip()]
+        unknown = [language for language in languages if language not in LANGUAGE_CODES]
+        if unknown:
+            parser.error(f"unknown languages: {', '.join(unknown)}")
+
+    directory = prompts_dir(args.version)
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, 'manifest.json')
+
+    # Keep entries for languages not regenerated this run
+    entries = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as f:
+            for entry in json.load(f).get('prompts', []):
+                entries[(entry['name'], entry['language'])] = entry
+    previous = dict(entries)
+
+    generated = reused = failed = 0
+    synthesized = set()
+    for name, language, lang_code, text in fixed_prompts(languages):
+        key = prompt_key(text, lang_code)
+        filename = f"{key}.mp3"
+        path = os.path.join(directory, filename)
+        entry = {'name': name, 'language': language, 'lang_code': lang_code,
+                 'text': text, 'key': key, 'file': filename}
+
+        if args.dry_run:
+            print(f"{name:12} {language:13} {lang_code}  {filename}  {text[:50]}")
+            continue
+
+        if key in synthesized or (os.path.exists(path) and not args.force):
+            reused += 1
+        else:
+            try:
+                synthesize(text, lang_code, path)
+                synthesized.add(key)
+                generated += 1
+                print(f"Generated {name} ({language}) -> {filename}")
+            except Exception:
+                failed += 1
+                print(f"Failed to generate {name} ({language}): {traceback.format_exc()}")
+                if os.path.exists(path):
+                    os.remove(path)
+                continue
+        entries[(name, language)] = entry
+
+    if args.dry_run:
+        return
+
+    # Running workers reload the manifest when it changes, so only rewrite it when it does,
+    # and replace it in one step so they never read half of it
+    if generated or entries != previous or not os.path.exists(manifest_path):
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': args.version,
+                'generated_at': datetime.now().isoformat(timespec='seconds'),
+                'prompts': sorted(entries.values(), key=lambda entry: (entry['name'], entry['language']))
+            }, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    print(f"{generated} generated, {reused} reused, {failed} failed; manifest at {manifest_path}")
+    if failed and args.allow_failures:
+        print(f"Warning: {failed} prompts are missing; they are spoken with live TTS until this is run again")
+        sys.exit(0)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
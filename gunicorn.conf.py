@@ -0,0 +1,33 @@
+# Gunicorn settings (gunicorn -c gunicorn.conf.py app:app)
+#
+# Nearly all request time is spent waiting on upstream APIs (OpenRouter,
+# Google STT, gTTS, Nominatim, Open-Meteo), so the gevent worker class lets
+# one worker hold hundreds of in-flight requests instead of one. Under gevent,
+# CPU-heavy steps are moved off the event loop (see models/cooperative.py).
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '4'))
+# 'sync' (one request per worker) or 'gevent' (cooperative I/O)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'sync')
+# Concurrent requests per gevent worker
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', '500'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '30'))
+# Synthesize fixed audio prompts missing from the image (built without network) at startup;
+# off by default, as the Dockerfile generates them at build time
+generate_audio_prompts = os.getenv('AUDIO_PROMPTS_GENERATE_ON_START', 'false').lower() == 'true'
+
+
+def when_ready(server):
+    # In a separate process so workers start serving right away; they pick the prompts up as they appear
+    if generate_audio_prompts:
+        import sys
+        import subprocess
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'generate_audio_prompts.py')
+        subprocess.Popen([sys.executable, script, '--allow-failures'])
+
+
+def post_worker_init(worker):
+    # Heavy ML/media libraries load on first use; WARMUP_MODULES loads them here instead
+    from models.warmup import warm_up
+    warm_up()
@@ -3,6 +3,7 @@ import os
 from dotenv import load_dotenv
 from flask import Flask
 from models.chat_model import db
+from models.database import migrate_schema
 
 load_dotenv()
 
@@ -43,6 +44,7 @@ def create_tables():
     with app.app_context():
         db.create_all()
         print("Database tables created successfully!")
+        migrate_schema()
 
 if __name__ == '__main__':
     create_database()
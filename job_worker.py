@@ -0,0 +1,18 @@
+"""
+Standalone job worker for the voice, image and soil report endpoints.
+
+Run one or more of these next to the web server with JOB_QUEUE_MODE=worker so
+the web workers only enqueue jobs and return immediately:
+
+    python job_worker.py
+
+Every job needs the speech or OCR libraries, so they are loaded before the
+first job is claimed rather than lazily as in the web workers.
+"""
+from app import app
+from models.job_queue import JobWorkerPool, JOB_WORKERS
+from models.warmup import warm_up, WARMUP_TARGETS
+
+if __name__ == '__main__':
+    warm_up(list(WARMUP_TARGETS))
+    JobWorkerPool(app, size=JOB_WORKERS).run_forever()
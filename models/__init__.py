@@ -3,6 +3,7 @@ from .database import db
 from .user import User
 from .chat_model import ChatSession, ChatMessage, PlantImage, SoilReport
 from .auction_models import Commodity, District, CropForSale, Bid
+from .job_queue import Job
 
 __all__ = [
     'db',
@@ -14,5 +15,6 @@ __all__ = [
     'Commodity',
     'District',
     'CropForSale',
-    'Bid'
+    'Bid',
+    'Job'
 ] 
\ No newline at end of file
@@ -0,0 +1,332 @@
+"""
+Decode voice uploads to 16 kHz mono 16-bit PCM.
+
+The container is identified from the first bytes of the upload, not its file
+name or MIME type, and exactly one decoder is used for it:
+
+    webm/mkv (EBML)  ffmpeg, matroska demuxer, piped
+    ogg (OggS)       ffmpeg, ogg demuxer, piped
+    opus16k          ogg whose OpusHead says mono captured at 16 kHz (chat.js's
+                     worklet recorder): decoded like ogg (Opus always decodes
+                     at 48 kHz), counted separately in /metrics/audio
+    mp3 (ID3/sync)   ffmpeg, mp3 demuxer, piped
+    flac (fLaC)      ffmpeg, flac demuxer, piped
+    mp4/m4a (ftyp)   ffmpeg, mov demuxer, reading the file (the index may be at the end)
+    wav (RIFF/WAVE)  Python's wave module when already 16 kHz mono 16-bit, else ffmpeg
+
+encode_flac turns decoded PCM into the FLAC body sent to Google Speech, and
+encode_opus_file turns synthesized MP3 into the low-bitrate Ogg Opus served
+to clients that can play it.
+
+Failures raise AudioDecodeError with a code (see ERROR_CODES) so callers and
+logs can tell an unsupported upload from a broken decoder. Decode latency
+and failures are recorded per format for /metrics/audio.
+"""
+import io
+import os
+import time
+import wave
+import shutil
+import threading
+import subprocess
+
+SAMPLE_RATE = 16000
+# ffmpeg executable used for every compressed format
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+# Seconds one ffmpeg decode may take
+AUDIO_DECODE_TIMEOUT = float(os.getenv('AUDIO_DECODE_TIMEOUT', '30'))
+
+ERROR_CODES = {
+    'empty_upload': 'The upload contains no data',
+    'unsupported_format': 'The upload is not a recognised audio container',
+    'decoder_unavailable': 'ffmpeg is not installed or not on PATH',
+    'decode_timeout': 'Decoding took longer than AUDIO_DECODE_TIMEOUT',
+    'decode_failed': 'The decoder rejected the upload',
+    'no_audio': 'The upload decoded to zero samples',
+}
+
+# ffmpeg demuxer per sniffed format, and whether it must read the file rather than a pipe
+FFMPEG_DEMUXERS = {
+    'webm': ('matroska', False),
+    'ogg': ('ogg', False),
+    'opus16k': ('ogg', False),
+    'mp3': ('mp3', False),
+    'flac': ('flac', False),
+    'mp4': ('mov', True),
+    'wav': ('wav', False),
+}
+
+
+class AudioDecodeError(Exception):
+    """Raised when an upload cannot be decoded to PCM; code is a key of ERROR_CODES"""
+
+    def __init__(self, code, detail=None, audio_format=None):
+        self.code = code
+        self.detail = detail
+        self.audio_format = audio_format
+        super().__init__(f"{code}: {detail or ERROR_CODES.get(code, '')}")
+
+
+def sniff_audio_format(header):
+    """
+    Identify an audio container from its first bytes
+
+    Args:
+        header: At least the first 12 bytes of the file
+
+    Returns:
+        str: 'webm', 'ogg', 'wav', 'mp3', 'mp4', 'flac', or None if unrecognised
+    """
+    if header.startswith(b'\x1a\x45\xdf\xa3'):
+        return 'webm'
+    if header.startswith(b'OggS'):
+        return 'ogg'
+    if header[:4] == b'RIFF' and header[8:12] == b'WAVE':
+        return 'wav'
+    if header.startswith(b'fLaC'):
+        return 'flac'
+    if header[4:8] == b'ftyp':
+        return 'mp4'
+    if header.startswith(b'ID3'):
+        return 'mp3'
+    # MPEG audio frame sync: 11 set bits, then a valid version and layer
+    if len(header) >= 2 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0 and (header[1] & 0x06) != 0:
+        return 'mp3'
+    return None
+
+
+def _opus_head(audio_bytes):
+    """(channels, input sample rate) from the OpusHead on an Ogg file's first page, or None"""
+    if len(audio_bytes) < 28:
+        return None
+    body = 27 + audio_bytes[26]
+    head = audio_bytes[body:body + 16]
+    if len(head) < 16 or not head.startswith(b'OpusHead'):
+        return None
+    return head[9], int.from_bytes(head[12:16], 'little')
+
+
+class DecodeStats:
+    """Per-format decode counts, failures and latency for this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._formats = {}
+
+    def observe(self, audio_format, seconds, error_code=None):
+        with self._lock:
+            stats = self._formats.setdefault(audio_format or 'unknown', {
+                'decodes': 0, 'errors': {}, 'seconds_sum': 0.0, 'seconds_max': 0.0
+            })
+            if error_code:
+                stats['errors'][error_code] = stats['errors'].get(error_code, 0) + 1
+                return
+            stats['decodes'] += 1
+            stats['seconds_sum'] += seconds
+            stats['seconds_max'] = max(stats['seconds_max'], seconds)
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                audio_format: {
+                    'decodes': stats['decodes'],
+                    'errors': dict(stats['errors']),
+                    'latency_avg_s': round(stats['seconds_sum'] / stats['decodes'], 4) if stats['decodes'] else 0.0,
+                    'latency_max_s': round(stats['seconds_max'], 4),
+                }
+                for audio_format, stats in self._formats.items()
+            }
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            '# TYPE audio_decode_total counter',
+            '# TYPE audio_decode_errors_total counter',
+            '# TYPE audio_decode_seconds_sum counter',
+        ]
+        with self._lock:
+            for audio_format, stats in sorted(self._formats.items()):
+                label = f'format="{audio_format}"'
+                lines.append(f"audio_decode_total{{{label}}} {stats['decodes']}")
+                lines.append(f"audio_decode_seconds_sum{{{label}}} {stats['seconds_sum']:.6f}")
+                for code, count in sorted(stats['errors'].items()):
+                    lines.append(f'audio_decode_errors_total{{{label},code="{code}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+decode_stats = DecodeStats()
+
+
+def _decode_wav_directly(audio_bytes):
+    """PCM frames of a WAV that is already 16 kHz mono 16-bit, or None if it needs converting"""
+    import numpy as np
+    try:
+        with wave.open(io.BytesIO(audio_bytes), 'rb') as wav:
+            if (wav.getframerate(), wav.getnchannels(), wav.getsampwidth(), wav.getcomptype()) != (SAMPLE_RATE, 1, 2, 'NONE'):
+                return None
+            return np.frombuffer(wav.readframes(wav.getnframes()), dtype='<i2').astype(np.int16)
+    except (wave.Error, EOFError):
+        return None
+
+
+def _decode_with_ffmpeg(audio_format, audio_bytes, path):
+    import numpy as np
+
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise AudioDecodeError('decoder_unavailable', f"{FFMPEG_BINARY} not found", audio_format)
+
+    demuxer, from_file = FFMPEG_DEMUXERS[audio_format]
+    source = path if (from_file and path) else 'pipe:0'
+    command = [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error',
+               '-f', demuxer, '-i', source,
+               '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1']
+    try:
+        result = subprocess.run(
+            command, input=None if source == path else audio_bytes,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=AUDIO_DECODE_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError('decode_timeout', f"ffmpeg took longer than {AUDIO_DECODE_TIMEOUT:.0f}s", audio_format)
+    if result.returncode != 0:
+        detail = result.stderr.decode('utf-8', 'replace').strip() or f"ffmpeg exited with {result.returncode}"
+        raise AudioDecodeError('decode_failed', detail, audio_format)
+    return np.frombuffer(result.stdout, dtype=np.int16)
+
+
+def decode_audio(audio_bytes, path=None):
+    """
+    Decode an upload to PCM with the one decoder its format calls for
+
+    Args:
+        audio_bytes: Contents of the upload
+        path: Where the upload is stored, for formats ffmpeg must seek in
+
+    Returns:
+        tuple: (format, numpy.ndarray of int16 samples at SAMPLE_RATE)
+    """
+    start = time.perf_counter()
+    audio_format = None
+    try:
+        if not audio_bytes:
+            raise AudioDecodeError('empty_upload')
+        audio_format = sniff_audio_format(audio_bytes[:16])
+        if audio_format is None:
+            raise AudioDecodeError('unsupported_format', f"unrecognised header {audio_bytes[:16].hex()}")
+        if audio_format == 'ogg' and _opus_head(audio_bytes) == (1, SAMPLE_RATE):
+            audio_format = 'opus16k'
+
+        samples = _decode_wav_directly(audio_bytes) if audio_format == 'wav' else None
+        if samples is None:
+            samples = _decode_with_ffmpeg(audio_format, audio_bytes, path)
+        if samples.size == 0:
+            raise AudioDecodeError('no_audio', audio_format=audio_format)
+    except AudioDecodeError as e:
+        e.audio_format = e.audio_format or audio_format
+        decode_stats.observe(audio_format, time.perf_counter() - start, error_code=e.code)
+        raise
+
+    elapsed = time.perf_counter() - start
+    decode_stats.observe(audio_format, elapsed)
+    print(f"Decoded {samples.size / SAMPLE_RATE:.1f}s of {audio_format} audio in {elapsed * 1000:.0f} ms")
+    return audio_format, samples
+
+
+def decode_audio_file(path):
+    """decode_audio for a stored upload"""
+    with open(path, 'rb') as f:
+        return decode_audio(f.read(), path)
+
+
+# Containers that can be decoded while they are still being recorded
+STREAMABLE_FORMATS = ('webm', 'ogg', 'opus16k')
+
+
+def open_stream_decoder(audio_format):
+    """
+    Start an ffmpeg process that decodes a container as it is written to its stdin
+
+    Args:
+        audio_format: One of STREAMABLE_FORMATS, as sniffed from the first bytes
+
+    Returns:
+        subprocess.Popen: Write the container to stdin; 16 kHz mono s16le PCM comes out of stdout
+    """
+    if audio_format not in STREAMABLE_FORMATS:
+        raise AudioDecodeError('unsupported_format', f"{audio_format} cannot be decoded as a stream", audio_format)
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise AudioDecodeError('decoder_unavailable', f"{FFMPEG_BINARY} not found", audio_format)
+    demuxer, _ = FFMPEG_DEMUXERS[audio_format]
+    # No probing, so PCM starts flowing with the first pages rather than after a few seconds
+    return subprocess.Popen(
+        [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error',
+         '-f', demuxer, '-analyzeduration', '0', '-probesize', '32', '-i', 'pipe:0',
+         '-f', 's16le', '-acodec', 'pcm_s16le', '-ac', '1', '-ar', str(SAMPLE_RATE), 'pipe:1'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=0
+    )
+
+
+def sniff_stream_format(header):
+    """sniff_audio_format for the first message of a stream, telling 16 kHz mono Opus apart"""
+    audio_format = sniff_audio_format(header[:16])
+    if audio_format == 'ogg' and _opus_head(header) == (1, SAMPLE_RATE):
+        return 'opus16k'
+    return audio_format
+
+
+def encode_flac(samples, sample_rate=SAMPLE_RATE):
+    """
+    Encode PCM to FLAC in memory, in one pass and without a WAV in between
+
+    Args:
+        samples: int16 numpy array, mono
+        sample_rate: Sample rate of samples
+
+    Returns:
+        bytes: A complete FLAC stream
+    """
+    try:
+        import soundfile as sf
+    except (ImportError, OSError):
+        sf = None
+    if sf is not None:
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format='FLAC', subtype='PCM_16')
+        return buffer.getvalue()
+
+    # libsndfile missing: let ffmpeg encode the raw samples from a pipe
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise AudioDecodeError('decoder_unavailable', "neither soundfile nor ffmpeg can encode FLAC")
+    result = subprocess.run(
+        [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error',
+         '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0', '-f', 'flac', 'pipe:1'],
+        input=samples.tobytes(), stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=AUDIO_DECODE_TIMEOUT
+    )
+    if result.returncode != 0:
+        raise AudioDecodeError('decode_failed', result.stderr.decode('utf-8', 'replace').strip(), 'flac')
+    return result.stdout
+
+
+def encode_opus_file(source_path, target_path, bitrate):
+    """
+    Transcode an audio file to mono Ogg Opus tuned for speech
+
+    Args:
+        source_path: File ffmpeg can read, e.g. a gTTS MP3
+        target_path: Where to write the Ogg file
+        bitrate: Target bitrate as ffmpeg takes it, e.g. '12k'
+
+    Raises:
+        AudioDecodeError: If ffmpeg is missing or fails
+    """
+    if shutil.which(FFMPEG_BINARY) is None:
+        raise AudioDecodeError('decoder_unavailable', f"{FFMPEG_BINARY} not found")
+    try:
+        result = subprocess.run(
+            [FFMPEG_BINARY, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y', '-i', source_path,
+             '-ac', '1', '-c:a', 'libopus', '-b:a', bitrate, '-application', 'voip', '-f', 'ogg', target_path],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=AUDIO_DECODE_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        raise AudioDecodeError('decode_timeout', f"ffmpeg took longer than {AUDIO_DECODE_TIMEOUT:.0f}s", 'opus')
+    if result.returncode != 0:
+        raise AudioDecodeError('decode_failed', result.stderr.decode('utf-8', 'replace').strip(), 'opus')
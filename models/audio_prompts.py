@@ -0,0 +1,139 @@
+"""
+Pre-generated speech for the fixed prompts the app speaks.
+
+The welcome message, the audio error message and the "could not understand
+your audio" reply never change at runtime, so generate_audio_prompts.py
+synthesizes them once per language into static/audio/prompts/<version>/,
+one MP3 per hash of (TTS language code, text), plus a manifest.json. At
+runtime text_to_speech only looks a text up here and never writes prompt
+files; a prompt that is missing (e.g. the image was built without network)
+is spoken through the TTS cache like any other answer. The manifest is read
+again when it changes, so prompts generated later, by running the script
+or with AUDIO_PROMPTS_GENERATE_ON_START, reach running workers.
+
+Bump AUDIO_PROMPTS_VERSION when the voice or the audio format changes so
+old and new assets can live side by side during a deploy.
+"""
+import os
+import json
+import hashlib
+import threading
+
+# Asset set to serve; generate_audio_prompts.py writes into the directory of the same name
+AUDIO_PROMPTS_VERSION = os.getenv('AUDIO_PROMPTS_VERSION', 'v1')
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPTS_URL_PREFIX = 'static/audio/prompts'
+
+# Spoken when a voice reply cannot be produced, by TTS language code
+AUDIO_ERROR_MESSAGES = {
+    'en': "Sorry, there was an error processing your audio.",
+    'hi': "क्षमा करें, आपके ऑडियो को प्रोसेस करने में एक त्रुटि हुई है।",
+    'bn': "দুঃখিত, আপনার অডিও প্রসেস করার সময় একটি ত্রুটি হয়েছে।",
+    'mr': "क्षमा करा, आपल्या ऑडिओवर प्रक्रिया करताना एक त्रुटी झाली आहे।",
+    'ta': "மன்னிக்கவும், உங்கள் ஆடியோவை செயலாக்குவதில் பிழை ஏற்பட்டது.",
+    'te': "క్షమించండి, మీ ఆడియోను ప్రాసెస్ చేయడంలో లోపం ఉంది.",
+    'kn': "ಕ್ಷಮಿಸಿ, ನಿಮ್ಮ ಆಡಿಯೊವನ್ನು ಪ್ರಕ್ರಿಯೆಗೊಳಿಸುವಲ್ಲಿ ದೋಷ ಉಂಟಾಗಿದೆ.",
+    'gu': "માફ કરશો, તમારી ઓડિયો પ્રોસેસ કરવામાં ભૂલ આવી.",
+    'ur': "معذرت، آپ کی آڈیو پر کارروائی کرنے میں ایک خرابی پیش آئی۔",
+    'ml': "ക്ഷമിക്കണം, നിങ്ങളുടെ ഓഡിയോ പ്രോസസ്സ് ചെയ്യുന്നതിൽ ഒരു പിശക് സംഭവിച്ചു.",
+    'pa': "ਮਾਫ ਕਰਨਾ, ਤੁਹਾਡੇ ਆਡੀਓ ਨੂੰ ਪ੍ਰੋਸੈਸ ਕਰਨ ਵਿੱਚ ਇੱਕ ਗਲਤੀ ਹੋਈ ਹੈ।"
+}
+
+# Reply to a voice message that could not be transcribed (English, otherwise Hindi)
+VOICE_HELP_MESSAGES = {
+    'english': "I couldn't understand your audio. Please try typing your message or speaking more clearly.",
+    'hindi': "मुझे आपकी आवाज़ समझ नहीं आई। कृपया अपना संदेश टाइप करें या स्पष्ट रूप से बोलें।"
+}
+
+PROMPT_NAMES = ('welcome', 'audio_error', 'voice_help')
+
+
+def prompts_dir(version=AUDIO_PROMPTS_VERSION):
+    return os.path.join(BASE_DIR, 'static', 'audio', 'prompts', version)
+
+
+def prompt_key(text, lang_code):
+    """File name stem for the audio of text spoken in lang_code"""
+    return hashlib.sha256(f"{lang_code}\n{text}".encode('utf-8')).hexdigest()[:24]
+
+
+def tts_language_code(language):
+    from .speech_handler import LANGUAGE_CODES
+    return LANGUAGE_CODES.get(language.lower(), language)
+
+
+def prompt_text(name, language):
+    """
+    Text of a fixed prompt in a language
+
+    Args:
+        name: One of PROMPT_NAMES
+        language: Language name as used by the chat ("hindi", "tamil", ...)
+    """
+    if name == 'welcome':
+        from .chat_model import get_welcome_message
+        return get_welcome_message(language)
+    if name == 'audio_error':
+        return AUDIO_ERROR_MESSAGES.get(tts_language_code(language), AUDIO_ERROR_MESSAGES['hi'])
+    if name == 'voice_help':
+        return VOICE_HELP_MESSAGES['english' if language == 'english' else 'hindi']
+    raise ValueError(f"Unknown prompt '{name}'")
+
+
+def fixed_prompts(languages):
+    """Yield (name, language, lang_code, text) for every fixed prompt in every language"""
+    for language in languages:
+        lang_code = tts_language_code(language)
+        for name in PROMPT_NAMES:
+            yield name, language, lang_code, prompt_text(name, language)
+
+
+_available = None
+_available_mtime = None
+_available_lock = threading.Lock()
+
+
+def _available_keys():
+    """Keys listed in the manifest whose files exist, read again whenever the manifest changes"""
+    global _available, _available_mtime
+    directory = prompts_dir()
+    manifest_path = os.path.join(directory, 'manifest.json')
+    try:
+        mtime = os.stat(manifest_path).st_mtime_ns
+    except OSError:
+        mtime = None
+    if _available is None or mtime != _available_mtime:
+        with _available_lock:
+            if _available is None or mtime != _available_mtime:
+                keys = set()
+                try:
+                    with open(manifest_path, encoding='utf-8') as f:
+                        manifest = json.load(f)
+                    keys = {
+                        entry['key'] for entry in manifest.get('prompts', [])
+                        if os.path.exists(os.path.join(directory, entry['file']))
+                    }
+                except (OSError, ValueError) as e:
+                    print(f"No audio prompts for {AUDIO_PROMPTS_VERSION} ({e}); run generate_audio_prompts.py")
+                _available = keys
+                _available_mtime = mtime
+    return _available
+
+
+def prompt_audio(text, lang_code):
+    """
+    Static path of the pre-generated audio for text, or None if there is none
+
+    Returns:
+        str: Path like static/audio/prompts/v1/<key>.mp3, as text_to_speech returns
+    """
+    key = prompt_key(text, lang_code)
+    if key in _available_keys():
+        return f"{PROMPTS_URL_PREFIX}/{AUDIO_PROMPTS_VERSION}/{key}.mp3"
+    return None
+
+
+def error_audio(language):
+    """Pre-generated audio error message for a language, or None"""
+    return prompt_audio(prompt_text('audio_error', language), tts_language_code(language))
@@ -1,5 +1,4 @@
 import os
-import requests
 from dotenv import load_dotenv
 import json
 import re
@@ -7,6 +6,12 @@ import unicodedata
 from datetime import datetime
 import uuid
 from .database import db
+from .single_flight import SingleFlight, make_key
+from .knowledge_retriever import retrieve as retrieve_knowledge
+from .local_llm import get_local_llm, LocalLLMUnavailable
+from .intent_router import route_query, local_route
+from .local_answers import answer_locally, is_mandi_commodity
+from .http_client import http_client
 
 load_dotenv()
 
@@ -17,6 +22,8 @@ class ChatSession(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     language = db.Column(db.String(20), default='hindi')
+    summary = db.Column(db.Text, nullable=True)  # Rolling summary of messages older than the recent window
+    summary_upto_id = db.Column(db.Integer, nullable=True)  # Last message ID folded into the summary
     messages = db.relationship('ChatMessage', backref='chat_session', lazy=True, cascade='all, delete-orphan')
 
 class ChatMessage(db.Model):
@@ -161,26 +168,87 @@ def preprocess_text(text):
     
     return text.strip()
 
+# Coalesces identical in-flight text queries into one upstream call
+_text_query_flight = SingleFlight('text_query')
+
+def normalize_query_key(query):
+    """Normalize a query for coalescing (case, whitespace and Unicode form)"""
+    return ' '.join(preprocess_text(query).lower().split())
+
 # Using OpenRouter API for models
-def process_text_query(query, language='hindi'):
+def process_text_query(query, language='hindi', chat_id=None):
     """
     Process a text query in the specified language and return a response.
     
+    When chat_id is given, recent messages and the session's rolling summary
+    are sent along so follow-up questions keep their context. Concurrent
+    calls with the same normalized query, language and context share a
+    single upstream call. Explicit forecast and mandi price requests are
+    answered from the chat owner's location and the mandi data instead.
+    
     Args:
         query: The text input from the user
         language: The language code (english, hindi, etc.)
+        chat_id: Optional chat session ID to pull conversation context and the user from
     
     Returns:
         str: Response in the same language as the input
     """
+    # Imported here because conversation_context imports the models above
+    from .conversation_context import build_context, context_fingerprint
+    
+    # Explicit forecast and price requests are answered from the app's own data. The
+    # answer depends on the asker's location, so it is not shared through the single-flight
+    intent = local_route(preprocess_text(query), is_mandi_commodity)
+    if intent:
+        answer = answer_locally(intent, query, language, chat_user(chat_id))
+        if answer:
+            print(f"Answered '{intent}' query from app data")
+            return preprocess_text(answer)
+    
+    context = None
+    if chat_id:
+        try:
+            context = build_context(chat_id, query)
+        except Exception as e:
+            print(f"Error building conversation context: {e}")
+    
+    key = make_key(normalize_query_key(query), language, context_fingerprint(context))
+    return _text_query_flight.do(key, _process_text_query, query, language, context)
+
+def chat_user(chat_id):
+    """User who owns a chat session, or None"""
+    if not chat_id:
+        return None
+    from .user import User
+    try:
+        chat_session = db.session.get(ChatSession, chat_id)
+        return db.session.get(User, chat_session.user_id) if chat_session and chat_session.user_id else None
+    except Exception as e:
+        print(f"Error loading chat user: {e}")
+        return None
+
+def _process_text_query(query, language='hindi', context=None):
+    """Uncoalesced implementation of process_text_query"""
     try:
         # Clean user input
         clean_query = preprocess_text(query)
         
+        # Answer confident crop/scheme lookups locally; otherwise ground the LLM with the best passages
+        try:
+            knowledge = retrieve_knowledge(clean_query, language)
+            if knowledge['answer']:
+                print("Answered from local knowledge base")
+                return preprocess_text(knowledge['answer'])
+            if knowledge['passages']:
+                context = dict(context or {}, knowledge=knowledge['passages'])
+        except Exception as kb_error:
+            print(f"Knowledge base lookup error: {kb_error}")
+        
         # If we're using OpenRouter
         if OPENROUTER_API_KEY:
             try:
-                response = process_with_openrouter(clean_query, language)
+                response = process_with_openrouter(clean_query, language, context)
                 print(response)
                 return preprocess_text(response)
             except Exception as api_error:
@@ -188,30 +256,30 @@ def process_text_query(query, language='hindi'):
                 # Try with HuggingFace if OpenRouter fails
                 if HUGGINGFACE_API_KEY:
                     try:
-                        response = process_with_huggingface(clean_query, language)
+                        response = process_with_huggingface(clean_query, language, context)
                         return preprocess_text(response)
                     except Exception as hf_error:
                         print(f"HuggingFace API error: {hf_error}")
-                        # Fall back to demo response if both APIs fail
-                        response = demo_response(clean_query, language)
+                        # Fall back to local model / demo response if both APIs fail
+                        response = offline_response(clean_query, language, context)
                         return preprocess_text(response)
                 else:
-                    # Fall back to demo response if HuggingFace not available
-                    response = demo_response(clean_query, language)
+                    # Fall back to local model / demo response if HuggingFace not available
+                    response = offline_response(clean_query, language, context)
                     return preprocess_text(response)
         # Fallback to HuggingFace
         elif HUGGINGFACE_API_KEY:
             try:
-                response = process_with_huggingface(clean_query, language)
+                response = process_with_huggingface(clean_query, language, context)
                 return preprocess_text(response)
             except Exception as hf_error:
                 print(f"HuggingFace API error: {hf_error}")
-                # Fall back to demo response if HuggingFace fails
-                response = demo_response(clean_query, language)
+                # Fall back to local model / demo response if HuggingFace fails
+                response = offline_response(clean_query, language, context)
                 return preprocess_text(response)
-        # Local fallback for demo
+        # Local fallback when no API keys are configured
         else:
-            response = demo_response(clean_query, language)
+            response = offline_response(clean_query, language, context)
             return preprocess_text(response)
     
     except Exception as e:
@@ -222,17 +290,34 @@ def process_text_query(query, language='hindi'):
         else:
             return ERROR_MESSAGES['english']
 
-def process_with_openrouter(query, language):
-    """Use OpenRouter API to process the query"""
-    
-    # Get language display name for clearer instructions
+def get_system_prompt(language):
+    """Return the assistant system prompt for the given language"""
     language_display = LANGUAGE_NAMES.get(language, language)
-    
-    # Define a system prompt based on language
     if language == 'english':
-        system_prompt = f"You are an AI agricultural assistant named 'AI ग्रीन साथी' helping farmers. Answer questions concisely and clearly in English only. Provide practical advice for farming problems."
-    else:  # Other Indian languages
-        system_prompt = f"आप 'AI ग्रीन साथी' नाम के एक AI कृषि सहायक हैं जो किसानों की मदद कर रहे हैं। प्रश्नों का उत्तर केवल {language_display} भाषा में संक्षेप में और स्पष्ट रूप से दें। खेती की समस्याओं के लिए व्यावहारिक सलाह प्रदान करें। अपने उत्तर में अंग्रेजी का प्रयोग न करें।"
+        return "You are an AI agricultural assistant named 'AI ग्रीन साथी' helping farmers. Answer questions concisely and clearly in English only. Provide practical advice for farming problems."
+    # Other Indian languages
+    return f"आप 'AI ग्रीन साथी' नाम के एक AI कृषि सहायक हैं जो किसानों की मदद कर रहे हैं। प्रश्नों का उत्तर केवल {language_display} भाषा में संक्षेप में और स्पष्ट रूप से दें। खेती की समस्याओं के लिए व्यावहारिक सलाह प्रदान करें। अपने उत्तर में अंग्रेजी का प्रयोग न करें।"
+
+def build_chat_messages(query, language, context=None):
+    """Assemble the chat message list: system prompt, reference notes, earlier conversation and the query"""
+    language_display = LANGUAGE_NAMES.get(language, language)
+    messages = [{"role": "system", "content": get_system_prompt(language)}]
+    
+    # Reference notes and earlier conversation (rolling summary, then recent turns verbatim)
+    if context:
+        if context.get('knowledge'):
+            reference = "\n\n".join(context['knowledge'])
+            messages.append({"role": "system", "content": f"Reference notes from the Green Sathi crop and scheme database. Use them only if relevant to the question:\n{reference}"})
+        if context.get('summary'):
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{context['summary']}"})
+        messages.extend(context.get('history', []))
+    
+    messages.append({"role": "user", "content": query})
+    messages.append({"role": "system", "content": f"Remember to answer only in {language_display}. Do not use any other language."})
+    return messages
+
+def process_with_openrouter(query, language, context=None):
+    """Use OpenRouter API to process the query, with optional conversation context"""
     
     headers = {
         "Authorization": f"Bearer {OPENROUTER_API_KEY}",
@@ -250,6 +335,8 @@ def process_with_openrouter(query, language):
         "openchat/openchat-3.5:free"
     ]
     
+    messages = build_chat_messages(query, language, context)
+    
     # Try each model in sequence if we encounter rate limits
     last_error = None
     
@@ -257,21 +344,17 @@ def process_with_openrouter(query, language):
         try:
             payload = {
                 "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": query},
-                    {"role": "system", "content": f"Remember to answer only in {language_display}. Do not use any other language."}
-                ],
+                "messages": messages,
                 "max_tokens": 500,
                 "temperature": 0.7,
                 "top_p": 0.9
             }
             
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
+            response = http_client.post(
+                'openrouter',
+                http_client.url('openrouter', '/api/v1/chat/completions'),
                 headers=headers,
-                data=json.dumps(payload),
-                timeout=30  # Add timeout to prevent hanging
+                data=json.dumps(payload)
             )
             
             # Check for rate limit errors (HTTP 429)
@@ -297,8 +380,8 @@ def process_with_openrouter(query, language):
     # If we've exhausted all models, raise the last error
     raise Exception(f"All OpenRouter models failed. Last error: {last_error}")
 
-def process_with_huggingface(query, language):
-    """Use HuggingFace API to process the query"""
+def process_with_huggingface(query, language, context=None):
+    """Use HuggingFace API to process the query, with optional conversation context"""
     
     lang_code = LANGUAGE_CODES.get(language, 'en')
     language_display = LANGUAGE_NAMES.get(language, language)
@@ -322,6 +405,14 @@ def process_with_huggingface(query, language):
     # Create a more specific prompt with explicit language instruction
     prompt = f"Answer this agricultural question in {language_display} language only. Do not use any other language in your response: {query}"
     
+    # Text-generation endpoints take a single string, so prepend the context
+    if context and context.get('knowledge'):
+        prompt = "Reference notes:\n" + "\n".join(context['knowledge']) + "\n\n" + prompt
+    if context and (context.get('summary') or context.get('history')):
+        lines = [context['summary']] if context.get('summary') else []
+        lines.extend(f"{'Farmer' if turn['role'] == 'user' else 'Assistant'}: {turn['content']}" for turn in context.get('history', []))
+        prompt = "Conversation so far:\n" + "\n".join(lines) + "\n\n" + prompt
+    
     # Try each model in sequence if we encounter errors
     last_error = None
     
@@ -338,8 +429,8 @@ def process_with_huggingface(query, language):
                 }
             }
             
-            api_url = f"https://api-inference.huggingface.co/models/{model_name}"
-            response = requests.post(api_url, headers=headers, json=payload, timeout=30)
+            api_url = http_client.url('huggingface', f"/models/{model_name}")
+            response = http_client.post('huggingface', api_url, headers=headers, json=payload)
             
             if response.status_code == 401 or response.status_code == 403:
                 # Auth or permission error, try next model
@@ -362,73 +453,121 @@ def process_with_huggingface(query, language):
     # If we've exhausted all models, raise the last error
     raise Exception(f"All HuggingFace models failed. Last error: {last_error}")
 
+def process_with_local_llm(query, language, context=None):
+    """Use the local CPU model (see models/local_llm.py) to process the query"""
+    return get_local_llm().generate(build_chat_messages(query, language, context))
+
+def offline_response(query, language, context=None):
+    """
+    Answer without any remote API: the local model if it is enabled and
+    responsive, otherwise the keyword-based demo response.
+    """
+    try:
+        response = process_with_local_llm(query, language, context)
+        if response:
+            return response
+    except LocalLLMUnavailable as e:
+        print(f"Local LLM unavailable: {e}")
+    except Exception as e:
+        print(f"Local LLM error: {e}")
+    return demo_response(query, language)
+
+# Demo/offline replies per intent (see models/intent_router.py); 'general' is used when no intent matches.
+# Weather and mandi replies point to the in-app pages, since only those have live local data.
+DEMO_RESPONSES = {
+    'weather': {
+        'english': "You can see the 7-day forecast and farming advice for your location on the Weather page in the menu.",
+        'hindi': "अपने स्थान का 7 दिन का मौसम पूर्वानुमान और खेती की सलाह मेनू में 'मौसम' पेज पर देखें।",
+        'bhojpuri': "आपन जगह के 7 दिन के मौसम के अनुमान आ खेती के सलाह मेनू में 'मौसम' पेज पर देखीं।",
+        'marathi': "तुमच्या ठिकाणाचा 7 दिवसांचा हवामान अंदाज आणि शेती सल्ला मेनूमधील 'हवामान' पानावर पहा.",
+        'bengali': "আপনার এলাকার ৭ দিনের আবহাওয়ার পূর্বাভাস ও চাষের পরামর্শ মেনুর 'আবহাওয়া' পাতায় দেখুন।",
+        'tamil': "உங்கள் இடத்திற்கான 7 நாள் வானிலை முன்னறிவிப்பு மற்றும் விவசாய ஆலோசனையை மெனுவில் உள்ள 'வானிலை' பக்கத்தில் பார்க்கவும்.",
+        'telugu': "మీ ప్రాంతానికి 7 రోజుల వాతావరణ సూచన మరియు వ్యవసాయ సలహాను మెనూలోని 'వాతావరణం' పేజీలో చూడండి.",
+        'kannada': "ನಿಮ್ಮ ಸ್ಥಳದ 7 ದಿನಗಳ ಹವಾಮಾನ ಮುನ್ಸೂಚನೆ ಮತ್ತು ಕೃಷಿ ಸಲಹೆಯನ್ನು ಮೆನುವಿನ 'ಹವಾಮಾನ' ಪುಟದಲ್ಲಿ ನೋಡಿ.",
+        'gujarati': "તમારા સ્થાનની 7 દિવસની હવામાન આગાહી અને ખેતી સલાહ મેનુમાં 'હવામાન' પેજ પર જુઓ.",
+        'urdu': "اپنے مقام کی 7 دن کی موسم کی پیشگوئی اور کاشتکاری کے مشورے مینو میں 'موسم' صفحے پر دیکھیں۔",
+        'malayalam': "നിങ്ങളുടെ സ്ഥലത്തെ 7 ദിവസത്തെ കാലാവസ്ഥാ പ്രവചനവും കൃഷി ഉപദേശവും മെനുവിലെ 'കാലാവസ്ഥ' പേജിൽ കാണുക.",
+        'punjabi': "ਆਪਣੇ ਖੇਤਰ ਦੀ 7 ਦਿਨਾਂ ਦੀ ਮੌਸਮ ਭਵਿੱਖਬਾਣੀ ਅਤੇ ਖੇਤੀ ਸਲਾਹ ਮੀਨੂ ਵਿੱਚ 'ਮੌਸਮ' ਪੰਨੇ 'ਤੇ ਦੇਖੋ।"
+    },
+    'mandi': {
+        'english': "For the latest mandi prices in your state and district, open the Mandi Dashboard from the menu.",
+        'hindi': "अपने राज्य और जिले के ताज़ा मंडी भाव के लिए मेनू से 'मंडी डैशबोर्ड' खोलें।",
+        'bhojpuri': "आपन राज्य आ जिला के ताजा मंडी भाव खातिर मेनू से 'मंडी डैशबोर्ड' खोलीं।",
+        'marathi': "तुमच्या राज्य आणि जिल्ह्यातील ताज्या बाजारभावांसाठी मेनूमधून 'मंडी डॅशबोर्ड' उघडा.",
+        'bengali': "আপনার রাজ্য ও জেলার সর্বশেষ মণ্ডি দরের জন্য মেনু থেকে 'মণ্ডি ড্যাশবোর্ড' খুলুন।",
+        'tamil': "உங்கள் மாநிலம் மற்றும் மாவட்டத்தின் சமீபத்திய சந்தை விலைகளுக்கு மெனுவில் 'மண்டி டாஷ்போர்டு' திறக்கவும்.",
+        'telugu': "మీ రాష్ట్రం మరియు జిల్లాలోని తాజా మండీ ధరల కోసం మెనూ నుండి 'మండీ డాష్‌బోర్డ్' తెరవండి.",
+        'kannada': "ನಿಮ್ಮ ರಾಜ್ಯ ಮತ್ತು ಜಿಲ್ಲೆಯ ಇತ್ತೀಚಿನ ಮಂಡಿ ಬೆಲೆಗಳಿಗಾಗಿ ಮೆನುವಿನಿಂದ 'ಮಂಡಿ ಡ್ಯಾಶ್‌ಬೋರ್ಡ್' ತೆರೆಯಿರಿ.",
+        'gujarati': "તમારા રાજ્ય અને જિલ્લાના તાજા મંડી ભાવ માટે મેનુમાંથી 'મંડી ડેશબોર્ડ' ખોલો.",
+        'urdu': "اپنی ریاست اور ضلع کے تازہ منڈی بھاؤ کے لیے مینو سے 'منڈی ڈیش بورڈ' کھولیں۔",
+        'malayalam': "നിങ്ങളുടെ സംസ്ഥാനത്തെയും ജില്ലയിലെയും പുതിയ മണ്ടി വിലകൾക്കായി മെനുവിൽ നിന്ന് 'മണ്ടി ഡാഷ്ബോർഡ്' തുറക്കുക.",
+        'punjabi': "ਆਪਣੇ ਰਾਜ ਅਤੇ ਜ਼ਿਲ੍ਹੇ ਦੇ ਤਾਜ਼ਾ ਮੰਡੀ ਭਾਅ ਲਈ ਮੀਨੂ ਤੋਂ 'ਮੰਡੀ ਡੈਸ਼ਬੋਰਡ' ਖੋਲ੍ਹੋ।"
+    },
+    'scheme': {
+        'english': "You can browse central and state schemes, their benefits and how to apply on the Schemes page in the menu.",
+        'hindi': "केंद्र और राज्य की योजनाएं, उनके लाभ और आवेदन का तरीका मेनू में 'योजनाएं' पेज पर देखें।",
+        'bhojpuri': "केंद्र आ राज्य के योजना, ओकर फायदा आ आवेदन के तरीका मेनू में 'योजना' पेज पर देखीं।",
+        'marathi': "केंद्र व राज्य योजना, त्यांचे लाभ आणि अर्ज कसा करावा हे मेनूमधील 'योजना' पानावर पहा.",
+        'bengali': "কেন্দ্র ও রাজ্যের প্রকল্প, তাদের সুবিধা ও আবেদনের পদ্ধতি মেনুর 'প্রকল্প' পাতায় দেখুন।",
+        'tamil': "மத்திய மற்றும் மாநில திட்டங்கள், அவற்றின் பயன்கள் மற்றும் விண்ணப்பிக்கும் முறையை மெனுவில் உள்ள 'திட்டங்கள்' பக்கத்தில் பார்க்கவும்.",
+        'telugu': "కేంద్ర మరియు రాష్ట్ర పథకాలు, వాటి ప్రయోజనాలు మరియు దరఖాస్తు విధానాన్ని మెనూలోని 'పథకాలు' పేజీలో చూడండి.",
+        'kannada': "ಕೇಂದ್ರ ಮತ್ತು ರಾಜ್ಯ ಯೋಜನೆಗಳು, ಅವುಗಳ ಪ್ರಯೋಜನಗಳು ಮತ್ತು ಅರ್ಜಿ ಸಲ್ಲಿಸುವ ವಿಧಾನವನ್ನು ಮೆನುವಿನ 'ಯೋಜನೆಗಳು' ಪುಟದಲ್ಲಿ ನೋಡಿ.",
+        'gujarati': "કેન્દ્ર અને રાજ્યની યોજનાઓ, તેના લાભો અને અરજી કરવાની રીત મેનુમાં 'યોજનાઓ' પેજ પર જુઓ.",
+        'urdu': "مرکزی اور ریاستی اسکیمیں، ان کے فوائد اور درخواست دینے کا طریقہ مینو میں 'اسکیمیں' صفحے پر دیکھیں۔",
+        'malayalam': "കേന്ദ്ര, സംസ്ഥാന പദ്ധതികളും അവയുടെ ആനുകൂല്യങ്ങളും അപേക്ഷിക്കുന്ന രീതിയും മെനുവിലെ 'പദ്ധതികൾ' പേജിൽ കാണുക.",
+        'punjabi': "ਕੇਂਦਰ ਅਤੇ ਰਾਜ ਦੀਆਂ ਯੋਜਨਾਵਾਂ, ਉਨ੍ਹਾਂ ਦੇ ਲਾਭ ਅਤੇ ਅਰਜ਼ੀ ਦਾ ਤਰੀਕਾ ਮੀਨੂ ਵਿੱਚ 'ਯੋਜਨਾਵਾਂ' ਪੰਨੇ 'ਤੇ ਦੇਖੋ।"
+    },
+    'fertilizer': {
+        'english': "For most crops, a balanced NPK fertilizer works well. Consider getting a soil test to know exactly what your soil needs.",
+        'hindi': "अधिकांश फसलों के लिए, एक संतुलित NPK उर्वरक अच्छा काम करता है। यह जानने के लिए कि आपकी मिट्टी को ठीक से क्या चाहिए, मिट्टी का परीक्षण कराएं।",
+        'bengali': "বেশিরভাগ ফসলের জন্য, একটি ভারসাম্যপূর্ণ NPK সার ভালো কাজ করে। আপনার মাটির ঠিক কী প্রয়োজন তা জানতে মাটি পরীক্ষা করার কথা বিবেচনা করুন।"
+    },
+    'pest': {
+        'english': "First identify the pest or disease. For organic control, try neem oil or beneficial insects. Chemical controls should be used carefully following the instructions.",
+        'hindi': "सबसे पहले कीट या रोग की पहचान करें। जैविक नियंत्रण के लिए, नीम का तेल या फायदेमंद कीड़े आजमाएं। रासायनिक नियंत्रण का निर्देशों का पालन करते हुए सावधानी से उपयोग किया जाना चाहिए।",
+        'bengali': "প্রথমে পোকা বা রোগ শনাক্ত করুন। জৈব নিয়ন্ত্রণের জন্য নিম তেল ব্যবহার করে দেখুন। রাসায়নিক ওষুধ নির্দেশনা মেনে সাবধানে ব্যবহার করুন।"
+    },
+    'general': {
+        'english': "That's a good agricultural question. For specific advice on this topic, I recommend consulting your local agricultural extension office.",
+        'hindi': "यह एक अच्छा कृषि प्रश्न है। इस विषय पर विशिष्ट सलाह के लिए, मैं अपने स्थानीय कृषि विस्तार कार्यालय से परामर्श करने की सलाह देता हूं।",
+        'bengali': "এটি একটি ভালো কৃষি প্রশ্ন। এই বিষয়ে নির্দিষ্ট পরামর্শের জন্য, আমি আপনার স্থানীয় কৃষি বিস্তার অফিসের সাথে পরামর্শ করার সুপারিশ করি।",
+        'marathi': "ही एक चांगली कृषी संबंधित प्रश्न आहे. या विषयावर अधिक माहितीसाठी, स्थानिक कृषी विभागाशी संपर्क साधावा.",
+        'tamil': "இது ஒரு நல்ல விவசாய கேள்வி. இந்த தலைப்பில் குறிப்பிட்ட ஆலோசனைக்கு, உங்கள் உள்ளூர் விவசாய விரிவாக்க அலுவலகத்தை ஆலோசிக்க பரிந்துரைக்கிறேன்.",
+        'telugu': "ఇది ఒక మంచి వ్యవసాయ ప్రశ్న. ఈ అంశంపై నిర్దిష్ట సలహా కోసం, మీ స్థానిక వ్యవసాయ విస్తరణ కార్యాలయాన్ని సంప్రదించాలని నేను సిఫార్సు చేస్తున్నాను.",
+        'kannada': "ಇದು ಒಳ್ಳೆಯ ಕೃಷಿ ಪ್ರಶ್ನೆ. ಈ ವಿಷಯದ ಬಗ್ಗೆ ನಿರ್ದಿಷ್ಟ ಸಲಹೆಗಾಗಿ, ನಿಮ್ಮ ಸ್ಥಳೀಯ ಕೃಷಿ ವಿಸ್ತರಣಾ ಕಚೇರಿಯನ್ನು ಸಂಪರ್ಕಿಸಲು ನಾನು ಸಲಹೆ ನೀಡುತ್ತೇನೆ.",
+        'gujarati': "આ એક સારો કૃષિ પ્રશ્ન છે. આ વિષય પર ચોક્કસ સલાહ માટે, હું તમારી સ્થાનિક કૃષિ વિસ્તરણ કચેરીની સલાહ લેવાની ભલામણ કરું છું.",
+        'urdu': "یہ ایک اچھا زراعتی سوال ہے۔ اس موضوع پر مخصوص مشورے کے لیے، میں آپ کے مقامی زراعتی توسیع دفتر سے مشورہ کرنے کی سفارش کرتا ہوں۔",
+        'malayalam': "ഇത് ഒരു നല്ല കാർഷിക ചോദ്യമാണ്. ഈ വിഷയത്തിൽ പ്രത്യേക ഉപദേശത്തിനായി, നിങ്ങളുടെ പ്രാദേശിക കാർഷിക വിപുലീകരണ ഓഫീസുമായി ആലോചിക്കാൻ ഞാൻ ശുപാർശ ചെയ്യുന്നു.",
+        'punjabi': "ਇਹ ਇੱਕ ਚੰਗਾ ਖੇਤੀਬਾੜੀ ਸਵਾਲ ਹੈ। ਇਸ ਵਿਸ਼ੇ 'ਤੇ ਵਿਸ਼ੇਸ਼ ਸਲਾਹ ਲਈ, ਮੈਂ ਤੁਹਾਡੇ ਸਥਾਨਕ ਖੇਤੀਬਾੜੀ ਵਿਸਤਾਰ ਦਫਤਰ ਨਾਲ ਸਲਾਹ-ਮਸ਼ਵਰਾ ਕਰਨ ਦੀ ਸਿਫਾਰਸ਼ ਕਰਦਾ ਹਾਂ।",
+        'bhojpuri': "ई एगो नीक कृषि प्रश्न हवे। एह विषय पर विशिष्ट सलाह खातिर, हम आपके स्थानीय कृषि प्रसार कार्यालय से परामर्श करे के सलाह देत बानी।"
+    }
+}
+
+# Dialects without their own replies use the Hindi ones
+DEMO_LANGUAGE_FALLBACKS = {
+    'bundelkhandi': 'hindi',
+    'haryanvi': 'hindi'
+}
+
+def get_demo_response(intent, language):
+    """Look up the reply for an intent, falling back to the general reply and then to Hindi"""
+    language = DEMO_LANGUAGE_FALLBACKS.get(language, language)
+    for key in (intent, 'general'):
+        reply = DEMO_RESPONSES.get(key, {}).get(language)
+        if reply:
+            return reply
+    # Default to Hindi for any other language
+    return DEMO_RESPONSES['general']['hindi']
+
 def demo_response(query, language):
     """
     Provide a demo response when no API keys are available or when API calls fail
     
+    The query is classified in one pass by the multilingual intent matcher.
     In a production environment, you would use the actual AI models.
     """
-    
-    # Simple keyword matching for demo purposes
-    query_lower = query.lower()
-    
-    # English responses
-    if language == 'english':
-        if any(word in query_lower for word in ['weather', 'rain', 'forecast']):
-            return "I recommend checking the local meteorological department website for the most accurate weather forecast in your area."
-        elif any(word in query_lower for word in ['fertilizer', 'fertiliser', 'nutrients']):
-            return "For most crops, a balanced NPK fertilizer works well. Consider getting a soil test to know exactly what your soil needs."
-        elif any(word in query_lower for word in ['pest', 'insect', 'disease']):
-            return "First identify the pest or disease. For organic control, try neem oil or beneficial insects. Chemical controls should be used carefully following the instructions."
-        else:
-            return "That's a good agricultural question. For specific advice on this topic, I recommend consulting your local agricultural extension office."
-    
-    # Hindi responses
-    elif language == 'hindi':
-        if any(word in query_lower for word in ['weather', 'rain', 'forecast', 'मौसम', 'बारिश', 'पूर्वानुमान']):
-            return "मैं आपके क्षेत्र के लिए सबसे सटीक मौसम पूर्वानुमान के लिए स्थानीय मौसम विभाग की वेबसाइट देखने की सलाह देता हूं।"
-        elif any(word in query_lower for word in ['fertilizer', 'fertiliser', 'nutrients', 'उर्वरक', 'खाद', 'पोषक']):
-            return "अधिकांश फसलों के लिए, एक संतुलित NPK उर्वरक अच्छा काम करता है। यह जानने के लिए कि आपकी मिट्टी को ठीक से क्या चाहिए, मिट्टी का परीक्षण कराएं।"
-        elif any(word in query_lower for word in ['pest', 'insect', 'disease', 'कीट', 'कीड़े', 'बीमारी']):
-            return "सबसे पहले कीट या रोग की पहचान करें। जैविक नियंत्रण के लिए, नीम का तेल या फायदेमंद कीड़े आजमाएं। रासायनिक नियंत्रण का निर्देशों का पालन करते हुए सावधानी से उपयोग किया जाना चाहिए।"
-        else:
-            return "यह एक अच्छा कृषि प्रश्न है। इस विषय पर विशिष्ट सलाह के लिए, मैं अपने स्थानीय कृषि विस्तार कार्यालय से परामर्श करने की सलाह देता हूं।"
-    
-    # Bengali responses
-    elif language == 'bengali':
-        if any(word in query_lower for word in ['weather', 'rain', 'forecast', 'আবহাওয়া', 'বৃষ্টি']):
-            return "আমি আপনার এলাকার সবচেয়ে সঠিক আবহাওয়া পূর্বাভাসের জন্য স্থানীয় আবহাওয়া দপ্তরের ওয়েবসাইট দেখার পরামর্শ দিচ্ছি।"
-        elif any(word in query_lower for word in ['fertilizer', 'fertiliser', 'nutrients', 'সার', 'পুষ্টি']):
-            return "বেশিরভাগ ফসলের জন্য, একটি ভারসাম্যপূর্ণ NPK সার ভালো কাজ করে। আপনার মাটির ঠিক কী প্রয়োজন তা জানতে মাটি পরীক্ষা করার কথা বিবেচনা করুন।"
-        else:
-            return "এটি একটি ভালো কৃষি প্রশ্ন। এই বিষয়ে নির্দিষ্ট পরামর্শের জন্য, আমি আপনার স্থানীয় কৃষি বিস্তার অফিসের সাথে পরামর্শ করার সুপারিশ করি।"
-            
-    # For all other languages, return a generic message
-    else:
-        # Use language code to determine which language to respond in
-        lang_code = LANGUAGE_CODES.get(language, 'en')
-        
-        if lang_code == 'mr':  # Marathi
-            return "ही एक चांगली कृषी संबंधित प्रश्न आहे. या विषयावर अधिक माहितीसाठी, स्थानिक कृषी विभागाशी संपर्क साधावा."
-        elif lang_code == 'ta':  # Tamil
-            return "இது ஒரு நல்ல விவசாய கேள்வி. இந்த தலைப்பில் குறிப்பிட்ட ஆலோசனைக்கு, உங்கள் உள்ளூர் விவசாய விரிவாக்க அலுவலகத்தை ஆலோசிக்க பரிந்துரைக்கிறேன்."
-        elif lang_code == 'te':  # Telugu
-            return "ఇది ఒక మంచి వ్యవసాయ ప్రశ్న. ఈ అంశంపై నిర్దిష్ట సలహా కోసం, మీ స్థానిక వ్యవసాయ విస్తరణ కార్యాలయాన్ని సంప్రదించాలని నేను సిఫార్సు చేస్తున్నాను."
-        elif lang_code == 'kn':  # Kannada
-            return "ಇದು ಒಳ್ಳೆಯ ಕೃಷಿ ಪ್ರಶ್ನೆ. ಈ ವಿಷಯದ ಬಗ್ಗೆ ನಿರ್ದಿಷ್ಟ ಸಲಹೆಗಾಗಿ, ನಿಮ್ಮ ಸ್ಥಳೀಯ ಕೃಷಿ ವಿಸ್ತರಣಾ ಕಚೇರಿಯನ್ನು ಸಂಪರ್ಕಿಸಲು ನಾನು ಸಲಹೆ ನೀಡುತ್ತೇನೆ."
-        elif lang_code == 'gu':  # Gujarati
-            return "આ એક સારો કૃષિ પ્રશ્ન છે. આ વિષય પર ચોક્કસ સલાહ માટે, હું તમારી સ્થાનિક કૃષિ વિસ્તરણ કચેરીની સલાહ લેવાની ભલામણ કરું છું."
-        elif lang_code == 'ur':  # Urdu
-            return "یہ ایک اچھا زراعتی سوال ہے۔ اس موضوع پر مخصوص مشورے کے لیے، میں آپ کے مقامی زراعتی توسیع دفتر سے مشورہ کرنے کی سفارش کرتا ہوں۔"
-        elif lang_code == 'ml':  # Malayalam
-            return "ഇത് ഒരു നല്ല കാർഷിക ചോദ്യമാണ്. ഈ വിഷയത്തിൽ പ്രത്യേക ഉപദേശത്തിനായി, നിങ്ങളുടെ പ്രാദേശിക കാർഷിക വിപുലീകരണ ഓഫീസുമായി ആലോചിക്കാൻ ഞാൻ ശുപാർശ ചെയ്യുന്നു."
-        elif lang_code == 'pa':  # Punjabi
-            return "ਇਹ ਇੱਕ ਚੰਗਾ ਖੇਤੀਬਾੜੀ ਸਵਾਲ ਹੈ। ਇਸ ਵਿਸ਼ੇ 'ਤੇ ਵਿਸ਼ੇਸ਼ ਸਲਾਹ ਲਈ, ਮੈਂ ਤੁਹਾਡੇ ਸਥਾਨਕ ਖੇਤੀਬਾੜੀ ਵਿਸਤਾਰ ਦਫਤਰ ਨਾਲ ਸਲਾਹ-ਮਸ਼ਵਰਾ ਕਰਨ ਦੀ ਸਿਫਾਰਸ਼ ਕਰਦਾ ਹਾਂ।"
-        elif lang_code == 'bho':  # Bhojpuri
-            return "ई एगो नीक कृषि प्रश्न हवे। एह विषय पर विशिष्ट सलाह खातिर, हम आपके स्थानीय कृषि प्रसार कार्यालय से परामर्श करे के सलाह देत बानी।"
-        else:
-            # Default to Hindi for any other language
-            return "यह एक अच्छा कृषि प्रश्न है। इस विषय पर विशिष्ट सलाह के लिए, मैं अपने स्थानीय कृषि विस्तार कार्यालय से परामर्श करने की सलाह देता हूं।"
+    intent, _ = route_query(query)
+    return get_demo_response(intent, language)
 
 # Function to get welcome message based on language
 def get_welcome_message(language):
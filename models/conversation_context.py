@@ -0,0 +1,144 @@
+import os
+import re
+from .database import db
+from .chat_model import ChatSession, ChatMessage
+
+# Total token budget for system prompt + summary + history + current query
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '1200'))
+# Number of most recent messages sent verbatim; older ones are folded into the summary
+CONTEXT_RECENT_MESSAGES = int(os.getenv('CONTEXT_RECENT_MESSAGES', '6'))
+# Upper bound on the rolling summary stored on the chat session
+CONTEXT_SUMMARY_TOKENS = int(os.getenv('CONTEXT_SUMMARY_TOKENS', '300'))
+# Tokens reserved for the system prompt and reply instructions
+SYSTEM_PROMPT_TOKENS = 150
+# Longest excerpt (characters) of a single message kept in the summary
+SUMMARY_LINE_CHARS = 160
+
+# Strip markup such as the <img> tags stored with image messages
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+def estimate_tokens(text):
+    """
+    Rough token count without loading a tokenizer.
+
+    Indic scripts tokenize to noticeably more tokens per character than
+    English, so this errs on the high side (about 3 characters per token).
+    """
+    if not text:
+        return 0
+    return len(text) // 3 + 1
+
+
+def _clean(text):
+    return ' '.join(_TAG_RE.sub(' ', text or '').split())
+
+
+def _summary_line(message):
+    text = _clean(message.text)
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS].rstrip() + '…'
+    prefix = 'Farmer' if message.sender == 'user' else 'Assistant'
+    return f"{prefix}: {text}"
+
+
+def _trim_summary(summary, max_tokens):
+    """Drop the oldest summary lines until it fits max_tokens"""
+    lines = [line for line in (summary or '').split('\n') if line]
+    while lines and estimate_tokens('\n'.join(lines)) > max_tokens:
+        lines.pop(0)
+    return '\n'.join(lines)
+
+
+def update_rolling_summary(chat_session, recent_messages):
+    """
+    Fold messages that have left the recent window into the session summary.
+
+    Only messages newer than ``chat_session.summary_upto_id`` are read, so
+    each message is summarized once and the cost per request stays constant.
+    The caller is responsible for committing the session.
+
+    Args:
+        chat_session: ChatSession to update
+        recent_messages: Messages kept verbatim (oldest first)
+    """
+    if not recent_messages:
+        return
+
+    oldest_recent_id = recent_messages[0].id
+    query = ChatMessage.query.filter(
+        ChatMessage.chat_id == chat_session.id,
+        ChatMessage.id < oldest_recent_id
+    )
+    if chat_session.summary_upto_id:
+        query = query.filter(ChatMessage.id > chat_session.summary_upto_id)
+    evicted = query.order_by(ChatMessage.id).all()
+
+    if not evicted:
+        return
+
+    lines = [chat_session.summary] if chat_session.summary else []
+    lines.extend(_summary_line(message) for message in evicted)
+    chat_session.summary = _trim_summary('\n'.join(lines), CONTEXT_SUMMARY_TOKENS)
+    chat_session.summary_upto_id = evicted[-1].id
+
+
+def build_context(chat_id, query, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Assemble bounded conversation context for a query.
+
+    Args:
+        chat_id: Chat session ID
+        query: The current user message (excluded from history if already saved)
+        token_budget: Maximum estimated tokens for the assembled prompt
+
+    Returns:
+        dict: {'summary': str, 'history': [{'role': ..., 'content': ...}]},
+              or None if the chat session does not exist
+    """
+    chat_session = db.session.get(ChatSession, chat_id)
+    if not chat_session:
+        return None
+
+    # Fetch one extra row in case the current message has already been flushed
+    recent = (ChatMessage.query
+              .filter_by(chat_id=chat_id)
+              .order_by(ChatMessage.id.desc())
+              .limit(CONTEXT_RECENT_MESSAGES + 1)
+              .all())
+    recent.reverse()
+
+    if recent and recent[-1].sender == 'user' and _clean(recent[-1].text) == _clean(query):
+        recent.pop()
+    recent = recent[-CONTEXT_RECENT_MESSAGES:]
+
+    update_rolling_summary(chat_session, recent)
+
+    remaining = token_budget - SYSTEM_PROMPT_TOKENS - estimate_tokens(query)
+    summary = _trim_summary(chat_session.summary, min(CONTEXT_SUMMARY_TOKENS, max(remaining // 3, 0)))
+    remaining -= estimate_tokens(summary)
+
+    # Keep the newest turns that fit in what is left of the budget
+    history = []
+    for message in reversed(recent):
+        content = _clean(message.text)
+        cost = estimate_tokens(content)
+        if not content or cost > remaining:
+            break
+        history.append({
+            'role': 'user' if message.sender == 'user' else 'assistant',
+            'content': content
+        })
+        remaining -= cost
+    history.reverse()
+
+    return {'summary': summary, 'history': history}
+
+
+def context_fingerprint(context):
+    """Return a string identifying the context, for request coalescing"""
+    if not context or (not context['summary'] and not context['history']):
+        return ''
+    parts = [context['summary']]
+    parts.extend(f"{turn['role']}:{turn['content']}" for turn in context['history'])
+    return '\n'.join(parts)
@@ -0,0 +1,33 @@
+import os
+
+# Size of the native thread pool used for CPU-bound work under gevent
+COOPERATIVE_THREADPOOL_SIZE = int(os.getenv('COOPERATIVE_THREADPOOL_SIZE', '4'))
+
+
+def is_cooperative():
+    """Whether the process runs under gevent (gunicorn -k gevent) with patched sockets"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched('socket')
+
+
+def run_blocking(fn, *args, **kwargs):
+    """
+    Run CPU-bound or C-level blocking work without stalling other requests.
+
+    Under gevent every request in a worker shares one OS thread, so model
+    inference or audio decoding would freeze all of them. There the call runs
+    on gevent's native thread pool while the calling greenlet waits; in sync
+    workers it is simply called directly. fn must not use Flask or database
+    state, which is bound to the calling greenlet.
+    """
+    if not is_cooperative():
+        return fn(*args, **kwargs)
+
+    import gevent
+    threadpool = gevent.get_hub().threadpool
+    if threadpool.maxsize < COOPERATIVE_THREADPOOL_SIZE:
+        threadpool.maxsize = COOPERATIVE_THREADPOOL_SIZE
+    return threadpool.apply(fn, args, kwargs)
@@ -1,3 +1,47 @@
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy() 
\ No newline at end of file
+db = SQLAlchemy()
+
+# Columns added to tables after they were first created; db.create_all() only creates
+# missing tables, so these are applied to existing databases by migrate_schema()
+SCHEMA_MIGRATIONS = [
+    ('chat_sessions', 'summary', "ALTER TABLE chat_sessions ADD COLUMN summary TEXT NULL"),
+    ('chat_sessions', 'summary_upto_id', "ALTER TABLE chat_sessions ADD COLUMN summary_upto_id INT NULL"),
+]
+
+
+def migrate_schema():
+    """
+    Add the SCHEMA_MIGRATIONS columns that existing tables lack (inside an app context)
+
+    Safe to run on every start: columns that exist, and tables that do not
+    exist yet (db.create_all() creates them complete), are skipped.
+
+    Returns:
+        list: "table.column" for each column added
+    """
+    from sqlalchemy import inspect, text
+    from sqlalchemy.exc import OperationalError
+
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    columns = {}
+    added = []
+    for table, column, ddl in SCHEMA_MIGRATIONS:
+        if table not in tables:
+            continue
+        if table not in columns:
+            columns[table] = {info['name'] for info in inspector.get_columns(table)}
+        if column in columns[table]:
+            continue
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(ddl))
+        except OperationalError as e:
+            # Another worker starting at the same time added it first
+            if 'duplicate column' not in str(e).lower():
+                raise
+        columns[table].add(column)
+        added.append(f"{table}.{column}")
+        print(f"Schema migration: added {table}.{column}")
+    return added
@@ -1,6 +1,6 @@
-import pandas as pd
 import json
 import os
+from datetime import datetime
 
 class AdvancedFertilizerRecommender:
     def __init__(self):
@@ -568,6 +568,8 @@ class AdvancedFertilizerRecommender:
 
     def generate_report(self, soil_values, crop, farmer_name=None, location=None):
         """Generate comprehensive fertilizer recommendation report"""
+        import pandas as pd  # only the text report needs it, for table formatting
+
         # Classify soil parameters
         classifications = self.classify_soil_parameters(soil_values)
 
@@ -586,7 +588,7 @@ class AdvancedFertilizerRecommender:
         if location:
             report += f"Location: {location}\n"
         report += f"Crop: {crop.upper()}\n"
-        report += f"Recommendation Date: {pd.Timestamp.now().strftime('%d-%b-%Y')}\n"
+        report += f"Recommendation Date: {datetime.now().strftime('%d-%b-%Y')}\n"
         report += f"\n{'='*80}\n"
 
         # Soil test results
@@ -714,7 +716,7 @@ class AdvancedFertilizerRecommender:
         recommendations = self.recommend_fertilizers(deficiencies, crop)
         
         # Current date
-        current_date = pd.Timestamp.now().strftime('%d-%b-%Y')
+        current_date = datetime.now().strftime('%d-%b-%Y')
 
         # Create JSON report structure
         report_data = {
@@ -1,4 +1,5 @@
 from datetime import datetime
+from .http_client import http_client
 
 # Helper functions for weather data processing
 def get_location_name(lat, lon):
@@ -6,10 +7,9 @@ def get_location_name(lat, lon):
     # Normally this would use a reverse geocoding API
     # This is a simplified version that returns a placeholder
     try:
-        import requests
-        url = f"https://nominatim.openstreetmap.org/reverse?lat={lat}&lon={lon}&format=json"
+        url = http_client.url('nominatim', f"/reverse?lat={lat}&lon={lon}&format=json")
         headers = {'User-Agent': 'GreenSathi/1.0'}
-        response = requests.get(url, headers=headers)
+        response = http_client.get('nominatim', url, headers=headers)
         
         if response.status_code == 200:
             data = response.json()
@@ -0,0 +1,341 @@
+import os
+import time
+import random
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Keep-alive connections kept per host in each service's pool
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '20'))
+# Fraction of requests that may be retried (on top of a small floor), per service
+HTTP_RETRY_BUDGET_RATIO = float(os.getenv('HTTP_RETRY_BUDGET_RATIO', '0.2'))
+HTTP_RETRY_BUDGET_MIN = int(os.getenv('HTTP_RETRY_BUDGET_MIN', '10'))
+# Consecutive failures that open a service's circuit, and how long (seconds) it stays open
+HTTP_BREAKER_THRESHOLD = int(os.getenv('HTTP_BREAKER_THRESHOLD', '5'))
+HTTP_BREAKER_RESET = float(os.getenv('HTTP_BREAKER_RESET', '30'))
+# Point every upstream at a local stub server (benchmarks/stub_upstreams.py); each service
+# is then reached under <HTTP_STUB_URL>/<service name>. Leave empty to call the real APIs.
+HTTP_STUB_URL = os.getenv('HTTP_STUB_URL', '').rstrip('/')
+
+# Status codes worth retrying: the upstream (or a proxy in front of it) is briefly unavailable
+RETRY_STATUSES = {502, 503, 504}
+
+
+class ServiceConfig:
+    """Timeouts and retry policy for one upstream service"""
+
+    def __init__(self, name, base_url, connect_timeout=5.0, read_timeout=30.0, retries=1):
+        env = name.upper()
+        self.name = name
+        self.base_url = os.getenv(f'{env}_BASE_URL') or (f'{HTTP_STUB_URL}/{name}' if HTTP_STUB_URL else base_url)
+        self.base_url = self.base_url.rstrip('/')
+        self.connect_timeout = float(os.getenv(f'HTTP_CONNECT_TIMEOUT_{env}', connect_timeout))
+        self.read_timeout = float(os.getenv(f'HTTP_TIMEOUT_{env}', read_timeout))
+        self.retries = int(os.getenv(f'HTTP_RETRIES_{env}', retries))
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+
+# Every upstream the app talks to. HTTP_TIMEOUT_<NAME>, HTTP_CONNECT_TIMEOUT_<NAME> and
+# HTTP_RETRIES_<NAME> override the defaults; <NAME>_BASE_URL points a single service elsewhere.
+SERVICES = {
+    'openrouter': ServiceConfig('openrouter', 'https://openrouter.ai', read_timeout=30),
+    'openrouter_vision': ServiceConfig('openrouter_vision', 'https://openrouter.ai', read_timeout=60),
+    'huggingface': ServiceConfig('huggingface', 'https://api-inference.huggingface.co', read_timeout=30),
+    'nominatim': ServiceConfig('nominatim', 'https://nominatim.openstreetmap.org', read_timeout=10, retries=2),
+    'open_meteo': ServiceConfig('open_meteo', 'https://api.open-meteo.com', read_timeout=10, retries=2),
+    'data_gov': ServiceConfig('data_gov', 'https://api.data.gov.in', read_timeout=60, retries=3),
+    'google_stt': ServiceConfig('google_stt', 'http://www.google.com', read_timeout=20, retries=0),
+    'gtts': ServiceConfig('gtts', 'https://translate.google.co.in', read_timeout=15, retries=0),
+}
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without calling the upstream while its circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Stop calling an upstream that keeps failing.
+
+    After ``threshold`` consecutive failures the circuit opens and calls fail
+    immediately for ``reset_after`` seconds; then a single trial call is let
+    through, which closes the circuit on success or reopens it on failure.
+    """
+
+    def __init__(self, threshold=HTTP_BREAKER_THRESHOLD, reset_after=HTTP_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half_open' and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+class RetryBudget:
+    """
+    Cap retries at a fraction of traffic so a failing upstream is not hit
+    with a multiple of the normal request rate.
+    """
+
+    def __init__(self, ratio=HTTP_RETRY_BUDGET_RATIO, minimum=HTTP_RETRY_BUDGET_MIN):
+        self.ratio = ratio
+        self.maximum = minimum + 100 * ratio
+        self.tokens = float(minimum)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.maximum, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class HostMetrics:
+    """Request counts, errors and a latency histogram for one host"""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.short_circuited = 0
+        self.statuses = {}
+        self.latency_sum = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def observe(self, latency, status=None, error=False):
+        self.requests += 1
+        self.latency_sum += latency
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+        if status is not None:
+            self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if error or (status is not None and status >= 500):
+            self.errors += 1
+
+    def to_dict(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'short_circuited': self.short_circuited,
+            'statuses': dict(self.statuses),
+            'latency_avg_s': round(self.latency_sum / self.requests, 4) if self.requests else 0.0,
+            'latency_buckets': dict(zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], self.buckets))
+        }
+
+
+class HttpClient:
+    """
+    Shared outbound HTTP client.
+
+    Each service gets its own requests.Session with a keep-alive connection
+    pool, default (connect, read) timeouts, a retry budget and a circuit
+    breaker. Latency and error metrics are kept per host.
+    """
+
+    def __init__(self, services=SERVICES):
+        self.services = services
+        self._sessions = {}
+        self._breakers = {}
+        self._budgets = {}
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _session(self, service):
+        session = self._sessions.get(service)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(service)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._breakers[service] = CircuitBreaker()
+                    self._budgets[service] = RetryBudget()
+                    self._sessions[service] = session
+        return session
+
+    def _host_metrics(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            metrics = self._metrics.get(host)
+            if metrics is None:
+                metrics = self._metrics[host] = HostMetrics()
+        return metrics
+
+    def config(self, service):
+        return self.services[service]
+
+    def url(self, service, path):
+        """Absolute URL for a path on a service, honouring stub and base URL overrides"""
+        return self.services[service].base_url + path
+
+    def is_stubbed(self, service):
+        """Whether a service has been pointed away from its real upstream"""
+        return bool(HTTP_STUB_URL) or bool(os.getenv(f'{service.upper()}_BASE_URL'))
+
+    def request(self, service, method, url, **kwargs):
+        """
+        Send a request to a configured service.
+
+        Accepts the same keyword arguments as requests; ``timeout`` defaults
+        to the service's (connect, read) timeouts. Connection errors,
+        timeouts and 502/503/504 responses are retried with jittered backoff
+        while the retry budget allows.
+
+        Returns:
+            requests.Response (including non-2xx responses after retries)
+
+        Raises:
+            CircuitOpenError: If the service's circuit breaker is open
+            requests.exceptions.RequestException: If the last attempt failed
+        """
+        config = self.config(service)
+        session = self._session(service)
+        breaker = self._breakers[service]
+        budget = self._budgets[service]
+        metrics = self._host_metrics(url)
+        kwargs.setdefault('timeout', config.timeout)
+
+        budget.deposit()
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                with self._lock:
+                    metrics.short_circuited += 1
+                raise CircuitOpenError(f"Circuit open for {service}; not calling {urlsplit(url).netloc}")
+
+            started = time.perf_counter()
+            try:
+                response = session.request(method, url, **kwargs)
+            except requests.exceptions.RequestException:
+                with self._lock:
+                    metrics.observe(time.perf_counter() - started, error=True)
+                breaker.record_failure()
+                if attempt < config.retries and budget.withdraw():
+                    attempt += 1
+                    self._backoff(metrics, attempt)
+                    continue
+                raise
+
+            with self._lock:
+                metrics.observe(time.perf_counter() - started, status=response.status_code)
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            if response.status_code in RETRY_STATUSES and attempt < config.retries and budget.withdraw():
+                attempt += 1
+                response.close()
+                self._backoff(metrics, attempt)
+                continue
+            return response
+
+    def _backoff(self, metrics, attempt):
+        with self._lock:
+            metrics.retries += 1
+        time.sleep(min(2.0, 0.2 * (2 ** (attempt - 1))) * random.uniform(0.5, 1.0))
+
+    def get(self, service, url, **kwargs):
+        return self.request(service, 'GET', url, **kwargs)
+
+    def post(self, service, url, **kwargs):
+        return self.request(service, 'POST', url, **kwargs)
+
+    def metrics(self):
+        """Per-host metrics and per-service breaker states for this process"""
+        with self._lock:
+            hosts = {host: metrics.to_dict() for host, metrics in self._metrics.items()}
+        return {
+            'pid': os.getpid(),
+            'hosts': hosts,
+            'breakers': {service: breaker.state for service, breaker in self._breakers.items()}
+        }
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        lines = [
+            '# TYPE http_client_requests_total counter',
+            '# TYPE http_client_errors_total counter',
+            '# TYPE http_client_retries_total counter',
+            '# TYPE http_client_short_circuited_total counter',
+            '# TYPE http_client_latency_seconds histogram',
+            '# TYPE http_client_circuit_open gauge',
+        ]
+        with self._lock:
+            for host, metrics in sorted(self._metrics.items()):
+                label = f'host="{host}"'
+                lines.append(f'http_client_requests_total{{{label}}} {metrics.requests}')
+                lines.append(f'http_client_errors_total{{{label}}} {metrics.errors}')
+                lines.append(f'http_client_retries_total{{{label}}} {metrics.retries}')
+                lines.append(f'http_client_short_circuited_total{{{label}}} {metrics.short_circuited}')
+                cumulative = 0
+                for bound, count in zip([str(b) for b in LATENCY_BUCKETS] + ['+Inf'], metrics.buckets):
+                    cumulative += count
+                    lines.append(f'http_client_latency_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+                lines.append(f'http_client_latency_seconds_sum{{{label}}} {metrics.latency_sum:.6f}')
+                lines.append(f'http_client_latency_seconds_count{{{label}}} {metrics.requests}')
+            for service, breaker in sorted(self._breakers.items()):
+                lines.append(f'http_client_circuit_open{{service="{service}"}} {0 if breaker.state == "closed" else 1}')
+        return '\n'.join(lines) + '\n'
+
+
+http_client = HttpClient()
+
+
+def service_timeout(service):
+    """Read timeout (seconds) for a service called through a third-party library"""
+    return SERVICES[service].read_timeout
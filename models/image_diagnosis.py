@@ -1,10 +1,9 @@
 import os
-import requests
 from dotenv import load_dotenv
-from PIL import Image
-import numpy as np
 import base64
 import json
+from .single_flight import SingleFlight, make_key, file_digest
+from .http_client import http_client
 
 load_dotenv()
 
@@ -44,10 +43,16 @@ PLANT_DISEASES = {
     17: {"plant": "Tomato", "disease": "Healthy", "recommendation": "Your tomato plant appears healthy. Continue with regular watering and feeding."}
 }
 
+# Coalesces concurrent analyses of the same image bytes into one upstream call
+_image_flight = SingleFlight('plant_image')
+
 def analyze_plant_image(image_path, language='english'):
     """
     Analyze a plant image to detect diseases using HuggingFace API or local model
     
+    Concurrent calls for an image with identical contents and the same
+    language share a single upstream call.
+    
     Args:
         image_path: Path to the image file
         language: Language for the response (default: english)
@@ -55,6 +60,15 @@ def analyze_plant_image(image_path, language='english'):
     Returns:
         dict: Analysis results including plant type, disease, confidence, and recommendations
     """
+    try:
+        key = make_key(file_digest(image_path), language)
+    except OSError as e:
+        print(f"Could not hash image for coalescing: {e}")
+        return _analyze_plant_image(image_path, language)
+    return _image_flight.do(key, _analyze_plant_image, image_path, language)
+
+def _analyze_plant_image(image_path, language='english'):
+    """Uncoalesced implementation of analyze_plant_image"""
     try:
         # If HuggingFace API key is available, use that
         if OPENROUTER_API_KEY:
@@ -179,7 +193,7 @@ def analyze_with_openrouter(image_path, language='english'):
     }
 
     # ✅ Make the POST request
-    response = requests.post("https://openrouter.ai/api/v1/chat/completions", json=prompt, headers=headers)
+    response = http_client.post('openrouter_vision', http_client.url('openrouter_vision', '/api/v1/chat/completions'), json=prompt, headers=headers)
 
     print(response.text)
     print(response.status_code)
@@ -252,6 +266,9 @@ def analyze_with_openrouter(image_path, language='english'):
 def analyze_demo(image_path, language='english'):
     """Provide a demo/mock analysis when no API key is available"""
     
+    from PIL import Image
+    import numpy as np
+
     # Simulate a model prediction by using basic image properties
     image = Image.open(image_path).convert('RGB')
     
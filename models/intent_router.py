@@ -0,0 +1,333 @@
+import os
+import unicodedata
+from collections import deque
+
+# Intents in priority order (used to break ties between equally matched intents)
+INTENTS = ['weather', 'mandi', 'scheme', 'fertilizer', 'pest']
+
+# Intents answered from the app's own data (forecast, mandi prices) instead of an LLM
+# call when a query is an explicit request for them (comma-separated; empty disables)
+INTENT_LOCAL_ROUTES = {
+    intent.strip() for intent in os.getenv('INTENT_LOCAL_ROUTES', 'weather,mandi').split(',') if intent.strip()
+}
+
+# Declarative keyword table: intent -> language -> keywords.
+# All languages are compiled into one automaton, so a query is matched against
+# every language's keywords in a single pass regardless of the chat language.
+INTENT_KEYWORDS = {
+    'weather': {
+        'english': ['weather', 'rain', 'rainfall', 'forecast', 'temperature', 'monsoon', 'humidity'],
+        'hindi': ['मौसम', 'बारिश', 'वर्षा', 'बरसात', 'पूर्वानुमान', 'तापमान', 'बारिशों'],
+        'bhojpuri': ['बरखा', 'पानी बरसी'],
+        'bundelkhandi': ['पानी गिरहै', 'पानी बरसहै'],
+        'marathi': ['हवामान', 'पाऊस', 'पावसाचा'],
+        'haryanvi': ['मींह', 'मेह'],
+        'bengali': ['আবহাওয়া', 'বৃষ্টি', 'পূর্বাভাস'],
+        'tamil': ['வானிலை', 'மழை'],
+        'telugu': ['వాతావరణం', 'వర్షం'],
+        'kannada': ['ಹವಾಮಾನ', 'ಮಳೆ'],
+        'gujarati': ['હવામાન', 'વરસાદ'],
+        'urdu': ['موسم', 'بارش'],
+        'malayalam': ['കാലാവസ്ഥ', 'മഴ'],
+        'punjabi': ['ਮੌਸਮ', 'ਮੀਂਹ', 'ਬਾਰਿਸ਼'],
+    },
+    'fertilizer': {
+        'english': ['fertilizer', 'fertiliser', 'nutrients', 'nutrient', 'urea', 'dap', 'npk', 'manure', 'compost'],
+        'hindi': ['उर्वरक', 'खाद', 'पोषक', 'यूरिया', 'डीएपी', 'गोबर'],
+        'bhojpuri': ['खाद-पानी'],
+        'bundelkhandi': ['घूरा'],
+        'marathi': ['खत', 'खते'],
+        'haryanvi': ['रूड़ी'],
+        'bengali': ['সার', 'পুষ্টি', 'ইউরিয়া'],
+        'tamil': ['உரம்', 'யூரியா'],
+        'telugu': ['ఎరువు', 'ఎరువులు', 'యూరియా'],
+        'kannada': ['ಗೊಬ್ಬರ', 'ಯೂರಿಯಾ'],
+        'gujarati': ['ખાતર', 'યુરિયા'],
+        'urdu': ['کھاد', 'یوریا'],
+        'malayalam': ['വളം', 'യൂറിയ'],
+        'punjabi': ['ਖਾਦ', 'ਯੂਰੀਆ'],
+    },
+    'pest': {
+        'english': ['pest', 'pests', 'insect', 'insects', 'disease', 'spray', 'fungus', 'blight', 'aphid', 'worm'],
+        'hindi': ['कीट', 'कीटों', 'कीड़े', 'कीड़ा', 'बीमारी', 'बीमारियों', 'रोग', 'रोगों', 'छिड़काव', 'दवा', 'इल्ली', 'सुंडी'],
+        'bhojpuri': ['कीरा', 'बेमारी'],
+        'bundelkhandi': ['कीरा लगो'],
+        'marathi': ['कीड', 'फवारणी', 'अळी'],
+        'haryanvi': ['कीड़ी'],
+        'bengali': ['পোকা', 'রোগ', 'কীটনাশক'],
+        'tamil': ['பூச்சி', 'நோய்'],
+        'telugu': ['పురుగు', 'తెగులు'],
+        'kannada': ['ಕೀಟ', 'ರೋಗ'],
+        'gujarati': ['જીવાત', 'રોગ'],
+        'urdu': ['کیڑے', 'بیماری'],
+        'malayalam': ['കീടം', 'രോഗം'],
+        'punjabi': ['ਕੀੜੇ', 'ਬਿਮਾਰੀ', 'ਰੋਗ'],
+    },
+    'mandi': {
+        'english': ['mandi', 'market price', 'market rate', 'selling price', 'msp', 'bhav'],
+        'hindi': ['मंडी', 'भाव', 'कीमत', 'बाजार भाव', 'दाम'],
+        'bhojpuri': ['बजार'],
+        'bundelkhandi': ['हाट'],
+        'marathi': ['बाजारभाव', 'बाजार समिती'],
+        'haryanvi': ['भा के'],
+        'bengali': ['বাজার দর', 'মণ্ডি', 'দাম'],
+        'tamil': ['சந்தை', 'விலை'],
+        'telugu': ['మార్కెట్', 'ధర', 'మండీ'],
+        'kannada': ['ಮಾರುಕಟ್ಟೆ', 'ಬೆಲೆ', 'ಮಂಡಿ'],
+        'gujarati': ['બજાર', 'ભાવ', 'મંડી'],
+        'urdu': ['منڈی', 'قیمت', 'بھاؤ'],
+        'malayalam': ['വിപണി', 'വില'],
+        'punjabi': ['ਮੰਡੀ', 'ਭਾਅ', 'ਕੀਮਤ'],
+    },
+    'scheme': {
+        'english': ['scheme', 'subsidy', 'yojana', 'pm kisan', 'insurance', 'kcc', 'loan'],
+        'hindi': ['योजना', 'योजनाओं', 'योजनाएं', 'सब्सिडी', 'अनुदान', 'बीमा', 'ऋण'],
+        'bhojpuri': ['सरकारी मदद'],
+        'bundelkhandi': ['सरकारी पइसा'],
+        'marathi': ['योजने', 'विमा', 'कर्ज'],
+        'haryanvi': ['सरकारी स्कीम'],
+        'bengali': ['প্রকল্প', 'যোজনা', 'ভর্তুকি'],
+        'tamil': ['திட்டம்', 'மானியம்'],
+        'telugu': ['పథకం', 'సబ్సిడీ'],
+        'kannada': ['ಯೋಜನೆ', 'ಸಹಾಯಧನ'],
+        'gujarati': ['યોજના', 'સબસિડી'],
+        'urdu': ['اسکیم', 'سبسڈی', 'یوجنا'],
+        'malayalam': ['പദ്ധതി', 'സബ്സിഡി'],
+        'punjabi': ['ਯੋਜਨਾ', 'ਸਕੀਮ', 'ਸਬਸਿਡੀ'],
+    },
+}
+
+
+# Words that qualify an intent match. A weather or mandi query is only answered
+# locally when it also asks for current data (a *_request word: a forecast day or
+# "will it rain" for weather) and mentions no farming practice; weather queries
+# must not name a crop either, since "how does rain affect cotton" is an agronomy
+# question, not a forecast request. A bare price word ("wheat price today") is a
+# mandi request only when it comes with a commodity the mandi data knows.
+QUERY_QUALIFIERS = {
+    'weather_request': {
+        'english': ['forecast', 'today', 'tomorrow', 'tonight', 'this week', 'next week', 'next few days',
+                    'coming days', 'will it rain', 'going to rain', 'weather report', 'weather update'],
+        'hindi': ['आज', 'कल', 'परसों', 'पूर्वानुमान', 'इस हफ्ते', 'इस सप्ताह', 'अगले', 'आने वाले', 'होगी', 'होगा',
+                  'आएगी', 'रहेगा', 'रहेगी'],
+        'marathi': ['आज', 'उद्या', 'अंदाज'],
+        'bengali': ['আজ', 'কাল', 'পূর্বাভাস'],
+        'tamil': ['இன்று', 'நாளை'],
+        'telugu': ['ఈరోజు', 'రేపు'],
+        'kannada': ['ಇಂದು', 'ನಾಳೆ'],
+        'gujarati': ['આજે', 'કાલે'],
+        'urdu': ['آج', 'کل'],
+        'malayalam': ['ഇന്ന്', 'നാളെ'],
+        'punjabi': ['ਅੱਜ', 'ਕੱਲ੍ਹ'],
+    },
+    'mandi_request': {
+        'english': ['price', 'prices', 'rate', 'rates', 'today', 'current', 'latest', 'how much', 'show', 'tell me'],
+        'hindi': ['आज', 'ताजा', 'अभी', 'कितना', 'कितनी', 'कितने', 'क्या है', 'क्या चल रहा', 'रेट', 'बताओ',
+                  'बताइए', 'बताएं'],
+        'marathi': ['आज', 'किती'],
+        'bengali': ['আজ', 'কত'],
+        'tamil': ['இன்று', 'என்ன'],
+        'telugu': ['ఈరోజు', 'ఎంత'],
+        'kannada': ['ಇಂದು', 'ಎಷ್ಟು'],
+        'gujarati': ['આજે', 'કેટલો', 'કેટલા'],
+        'urdu': ['آج', 'کتنا', 'کتنی'],
+        'malayalam': ['ഇന്ന്', 'എത്ര'],
+        'punjabi': ['ਅੱਜ', 'ਕਿੰਨਾ', 'ਕਿੰਨੀ'],
+    },
+    'price': {
+        'english': ['price', 'prices', 'rate', 'rates'],
+        'hindi': ['रेट', 'दर'],
+    },
+    'practice': {
+        'english': ['sow', 'sowing', 'yield', 'grow', 'growing', 'cultivation', 'cultivate', 'germination',
+                    'irrigate', 'irrigation', 'harvest', 'harvesting', 'variety', 'varieties', 'seed', 'seeds',
+                    'affect', 'affects', 'effect', 'increase', 'best time', 'when to', 'how to', 'planting',
+                    'spacing', 'storage'],
+        'hindi': ['बुवाई', 'बुआई', 'बोना', 'बोएं', 'पैदावार', 'उपज', 'उत्पादन', 'सिंचाई', 'पानी दें', 'पानी देना',
+                  'कटाई', 'खेती', 'किस्म', 'किस्में', 'बीज', 'अंकुरण', 'बढ़ाएं', 'बढ़ाने', 'तरीका', 'तरीके',
+                  'उगाएं', 'लगाएं', 'भंडारण', 'असर', 'प्रभाव'],
+        'marathi': ['पेरणी', 'उत्पन्न', 'लागवड', 'सिंचन', 'काढणी', 'वाण'],
+        'bengali': ['বপন', 'ফলন', 'সেচ', 'চাষ'],
+        'tamil': ['விதைப்பு', 'மகசூல்', 'சாகுபடி'],
+        'telugu': ['విత్తనం', 'దిగుబడి', 'సాగు'],
+        'kannada': ['ಬಿತ್ತನೆ', 'ಇಳುವರಿ', 'ಸಾಗುವಳಿ'],
+        'gujarati': ['વાવણી', 'ઉત્પાદન', 'સિંચાઈ'],
+        'urdu': ['بوائی', 'پیداوار', 'آبپاشی'],
+        'malayalam': ['വിതയ്ക്കൽ', 'വിളവ്', 'കൃഷി'],
+        'punjabi': ['ਬਿਜਾਈ', 'ਝਾੜ', 'ਸਿੰਚਾਈ', 'ਵਾਢੀ'],
+    },
+    'crop': {
+        'english': ['wheat', 'rice', 'paddy', 'maize', 'corn', 'cotton', 'sugarcane', 'mustard', 'soybean',
+                    'potato', 'onion', 'tomato', 'gram', 'chickpea', 'groundnut', 'bajra', 'millet', 'pulses',
+                    'vegetables', 'mango', 'banana', 'garlic', 'chilli', 'crop', 'crops'],
+        'hindi': ['गेहूं', 'गेहूँ', 'धान', 'चावल', 'मक्का', 'कपास', 'गन्ना', 'सरसों', 'सोयाबीन', 'आलू', 'प्याज',
+                  'टमाटर', 'चना', 'मूंगफली', 'बाजरा', 'दाल', 'सब्जी', 'फसल', 'फसलों'],
+        'marathi': ['गहू', 'भात', 'कापूस', 'ऊस', 'कांदा', 'पीक'],
+        'bengali': ['ধান', 'গম', 'আলু', 'ফসল'],
+        'tamil': ['நெல்', 'பருத்தி', 'பயிர்'],
+        'telugu': ['వరి', 'పత్తి', 'పంట'],
+        'kannada': ['ಭತ್ತ', 'ಹತ್ತಿ', 'ಬೆಳೆ'],
+        'gujarati': ['ઘઉં', 'કપાસ', 'પાક'],
+        'urdu': ['گندم', 'کپاس', 'فصل'],
+        'malayalam': ['നെല്ല്', 'വിള'],
+        'punjabi': ['ਕਣਕ', 'ਝੋਨਾ', 'ਕਪਾਹ', 'ਫ਼ਸਲ', 'ਫਸਲ'],
+    },
+}
+
+
+def _normalize(text):
+    return unicodedata.normalize('NFC', text.lower())
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher.
+
+    Builds a trie of all patterns with failure links once, then finds every
+    occurrence of every pattern in a single left-to-right scan of the text.
+    Patterns in every script only match whole words, so 'rain' does not match
+    'grain', 'मेह' does not match 'मेहनत' and 'भाव' does not match 'प्रभावी'.
+    """
+
+    def __init__(self, patterns):
+        """
+        Args:
+            patterns: Iterable of (pattern, payload) pairs
+        """
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for pattern, payload in patterns:
+            pattern = _normalize(pattern)
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                next_node = self._goto[node].get(ch)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][ch] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append((pattern, payload))
+
+        # Breadth-first pass to compute failure links and merge outputs
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in self._goto[node].items():
+                pending.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text):
+        """Yield (start, end, pattern, payload) for every match in text"""
+        text = _normalize(text)
+        node = 0
+        for index, ch in enumerate(text):
+            while node and ch not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(ch, 0)
+            for pattern, payload in self._output[node]:
+                start = index - len(pattern) + 1
+                if not _on_word_boundary(text, start, index + 1):
+                    continue
+                yield start, index + 1, pattern, payload
+
+
+def _is_word_char(ch):
+    # Letters, digits and combining marks (Indic vowel signs, viramas, nuktas), plus the
+    # zero-width joiners used inside Indic words; isalnum() is False for the marks
+    return unicodedata.category(ch)[0] in 'LMN' or ch in '\u200c\u200d'
+
+
+def _on_word_boundary(text, start, end):
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    return not _is_word_char(before) and not _is_word_char(after)
+
+
+_matcher = AhoCorasick(
+    (keyword, category)
+    for table in (INTENT_KEYWORDS, QUERY_QUALIFIERS)
+    for category, languages in table.items()
+    for keywords in languages.values()
+    for keyword in keywords
+)
+
+
+def match_keywords(text):
+    """
+    Count keyword hits per intent and qualifier in one pass over the text.
+
+    Returns:
+        dict: intent or qualifier name -> number of distinct keywords matched (only matched ones)
+    """
+    seen = set()
+    counts = {}
+    for _, _, pattern, category in _matcher.iter_matches(text or ''):
+        if (pattern, category) in seen:
+            continue
+        seen.add((pattern, category))
+        counts[category] = counts.get(category, 0) + 1
+    return counts
+
+
+def classify_intents(text):
+    """
+    Count keyword hits per intent in one pass over the text.
+
+    Returns:
+        dict: intent -> number of distinct keywords matched (only matched intents)
+    """
+    return {intent: count for intent, count in match_keywords(text).items() if intent in INTENT_KEYWORDS}
+
+
+def route_query(text):
+    """
+    Pick the primary intent of a query.
+
+    Returns:
+        tuple: (intent or None, is_unambiguous) where is_unambiguous means
+               exactly one intent matched
+    """
+    counts = classify_intents(text)
+    if not counts:
+        return None, False
+    best = max(INTENTS, key=lambda intent: (counts.get(intent, 0), -INTENTS.index(intent)))
+    return best, len(counts) == 1
+
+
+def local_route(text, is_commodity=None):
+    """
+    Return the intent to answer from the app's own data (without the LLM), or None.
+
+    Only explicit forecast or price requests qualify: exactly one intent
+    matched, a request word for it, no farming-practice terms and, for
+    weather, no crop names. A query that matches no intent but has a price
+    word counts as a mandi request if is_commodity(text) finds a commodity
+    it names. Everything else goes to the knowledge base and the LLM.
+
+    Args:
+        text: The query
+        is_commodity: Optional is_commodity(text) -> bool, e.g. a mandi data lookup
+    """
+    counts = match_keywords(text)
+    intents = [intent for intent in INTENTS if intent in counts]
+    if not intents and counts.get('price') and is_commodity is not None and 'mandi' in INTENT_LOCAL_ROUTES:
+        if not counts.get('practice') and is_commodity(text):
+            intents = ['mandi']
+    if len(intents) != 1 or intents[0] not in INTENT_LOCAL_ROUTES:
+        return None
+    intent = intents[0]
+    if not counts.get(f'{intent}_request') or counts.get('practice'):
+        return None
+    if intent == 'weather' and counts.get('crop'):
+        return None
+    return intent
@@ -0,0 +1,354 @@
+import os
+import json
+import socket
+import threading
+import traceback
+from uuid import uuid4
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, update, delete, and_, or_
+from .database import db
+
+# 'thread': each web process runs its own job pool, 'worker': web processes only enqueue and
+# job_worker.py runs the jobs, 'off': the endpoints keep processing requests synchronously
+JOB_QUEUE_MODE = os.getenv('JOB_QUEUE_MODE', 'thread').lower()
+# Jobs run concurrently per pool
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+# Seconds a running job may go without reporting progress before it is considered stuck and retried
+JOB_TIMEOUT = int(os.getenv('JOB_TIMEOUT', '180'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+# Delay (seconds) before the first retry; doubled on every further attempt
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', '2'))
+# How often (seconds) an idle pool checks the table for new or stuck jobs
+JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '0.5'))
+# Finished jobs older than this are deleted
+JOB_RETENTION_HOURS = int(os.getenv('JOB_RETENTION_HOURS', '24'))
+
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    id = db.Column(db.String(36), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'voice', 'speech', 'image', 'soil_report'
+    status = db.Column(db.String(10), nullable=False, default=JOB_QUEUED, index=True)
+    stage = db.Column(db.String(30), nullable=True)  # Last stage reported by the handler
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    chat_id = db.Column(db.String(36), nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON arguments for the handler
+    partial = db.Column(db.Text, nullable=True)  # JSON of the stage results so far
+    result = db.Column(db.Text, nullable=True)  # JSON response body once finished
+    status_code = db.Column(db.Integer, nullable=True)  # HTTP status of the response body
+    error = db.Column(db.Text, nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=JOB_MAX_ATTEMPTS)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    worker_id = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'stage': self.stage,
+            'partial': json.loads(self.partial) if self.partial else {},
+            'result': json.loads(self.result) if self.result else None,
+            'status_code': self.status_code,
+            'attempts': self.attempts,
+            'error': self.error
+        }
+
+
+class JobLeaseLost(Exception):
+    """Raised when a job was taken over by another worker after its lease expired"""
+
+
+class JobContext:
+    """
+    Handle passed to a job handler.
+
+    ``partial`` holds the stage results saved by earlier attempts, so a
+    retried handler can skip work that already succeeded. ``report`` saves a
+    new stage result for polling clients and renews the lease. A context
+    without a job ID runs the handler synchronously inside the request.
+    """
+
+    def __init__(self, job_id=None, attempt=1, partial=None):
+        self.job_id = job_id
+        self.attempt = attempt
+        self.partial = partial or {}
+
+    def report(self, stage, **values):
+        self.partial.update(values)
+        if self.job_id is None:
+            return
+        now = datetime.utcnow()
+        with db.engine.begin() as conn:
+            updated = conn.execute(
+                update(Job.__table__)
+                .where(_owned_by(self.job_id, self.attempt))
+                .values(stage=stage, partial=json.dumps(self.partial, ensure_ascii=False),
+                        lease_expires_at=now + timedelta(seconds=JOB_TIMEOUT), updated_at=now)
+            ).rowcount
+        if not updated:
+            raise JobLeaseLost(f"Job {self.job_id} was taken over after attempt {self.attempt}")
+
+
+_handlers = {}
+
+
+def register_job_handler(kind, handler, on_failure=None):
+    """
+    Register the function that processes jobs of a kind.
+
+    Args:
+        kind: Job kind, e.g. 'voice'
+        handler: handler(payload, job) -> (response_body, status_code); may raise to retry
+        on_failure: on_failure(payload, error) -> (response_body, status_code), used once
+                    the attempts are exhausted
+    """
+    _handlers[kind] = (handler, on_failure)
+
+
+def _owned_by(job_id, attempt):
+    """Fence updates to the worker holding the current attempt of a running job"""
+    table = Job.__table__
+    return and_(table.c.id == job_id, table.c.status == JOB_RUNNING, table.c.attempts == attempt)
+
+
+def enqueue_job(kind, payload, user_id=None, chat_id=None, partial=None):
+    """
+    Add a job to the queue.
+
+    Args:
+        partial: Stage results already known, e.g. the transcript of a streamed
+                 voice message; the handler sees them as from an earlier attempt
+
+    Returns:
+        str: The job ID
+    """
+    job_id = str(uuid4())
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        conn.execute(Job.__table__.insert().values(
+            id=job_id, kind=kind, status=JOB_QUEUED, user_id=user_id, chat_id=chat_id,
+            payload=json.dumps(payload, ensure_ascii=False), attempts=0, max_attempts=JOB_MAX_ATTEMPTS,
+            partial=json.dumps(partial, ensure_ascii=False) if partial else None,
+            run_after=now, created_at=now, updated_at=now
+        ))
+
+    if JOB_QUEUE_MODE == 'thread':
+        from flask import current_app
+        get_worker_pool(current_app._get_current_object()).wake()
+    return job_id
+
+
+def get_job(job_id):
+    """Return the Job with the given ID, or None"""
+    return db.session.get(Job, job_id)
+
+
+def claim_next_job(worker_id, kinds):
+    """
+    Atomically take the oldest runnable job.
+
+    Queued jobs whose retry delay has passed and running jobs whose lease has
+    expired (stuck or from a dead worker) are both runnable. The claim is a
+    conditional update on (status, attempts), so concurrent workers in any
+    process cannot claim the same attempt twice.
+
+    Returns:
+        tuple: (job_id, attempt) or None if nothing is runnable
+    """
+    if not kinds:
+        return None
+    table = Job.__table__
+    now = datetime.utcnow()
+    runnable = or_(
+        and_(table.c.status == JOB_QUEUED, table.c.run_after <= now),
+        and_(table.c.status == JOB_RUNNING, table.c.lease_expires_at < now)
+    )
+    with db.engine.begin() as conn:
+        candidates = conn.execute(
+            select(table.c.id, table.c.status, table.c.attempts)
+            .where(table.c.kind.in_(kinds), runnable)
+            .order_by(table.c.created_at)
+            .limit(5)
+        ).all()
+
+    for job_id, status, attempts in candidates:
+        with db.engine.begin() as conn:
+            claimed = conn.execute(
+                update(table)
+                .where(table.c.id == job_id, table.c.status == status, table.c.attempts == attempts)
+                .values(status=JOB_RUNNING, attempts=attempts + 1, worker_id=worker_id,
+                        lease_expires_at=now + timedelta(seconds=JOB_TIMEOUT), updated_at=now)
+            ).rowcount
+        if claimed:
+            if status == JOB_RUNNING:
+                print(f"Job {job_id} timed out on attempt {attempts}, reclaimed by {worker_id}")
+            return job_id, attempts + 1
+    return None
+
+
+def _finish(job_id, attempt, status, body, status_code, error=None):
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        return conn.execute(
+            update(Job.__table__)
+            .where(_owned_by(job_id, attempt))
+            .values(status=status, stage=status, result=json.dumps(body, ensure_ascii=False),
+                    status_code=status_code, error=error, lease_expires_at=None, updated_at=now)
+        ).rowcount
+
+
+def _retry_later(job_id, attempt, error):
+    delay = JOB_RETRY_DELAY * (2 ** (attempt - 1))
+    now = datetime.utcnow()
+    with db.engine.begin() as conn:
+        conn.execute(
+            update(Job.__table__)
+            .where(_owned_by(job_id, attempt))
+            .values(status=JOB_QUEUED, error=error, run_after=now + timedelta(seconds=delay),
+                    lease_expires_at=None, updated_at=now)
+        )
+
+
+def _failure_response(on_failure, payload, error):
+    if on_failure:
+        return on_failure(payload, error)
+    return {'error': str(error)}, 500
+
+
+def run_job(job_id, attempt):
+    """Run one claimed attempt of a job (inside an app context)"""
+    job = db.session.get(Job, job_id)
+    handler, on_failure = _handlers[job.kind]
+    payload = json.loads(job.payload)
+    context = JobContext(job_id, attempt, json.loads(job.partial) if job.partial else {})
+
+    if attempt > job.max_attempts:
+        error = TimeoutError(f"Job did not finish within {job.max_attempts} attempts")
+        body, status_code = _failure_response(on_failure, payload, error)
+        _finish(job_id, attempt, JOB_FAILED, body, status_code, str(error))
+        return
+
+    try:
+        body, status_code = handler(payload, context)
+    except JobLeaseLost as e:
+        db.session.rollback()
+        print(str(e))
+    except Exception as e:
+        db.session.rollback()
+        print(f"Job {job_id} ({job.kind}) failed on attempt {attempt}: {e}")
+        print(traceback.format_exc())
+        if attempt < job.max_attempts:
+            _retry_later(job_id, attempt, str(e))
+        else:
+            body, status_code = _failure_response(on_failure, payload, e)
+            _finish(job_id, attempt, JOB_FAILED, body, status_code, str(e))
+    else:
+        if not _finish(job_id, attempt, JOB_DONE, body, status_code):
+            print(f"Job {job_id} finished after its lease was lost; result discarded")
+
+
+def purge_finished_jobs(older_than_hours=JOB_RETENTION_HOURS):
+    """Delete finished jobs older than the retention period"""
+    table = Job.__table__
+    cutoff = datetime.utcnow() - timedelta(hours=older_than_hours)
+    with db.engine.begin() as conn:
+        return conn.execute(
+            delete(table).where(table.c.status.in_([JOB_DONE, JOB_FAILED]), table.c.updated_at < cutoff)
+        ).rowcount
+
+
+class JobWorkerPool:
+    """
+    Pool of threads that run queued jobs.
+
+    A single dispatcher thread claims a job only when a worker slot is free,
+    so the table is polled once per interval per pool rather than once per
+    thread, and jobs stay in the table (claimable by other pools) while this
+    one is busy. Each job runs in its own request context so handlers can use
+    the database session and url_for.
+    """
+
+    def __init__(self, app, size=JOB_WORKERS, poll_interval=JOB_POLL_INTERVAL):
+        self.app = app
+        self.poll_interval = poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._slots = threading.Semaphore(size)
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='job')
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_purge = None
+
+    def start(self):
+        """Run the dispatcher in a background thread"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run_forever, name='job-dispatcher', daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        """Check for new jobs now instead of waiting for the next poll"""
+        self._wake.set()
+
+    def run_forever(self):
+        print(f"Job pool {self.worker_id} started for {', '.join(sorted(_handlers)) or 'no job kinds'}")
+        while True:
+            self._slots.acquire()
+            claimed = None
+            try:
+                with self.app.app_context():
+                    claimed = claim_next_job(self.worker_id, list(_handlers))
+                    self._maybe_purge()
+            except Exception as e:
+                print(f"Job dispatcher error: {e}")
+
+            if claimed is None:
+                self._slots.release()
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+                continue
+            self._executor.submit(self._run, *claimed)
+
+    def _run(self, job_id, attempt):
+        try:
+            with self.app.test_request_context():
+                run_job(job_id, attempt)
+        except Exception as e:
+            print(f"Job {job_id} crashed the worker thread: {e}")
+            print(traceback.format_exc())
+        finally:
+            self._slots.release()
+
+    def _maybe_purge(self):
+        now = datetime.utcnow()
+        if self._last_purge and now - self._last_purge < timedelta(hours=1):
+            return
+        self._last_purge = now
+        purged = purge_finished_jobs()
+        if purged:
+            print(f"Purged {purged} finished jobs")
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool(app):
+    """Return this process's job pool, starting it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = JobWorkerPool(app).start()
+    return _pool
@@ -0,0 +1,327 @@
+import os
+import json
+import math
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CROP_DATABASE_PATH = os.path.join(BASE_DIR, 'data', 'database.json')
+SCHEMES_DATA_PATH = os.path.join(BASE_DIR, 'data', 'schemes_data.json')
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Title tokens are counted this many times so crop/disease names dominate
+TITLE_WEIGHT = 2
+
+# A lookup is answered locally only if the best passage clears all three bars
+KNOWLEDGE_MIN_SCORE = float(os.getenv('KNOWLEDGE_MIN_SCORE', '8.0'))
+KNOWLEDGE_MIN_COVERAGE = float(os.getenv('KNOWLEDGE_MIN_COVERAGE', '0.75'))
+KNOWLEDGE_MIN_MARGIN = float(os.getenv('KNOWLEDGE_MIN_MARGIN', '1.3'))
+# Passages injected into the LLM prompt when no local answer is given
+KNOWLEDGE_MAX_PASSAGES = int(os.getenv('KNOWLEDGE_MAX_PASSAGES', '3'))
+KNOWLEDGE_PASSAGE_CHARS = 400
+
+# Languages that can be answered from the Hindi fields of the schemes data
+HINDI_FAMILY = {'hindi', 'bhojpuri', 'bundelkhandi', 'haryanvi'}
+
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'be', 'to', 'of', 'in', 'on', 'for', 'and', 'or',
+    'what', 'which', 'how', 'when', 'should', 'can', 'do', 'does', 'i', 'my', 'me', 'we',
+    'it', 'this', 'that', 'with', 'about', 'tell', 'please', 'use', 'give', 'best', 'there',
+    'क्या', 'के', 'का', 'की', 'में', 'है', 'हैं', 'को', 'से', 'पर', 'लिए', 'कौन', 'कैसे',
+    'मेरे', 'मेरी', 'मैं', 'करें', 'करे', 'बताओ', 'बताइए', 'और', 'या', 'ka', 'ki', 'ke',
+    'me', 'mein', 'kya', 'kaise', 'liye', 'hai', 'kaun', 'batao'
+}
+
+# Question words that say what kind of answer is wanted rather than what it is about;
+# every other query term must appear in a passage's title for it to be answered locally
+GENERIC_TERMS = {
+    'disease', 'pest', 'insect', 'spray', 'control', 'treatment', 'symptom', 'fertilizer', 'manage',
+    'management', 'prevent', 'prevention', 'cure', 'remedy', 'problem', 'crop', 'farming', 'farmer',
+    'scheme', 'subsidy', 'grant', 'eligibility', 'eligible', 'document', 'apply', 'benefit', 'detail',
+}
+
+# Regional-language and romanized keywords mapped to the English vocabulary of the data files
+KEYWORD_ALIASES = {
+    # Crops - Hindi / Marathi (Devanagari)
+    'लहसुन': 'garlic', 'लसूण': 'garlic', 'आलू': 'potato', 'बटाटा': 'potato',
+    'मक्का': 'maize', 'मका': 'maize', 'मूंगफली': 'groundnut peanut', 'भुईमूग': 'groundnut peanut',
+    'गाजर': 'carrot', 'सोयाबीन': 'soybean', 'आंवला': 'aonla', 'आवळा': 'aonla',
+    'हल्दी': 'turmeric', 'हळद': 'turmeric', 'मूंग': 'moong green gram', 'ग्वार': 'guar',
+    'सरसों': 'mustard', 'मोहरी': 'mustard', 'सेम': 'sem', 'जिमीकंद': 'elephant yam', 'सूरन': 'elephant yam',
+    'खीरा': 'cucumber', 'काकडी': 'cucumber', 'कुंदरू': 'kundru', 'लौकी': 'bottle gourd',
+    'बैंगन': 'brinjal', 'वांगी': 'brinjal', 'गन्ना': 'sugarcane', 'ऊस': 'sugarcane',
+    'पत्तागोभी': 'cabbage', 'गोभी': 'cabbage', 'अरंडी': 'castor', 'एरंड': 'castor',
+    'आम': 'mango', 'आंबा': 'mango', 'किन्नू': 'kinnow', 'अमरूद': 'guava', 'पेरू': 'guava',
+    'धान': 'paddy rice', 'चावल': 'rice', 'भात': 'paddy rice', 'बाजरा': 'bajra pearl millet',
+    'बाजरी': 'bajra pearl millet', 'गेहूं': 'wheat', 'गेहूँ': 'wheat', 'गहू': 'wheat',
+    'कपास': 'cotton', 'कापूस': 'cotton', 'प्याज': 'onion', 'प्याज़': 'onion', 'कांदा': 'onion',
+    'चना': 'gram chickpea', 'हरभरा': 'gram chickpea', 'सब्जी': 'vegetables', 'सब्जियां': 'vegetables',
+    # Crops - other scripts
+    'ধান': 'paddy rice', 'আলু': 'potato', 'গম': 'wheat', 'পেঁয়াজ': 'onion', 'সরিষা': 'mustard',
+    'நெல்': 'paddy rice', 'கரும்பு': 'sugarcane', 'பருத்தி': 'cotton', 'வெங்காயம்': 'onion',
+    'వరి': 'paddy rice', 'పత్తి': 'cotton', 'మొక్కజొన్న': 'maize', 'వేరుశనగ': 'groundnut peanut',
+    'ಭತ್ತ': 'paddy rice', 'ಹತ್ತಿ': 'cotton', 'ಕಬ್ಬು': 'sugarcane', 'ಈರುಳ್ಳಿ': 'onion',
+    'ડાંગર': 'paddy rice', 'કપાસ': 'cotton', 'મગફળી': 'groundnut peanut', 'ઘઉં': 'wheat', 'ડુંગળી': 'onion',
+    'ਕਣਕ': 'wheat', 'ਝੋਨਾ': 'paddy rice', 'ਕਪਾਹ': 'cotton', 'ਗੰਨਾ': 'sugarcane', 'ਕਿੰਨੂ': 'kinnow',
+    'നെല്ല്': 'paddy rice', 'മഞ്ഞൾ': 'turmeric',
+    'گندم': 'wheat', 'کپاس': 'cotton', 'دھان': 'paddy rice', 'پیاز': 'onion', 'آلو': 'potato',
+    # Crops - romanized Hindi
+    'lahsun': 'garlic', 'aloo': 'potato', 'alu': 'potato', 'makka': 'maize', 'moongfali': 'groundnut peanut',
+    'haldi': 'turmeric', 'sarson': 'mustard', 'sarso': 'mustard', 'ganna': 'sugarcane', 'dhan': 'paddy rice',
+    'gehu': 'wheat', 'gehun': 'wheat', 'kapas': 'cotton', 'pyaj': 'onion', 'pyaz': 'onion', 'chana': 'gram chickpea',
+    'baingan': 'brinjal', 'lauki': 'bottle gourd', 'amrood': 'guava', 'aam': 'mango', 'bajra': 'bajra pearl millet',
+    # Problems and treatments
+    'रोग': 'disease', 'बीमारी': 'disease', 'रोगों': 'disease', 'कीट': 'pest insect', 'कीड़े': 'pest insect',
+    'कीड़ा': 'pest insect', 'इल्ली': 'caterpillar', 'सुंडी': 'borer caterpillar', 'छिड़काव': 'spray',
+    'स्प्रे': 'spray', 'दवा': 'spray control', 'दवाई': 'spray control', 'उपचार': 'treatment control',
+    'इलाज': 'treatment control', 'झुलसा': 'blight', 'फफूंद': 'fungal', 'माहू': 'aphid', 'चेपा': 'aphid',
+    'तेला': 'jassid', 'सफेद': 'white', 'मक्खी': 'fly', 'दीमक': 'termite', 'खाद': 'fertilizer',
+    'उर्वरक': 'fertilizer', 'लक्षण': 'symptoms', 'बीज': 'seed', 'फवारणी': 'spray', 'औषध': 'spray control',
+    'rog': 'disease', 'bimari': 'disease', 'keet': 'pest insect', 'kida': 'pest insect', 'keede': 'pest insect',
+    'dawa': 'spray control', 'dawai': 'spray control', 'ilaj': 'treatment control', 'jhulsa': 'blight',
+    'khad': 'fertilizer', 'beej': 'seed', 'mahu': 'aphid',
+    # Schemes
+    'योजना': 'scheme', 'योजनाएं': 'scheme', 'योजनाओं': 'scheme', 'सब्सिडी': 'subsidy', 'अनुदान': 'subsidy grant',
+    'पात्रता': 'eligibility eligible', 'दस्तावेज': 'documents', 'बीमा': 'insurance', 'ऋण': 'loan credit',
+    'कर्ज': 'loan credit', 'सिंचाई': 'irrigation', 'ड्रिप': 'drip', 'यंत्र': 'machinery', 'पेंशन': 'pension',
+    'yojana': 'scheme', 'bima': 'insurance', 'rin': 'loan credit', 'sinchai': 'irrigation',
+    'ਯੋਜਨਾ': 'scheme', 'ਸਕੀਮ': 'scheme', 'যোজনা': 'scheme', 'প্রকল্প': 'scheme', 'திட்டம்': 'scheme',
+    'పథకం': 'scheme', 'ಯೋಜನೆ': 'scheme', 'યોજના': 'scheme', 'പദ്ധതി': 'scheme', 'اسکیم': 'scheme', 'یوجنا': 'scheme',
+}
+
+
+def tokenize(text):
+    """
+    Split text into lowercase tokens for any of the supported scripts.
+
+    Letters, combining marks (Indic vowel signs) and digits are kept;
+    punctuation, symbols and whitespace separate tokens.
+    """
+    chars = []
+    for ch in unicodedata.normalize('NFC', text.lower()):
+        category = unicodedata.category(ch)
+        chars.append(ch if category[0] in 'LMN' else ' ')
+    tokens = []
+    for token in ''.join(chars).split():
+        # Crude English plural folding ("aphids" -> "aphid")
+        if token.isascii() and len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def query_term_groups(query):
+    """
+    Tokenize a query, drop stopwords and expand multilingual aliases
+
+    Returns:
+        list: One list of terms per distinct query word (several when an alias expands)
+    """
+    groups = {}
+    for token in tokenize(query):
+        if token in STOPWORDS or token in groups:
+            continue
+        alias = KEYWORD_ALIASES.get(token)
+        groups[token] = tokenize(alias) if alias else [token]
+    return list(groups.values())
+
+
+def query_terms(query):
+    """Tokenize a query, drop stopwords and expand multilingual aliases"""
+    return [term for group in query_term_groups(query) for term in group]
+
+
+class Passage:
+    """A retrievable unit of knowledge with an English and optional Hindi answer"""
+
+    def __init__(self, kind, title, text, text_hindi=None, extra_index_text='', title_hindi=''):
+        self.kind = kind
+        self.title = title
+        self.text = text
+        self.text_hindi = text_hindi
+        # Words naming the crop, problem or scheme the passage is about
+        self.title_terms = set(tokenize(title)) | set(tokenize(title_hindi))
+        tokens = tokenize(title) * TITLE_WEIGHT + tokenize(text)
+        if text_hindi:
+            tokens += tokenize(text_hindi)
+        if extra_index_text:
+            tokens += tokenize(extra_index_text)
+        self.term_counts = Counter(tokens)
+        self.length = len(tokens)
+
+    def answer(self, language):
+        """Return the passage formatted for the user, or None if not available in that language"""
+        if language == 'english':
+            return f"**{self.title}**\n{self.text}"
+        if language in HINDI_FAMILY and self.text_hindi:
+            return self.text_hindi
+        return None
+
+    def snippet(self):
+        body = f"{self.title}: {self.text}"
+        if len(body) > KNOWLEDGE_PASSAGE_CHARS:
+            body = body[:KNOWLEDGE_PASSAGE_CHARS].rstrip() + '…'
+        return body
+
+
+def _format_fields(value):
+    """Flatten a nested dict/list/str from the crop database into readable lines"""
+    if isinstance(value, dict):
+        return '\n'.join(f"{key}: {_format_fields(val)}" for key, val in value.items())
+    if isinstance(value, list):
+        return ', '.join(str(item) for item in value)
+    return str(value)
+
+
+def load_crop_passages(path=CROP_DATABASE_PATH):
+    """One passage per crop problem/tip in data/database.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    passages = []
+    for crop, sections in data.items():
+        for section, entries in sections.items():
+            if not isinstance(entries, dict):
+                passages.append(Passage('crop', f"{crop} – {section}", _format_fields(entries)))
+                continue
+            for name, details in entries.items():
+                passages.append(Passage(
+                    'crop',
+                    f"{crop} – {name}",
+                    _format_fields(details),
+                    extra_index_text=section
+                ))
+    return passages
+
+
+def load_scheme_passages(path=SCHEMES_DATA_PATH):
+    """One passage per government scheme in data/schemes_data.json"""
+    with open(path, 'r', encoding='utf-8') as f:
+        schemes = json.load(f)
+
+    passages = []
+    for scheme in schemes:
+        description = scheme.get('description') or {}
+        text = (f"Benefit: {scheme.get('benefit', '')}\n"
+                f"Eligibility: {scheme.get('eligibility', '')}\n"
+                f"Region: {scheme.get('type', '')}\n"
+                f"{description.get('english', '')}\n"
+                f"Apply: {scheme.get('apply_link', '')}")
+        text_hindi = None
+        if scheme.get('scheme_name_hindi'):
+            text_hindi = (f"**{scheme['scheme_name_hindi']}**\n"
+                          f"लाभ: {scheme.get('benefit_hindi', '')}\n"
+                          f"पात्रता: {scheme.get('eligibility_hindi', '')}\n"
+                          f"{description.get('hindi', '')}\n"
+                          f"आवेदन: {scheme.get('apply_link', '')}")
+        passages.append(Passage(
+            'scheme',
+            scheme.get('scheme_name', ''),
+            text,
+            text_hindi=text_hindi,
+            extra_index_text='scheme ' + ' '.join(scheme.get('documents_required', [])),
+            title_hindi=scheme.get('scheme_name_hindi', '')
+        ))
+    return passages
+
+
+class KnowledgeIndex:
+    """BM25 inverted index over crop and scheme passages"""
+
+    def __init__(self, passages):
+        self.passages = passages
+        self.postings = defaultdict(list)
+        for doc_id, passage in enumerate(passages):
+            for term, count in passage.term_counts.items():
+                self.postings[term].append((doc_id, count))
+        total_length = sum(passage.length for passage in passages)
+        self.avg_length = total_length / len(passages) if passages else 0.0
+        n_docs = len(passages)
+        self.idf = {
+            term: math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, limit=KNOWLEDGE_MAX_PASSAGES):
+        """
+        Rank passages for a query.
+
+        Returns:
+            tuple: (hits, groups) where hits is a list of (score, passage, matched_terms)
+                   sorted best first and groups are the query's term groups
+                   (query_term_groups), including words the index has never seen
+        """
+        groups = query_term_groups(query)
+        terms = [term for term in dict.fromkeys(term for group in groups for term in group) if term in self.postings]
+        scores = defaultdict(float)
+        matched = defaultdict(set)
+        for term in terms:
+            idf = self.idf[term]
+            for doc_id, tf in self.postings[term]:
+                length_norm = 1 - BM25_B + BM25_B * self.passages[doc_id].length / self.avg_length
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+                matched[doc_id].add(term)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        hits = [(score, self.passages[doc_id], matched[doc_id]) for doc_id, score in ranked]
+        return hits, groups
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index():
+    """Build the index on first use and share it for the life of the worker"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                passages = []
+                for loader in (load_crop_passages, load_scheme_passages):
+                    try:
+                        passages.extend(loader())
+                    except (OSError, ValueError) as e:
+                        print(f"Could not load knowledge base with {loader.__name__}: {e}")
+                _index = KnowledgeIndex(passages)
+                print(f"Knowledge index built with {len(passages)} passages")
+    return _index
+
+
+def retrieve(query, language='english'):
+    """
+    Look a query up in the local knowledge base.
+
+    Args:
+        query: The user's question
+        language: Response language (english, hindi, etc.)
+
+    Returns:
+        dict: {'answer': str or None, 'passages': [str, ...]}. 'answer' is set
+              only for confident lookups that can be shown in that language;
+              'passages' are prompt snippets for the LLM otherwise.
+    """
+    index = get_knowledge_index()
+    hits, groups = index.search(query)
+    if not hits:
+        return {'answer': None, 'passages': []}
+
+    top_score, top_passage, top_matched = hits[0]
+    runner_up = hits[1][0] if len(hits) > 1 else 0.0
+    # Coverage counts every query word, so words the index does not know ("PM") lower it
+    coverage = sum(1 for group in groups if top_matched.intersection(group)) / len(groups) if groups else 0.0
+    # The passage must be about what was asked: "PM Kisan" is not "Mukhyamantri Kisan Kalyan Yojana"
+    on_topic = all(top_passage.title_terms.intersection(group)
+                   for group in groups if not GENERIC_TERMS.intersection(group))
+
+    answer = None
+    if (top_score >= KNOWLEDGE_MIN_SCORE
+            and coverage >= KNOWLEDGE_MIN_COVERAGE
+            and top_score >= KNOWLEDGE_MIN_MARGIN * runner_up
+            and on_topic):
+        answer = top_passage.answer(language)
+
+    return {'answer': answer, 'passages': [passage.snippet() for _, passage, _ in hits]}
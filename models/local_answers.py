@@ -0,0 +1,238 @@
+"""
+Answers to explicit forecast and mandi price requests from the app's own data.
+
+intent_router.local_route decides that a chat message is such a request
+("कल बारिश होगी क्या", "wheat mandi price today"); these functions answer
+it from the same sources as the Weather and Mandi pages: the Open-Meteo
+forecast for the farmer's saved location and the latest rows of the
+mandi_data table. Answers depend on who is asking, so they are built
+outside the shared text-query single-flight. When the data is not available
+(no saved location, no matching commodity, an upstream error, or a chat
+language these templates do not cover) they return None and the query goes
+to the knowledge base and the LLM as usual.
+"""
+import time
+import threading
+from .http_client import http_client
+from .knowledge_retriever import HINDI_FAMILY, query_terms, tokenize
+from .fetch_weather import get_location_name, get_weather_condition
+
+FORECAST_DAYS = 3
+# Markets listed in a price answer
+MANDI_MAX_MARKETS = 5
+# How long (seconds) the list of commodity names in mandi_data is reused
+COMMODITY_CACHE_SECONDS = 3600
+
+DAY_NAMES = {
+    'english': ['Today', 'Tomorrow', 'Day after tomorrow'],
+    'hindi': ['आज', 'कल', 'परसों'],
+}
+
+# Hindi wording for WMO weather code ranges (upper bound inclusive)
+HINDI_CONDITIONS = [
+    (0, 'साफ आसमान'), (3, 'आंशिक बादल'), (48, 'कोहरा'), (57, 'बूंदाबांदी'), (67, 'बारिश'),
+    (77, 'बर्फबारी'), (82, 'बौछारें'), (86, 'बर्फ की बौछारें'), (99, 'आंधी-तूफान'),
+]
+
+
+def answer_language(language):
+    """'english' or 'hindi' for languages these answers are written in, else None"""
+    if language == 'english':
+        return 'english'
+    if language in HINDI_FAMILY:
+        return 'hindi'
+    return None
+
+
+def _hindi_condition(code):
+    for upper, condition in HINDI_CONDITIONS:
+        if code <= upper:
+            return condition
+    return 'मौसम सामान्य'
+
+
+def weather_answer(latitude, longitude, language):
+    """
+    Short forecast for the next FORECAST_DAYS days at a location
+
+    Args:
+        latitude: Farmer's saved latitude
+        longitude: Farmer's saved longitude
+        language: Chat language
+
+    Returns:
+        str: Forecast text, or None if it cannot be answered here
+    """
+    language = answer_language(language)
+    if language is None or latitude is None or longitude is None:
+        return None
+
+    url = http_client.url('open_meteo', f"/v1/forecast?latitude={latitude}&longitude={longitude}"
+                                        f"&daily=weathercode,temperature_2m_max,temperature_2m_min,precipitation_sum"
+                                        f"&forecast_days={FORECAST_DAYS}&timezone=auto")
+    response = http_client.get('open_meteo', url)
+    if response.status_code != 200:
+        print(f"Forecast for chat answer failed: {response.status_code}")
+        return None
+    daily = response.json().get('daily', {})
+    codes = daily.get('weathercode') or []
+    if not codes:
+        return None
+
+    location = get_location_name(latitude, longitude)
+    lines = [f"**{location} का मौसम पूर्वानुमान**" if language == 'hindi' else f"**Weather forecast for {location}**"]
+    for day, code in enumerate(codes[:FORECAST_DAYS]):
+        low = daily.get('temperature_2m_min', [None] * len(codes))[day]
+        high = daily.get('temperature_2m_max', [None] * len(codes))[day]
+        rain = daily.get('precipitation_sum', [0] * len(codes))[day] or 0
+        name = DAY_NAMES[language][day]
+        if language == 'hindi':
+            rain_text = f"बारिश {rain:.0f} मिमी" if rain >= 1 else "बारिश नहीं"
+            lines.append(f"- {name}: {_hindi_condition(code)}, {low:.0f}–{high:.0f}°C, {rain_text}")
+        else:
+            rain_text = f"{rain:.0f} mm rain" if rain >= 1 else "no rain"
+            lines.append(f"- {name}: {get_weather_condition(code)}, {low:.0f}–{high:.0f}°C, {rain_text}")
+
+    if any((rain or 0) >= 5 for rain in daily.get('precipitation_sum', [])[:FORECAST_DAYS]):
+        lines.append("बारिश की संभावना है, छिड़काव और सिंचाई टाल दें।" if language == 'hindi'
+                     else "Rain is expected; hold off spraying and irrigation.")
+    return '\n'.join(lines)
+
+
+_commodities = None
+_commodities_loaded_at = 0.0
+_commodities_lock = threading.Lock()
+
+
+def mandi_commodities():
+    """Distinct commodity names in mandi_data, cached for COMMODITY_CACHE_SECONDS"""
+    global _commodities, _commodities_loaded_at
+    with _commodities_lock:
+        if _commodities is None or time.monotonic() - _commodities_loaded_at > COMMODITY_CACHE_SECONDS:
+            from sqlalchemy import text
+            from .database import db
+            with db.engine.connect() as conn:
+                rows = conn.execute(text("SELECT DISTINCT commodity FROM mandi_data")).fetchall()
+            _commodities = [row[0] for row in rows if row[0]]
+            _commodities_loaded_at = time.monotonic()
+        return _commodities
+
+
+def find_commodity(query):
+    """
+    The mandi_data commodity a query asks about ("गेहूं का भाव" -> "Wheat"), or None
+
+    Query words go through the knowledge base's multilingual aliases, so Hindi
+    and romanized crop names match the English names used by data.gov.in.
+    """
+    terms = set(query_terms(query))
+    best = None
+    for commodity in mandi_commodities():
+        tokens = tokenize(commodity)
+        if not terms.intersection(tokens):
+            continue
+        # Prefer "Wheat" over "Wheat Atta": the name that starts with a query word, then the shortest
+        rank = (tokens[0] not in terms, len(tokens))
+        if best is None or rank < best[0]:
+            best = (rank, commodity)
+    return best[1] if best else None
+
+
+def is_mandi_commodity(query):
+    """Whether a query names a commodity in mandi_data (False if the table cannot be read)"""
+    try:
+        return find_commodity(query) is not None
+    except Exception as e:
+        print(f"Error looking up mandi commodities: {e}")
+        return False
+
+
+def user_state(latitude, longitude):
+    """State name for a location from reverse geocoding, or None"""
+    if latitude is None or longitude is None:
+        return None
+    try:
+        url = http_client.url('nominatim', f"/reverse?format=json&lat={latitude}&lon={longitude}")
+        response = http_client.get('nominatim', url, headers={'User-Agent': 'GreenSathi/1.0'})
+        if response.status_code == 200:
+            return response.json().get('address', {}).get('state')
+    except Exception as e:
+        print(f"Error getting state for mandi answer: {e}")
+    return None
+
+
+def mandi_answer(query, language, latitude=None, longitude=None):
+    """
+    Latest mandi prices for the commodity a query names, in the farmer's state where available
+
+    Args:
+        query: The user's question
+        language: Chat language
+        latitude: Farmer's saved latitude (optional)
+        longitude: Farmer's saved longitude (optional)
+
+    Returns:
+        str: Price text, or None if it cannot be answered here
+    """
+    language = answer_language(language)
+    if language is None:
+        return None
+    commodity = find_commodity(query)
+    if commodity is None:
+        return None
+
+    from sqlalchemy import text
+    from .database import db
+    sql = ("SELECT market, district, state, arrival_date, min_price, max_price, modal_price FROM mandi_data "
+           "WHERE commodity = :commodity{} ORDER BY arrival_date DESC, modal_price DESC LIMIT :limit")
+    params = {'commodity': commodity, 'limit': MANDI_MAX_MARKETS}
+    rows = []
+    state = user_state(latitude, longitude)
+    # Own connection, so a failed lookup cannot roll back the caller's pending chat messages
+    with db.engine.connect() as conn:
+        if state:
+            rows = conn.execute(text(sql.format(" AND state = :state")), dict(params, state=state)).fetchall()
+        if not rows:
+            rows = conn.execute(text(sql.format('')), params).fetchall()
+    if not rows:
+        return None
+
+    date = rows[0][3]
+    date = date.strftime('%d-%m-%Y') if hasattr(date, 'strftime') else str(date)
+    if language == 'hindi':
+        lines = [f"**{commodity} के ताज़ा मंडी भाव ({date})**"]
+    else:
+        lines = [f"**Latest {commodity} mandi prices ({date})**"]
+    for market, district, row_state, _, min_price, max_price, modal_price in rows:
+        place = ', '.join(part for part in (market, district, row_state) if part)
+        if language == 'hindi':
+            lines.append(f"- {place}: ₹{modal_price:,.0f}/क्विंटल (₹{min_price:,.0f}–₹{max_price:,.0f})")
+        else:
+            lines.append(f"- {place}: ₹{modal_price:,.0f}/quintal (₹{min_price:,.0f}–₹{max_price:,.0f})")
+    lines.append("पूरी सूची मंडी पेज पर देखें।" if language == 'hindi' else "See the Mandi page for every market.")
+    return '\n'.join(lines)
+
+
+def answer_locally(intent, query, language, user=None):
+    """
+    Answer a weather or mandi request from the app's data
+
+    Args:
+        intent: 'weather' or 'mandi' (from intent_router.local_route)
+        query: The user's question
+        language: Chat language
+        user: models.user.User asking, for their saved location (optional)
+
+    Returns:
+        str: The answer, or None to send the query down the normal KB/LLM path
+    """
+    latitude = getattr(user, 'latitude', None)
+    longitude = getattr(user, 'longitude', None)
+    try:
+        if intent == 'weather':
+            return weather_answer(latitude, longitude, language)
+        if intent == 'mandi':
+            return mandi_answer(query, language, latitude, longitude)
+    except Exception as e:
+        print(f"Local {intent} answer failed: {e}")
+    return None
@@ -0,0 +1,219 @@
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from .cooperative import run_blocking
+
+# Backend name: 'transformers', 'llama_cpp' or 'none' (disabled)
+LOCAL_LLM_BACKEND = os.getenv('LOCAL_LLM_BACKEND', 'none').lower()
+# HuggingFace model id (transformers) or path to a GGUF file (llama_cpp)
+LOCAL_LLM_MODEL = os.getenv('LOCAL_LLM_MODEL', 'Qwen/Qwen2.5-0.5B-Instruct')
+LOCAL_LLM_MAX_NEW_TOKENS = int(os.getenv('LOCAL_LLM_MAX_NEW_TOKENS', '256'))
+LOCAL_LLM_MAX_BATCH = int(os.getenv('LOCAL_LLM_MAX_BATCH', '4'))
+# How long (seconds) the engine waits to fill a batch after the first request arrives
+LOCAL_LLM_BATCH_WAIT = float(os.getenv('LOCAL_LLM_BATCH_WAIT', '0.05'))
+LOCAL_LLM_MAX_QUEUE = int(os.getenv('LOCAL_LLM_MAX_QUEUE', '8'))
+LOCAL_LLM_TIMEOUT = float(os.getenv('LOCAL_LLM_TIMEOUT', '20'))
+LOCAL_LLM_THREADS = int(os.getenv('LOCAL_LLM_THREADS', str(os.cpu_count() or 2)))
+
+
+class LocalLLMUnavailable(Exception):
+    """Raised when the local engine is disabled, overloaded or too slow"""
+
+
+class TransformersBackend:
+    """Small instruct model run with transformers on CPU, generating whole batches at once"""
+
+    supports_batching = True
+
+    def __init__(self, model_name):
+        import torch
+        from transformers import AutoTokenizer, AutoModelForCausalLM
+
+        torch.set_num_threads(LOCAL_LLM_THREADS)
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.tokenizer.padding_side = 'left'
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=torch.float32)
+        self.model.eval()
+
+    def _render(self, messages):
+        if hasattr(self.tokenizer, 'apply_chat_template') and self.tokenizer.chat_template:
+            return self.tokenizer.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
+        # Older tokenizers without chat templates
+        lines = [f"{message['role'].capitalize()}: {message['content']}" for message in messages]
+        return '\n'.join(lines) + '\nAssistant:'
+
+    def generate(self, batch, max_new_tokens):
+        prompts = [self._render(messages) for messages in batch]
+        inputs = self.tokenizer(prompts, return_tensors='pt', padding=True)
+        with self.torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        new_tokens = output[:, inputs['input_ids'].shape[1]:]
+        return [text.strip() for text in self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)]
+
+
+class LlamaCppBackend:
+    """Quantized GGUF model run with llama.cpp; requests in a batch are decoded one after another"""
+
+    supports_batching = False
+
+    def __init__(self, model_path):
+        from llama_cpp import Llama
+
+        self.llm = Llama(model_path=model_path, n_ctx=2048, n_threads=LOCAL_LLM_THREADS, verbose=False)
+
+    def generate(self, batch, max_new_tokens):
+        results = []
+        for messages in batch:
+            completion = self.llm.create_chat_completion(messages=messages, max_tokens=max_new_tokens, temperature=0.2)
+            results.append(completion['choices'][0]['message']['content'].strip())
+        return results
+
+
+LOCAL_LLM_BACKENDS = {
+    'transformers': TransformersBackend,
+    'llama_cpp': LlamaCppBackend,
+}
+
+
+class LocalLLMEngine:
+    """
+    Single background thread that owns the model and serves requests in micro-batches.
+
+    The model is loaded once per worker process, on the first request. The
+    queue is bounded so a burst of offline traffic fails fast instead of
+    piling up, and every request carries a deadline after which the caller
+    gives up and the engine skips it.
+    """
+
+    def __init__(self, backend_name=LOCAL_LLM_BACKEND, model=LOCAL_LLM_MODEL, max_batch=LOCAL_LLM_MAX_BATCH,
+                 batch_wait=LOCAL_LLM_BATCH_WAIT, max_queue=LOCAL_LLM_MAX_QUEUE):
+        self.backend_name = backend_name
+        self.model = model
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._backend = None
+        self._load_error = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend_name in LOCAL_LLM_BACKENDS and self._load_error is None
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='local-llm', daemon=True)
+                self._thread.start()
+
+    def generate(self, messages, max_new_tokens=LOCAL_LLM_MAX_NEW_TOKENS, timeout=LOCAL_LLM_TIMEOUT):
+        """
+        Generate a reply for a chat-style message list.
+
+        Args:
+            messages: List of {'role': ..., 'content': ...} dicts
+            max_new_tokens: Generation limit
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            str: Generated text
+
+        Raises:
+            LocalLLMUnavailable: If disabled, the queue is full, loading failed or the deadline passed
+        """
+        if not self.enabled:
+            raise LocalLLMUnavailable(self._load_error or f"Local LLM backend '{self.backend_name}' is not enabled")
+
+        self._ensure_started()
+        future = Future()
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put_nowait((messages, max_new_tokens, deadline, future))
+        except queue.Full:
+            raise LocalLLMUnavailable("Local LLM queue is full")
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # The worker drops requests whose deadline has passed
+            raise LocalLLMUnavailable(f"Local LLM did not answer within {timeout}s")
+
+    def _load(self):
+        started = time.monotonic()
+        try:
+            self._backend = run_blocking(LOCAL_LLM_BACKENDS[self.backend_name], self.model)
+            print(f"Loaded local LLM '{self.model}' with {self.backend_name} in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            self._load_error = f"Failed to load local LLM '{self.model}': {e}"
+            print(self._load_error)
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        max_batch = self.max_batch if self._backend.supports_batching else 1
+        batch_deadline = time.monotonic() + self.batch_wait
+        while len(batch) < max_batch:
+            remaining = batch_deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        self._load()
+        while True:
+            if self._backend is None:
+                # Loading failed: fail everything that is (or gets) queued
+                _, _, _, future = self._queue.get()
+                future.set_exception(LocalLLMUnavailable(self._load_error))
+                continue
+
+            batch = self._next_batch()
+            now = time.monotonic()
+            live = []
+            for item in batch:
+                if item[2] <= now:
+                    item[3].set_exception(LocalLLMUnavailable("Local LLM request expired in queue"))
+                elif item[3].set_running_or_notify_cancel():
+                    live.append(item)
+            if not live:
+                continue
+
+            try:
+                max_new_tokens = max(item[1] for item in live)
+                outputs = run_blocking(self._backend.generate, [item[0] for item in live], max_new_tokens)
+                for item, text in zip(live, outputs):
+                    item[3].set_result(text)
+            except Exception as e:
+                print(f"Local LLM generation error: {e}")
+                for item in live:
+                    item[3].set_exception(e)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_local_llm():
+    """Return the per-process local LLM engine"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LocalLLMEngine()
+    return _engine
@@ -0,0 +1,285 @@
+"""
+Local CPU speech recognition with faster-whisper (CTranslate2, int8).
+
+The model is loaded once per worker process, by a single background thread
+that owns it. Utterances of up to 30 seconds that arrive within
+LOCAL_STT_BATCH_WAIT of each other (the segments of one long voice note,
+or voice notes from different users) are encoded and decoded as one batch;
+longer audio is transcribed on its own. speech_handler uses this engine
+for the languages in LOCAL_STT_LANGUAGES and falls back to Google Speech
+when it is disabled, overloaded or fails.
+"""
+import os
+import time
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from .cooperative import run_blocking
+
+# Backend name: 'faster_whisper' or 'none' (disabled)
+LOCAL_STT_BACKEND = os.getenv('LOCAL_STT_BACKEND', 'none').lower()
+# Whisper size (tiny, base, small, ...) or path to a CTranslate2 model directory
+LOCAL_STT_MODEL = os.getenv('LOCAL_STT_MODEL', 'small')
+# CTranslate2 compute type; int8 keeps 'small' at about 500 MB and fast on CPU
+LOCAL_STT_COMPUTE_TYPE = os.getenv('LOCAL_STT_COMPUTE_TYPE', 'int8')
+# Whisper language codes recognized locally (comma separated, or 'all'); others go to Google
+LOCAL_STT_LANGUAGES = {
+    code.strip().lower() for code in os.getenv('LOCAL_STT_LANGUAGES', 'all').split(',') if code.strip()
+}
+LOCAL_STT_BEAM_SIZE = int(os.getenv('LOCAL_STT_BEAM_SIZE', '1'))
+LOCAL_STT_MAX_BATCH = int(os.getenv('LOCAL_STT_MAX_BATCH', '8'))
+# How long (seconds) the engine waits to fill a batch after the first utterance arrives
+LOCAL_STT_BATCH_WAIT = float(os.getenv('LOCAL_STT_BATCH_WAIT', '0.05'))
+LOCAL_STT_MAX_QUEUE = int(os.getenv('LOCAL_STT_MAX_QUEUE', '16'))
+LOCAL_STT_TIMEOUT = float(os.getenv('LOCAL_STT_TIMEOUT', '30'))
+LOCAL_STT_THREADS = int(os.getenv('LOCAL_STT_THREADS', str(os.cpu_count() or 2)))
+
+SAMPLE_RATE = 16000
+# Whisper's input window; shorter utterances are padded to it and can share a batch
+WINDOW_SECONDS = 30
+
+
+class LocalSTTUnavailable(Exception):
+    """Raised when the local recognizer is disabled, overloaded or too slow"""
+
+
+class FasterWhisperBackend:
+    """Whisper run with CTranslate2 on CPU, encoding and decoding whole batches at once"""
+
+    def __init__(self, model_name):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(model_name, device='cpu', compute_type=LOCAL_STT_COMPUTE_TYPE,
+                                  cpu_threads=LOCAL_STT_THREADS)
+
+    def _tokenizer(self, language):
+        from faster_whisper.tokenizer import Tokenizer
+        return Tokenizer(self.model.hf_tokenizer, self.model.model.is_multilingual,
+                         task='transcribe', language=language)
+
+    def transcribe_batch(self, batch):
+        """
+        Transcribe utterances of at most WINDOW_SECONDS in one encoder and decoder pass
+
+        Args:
+            batch: List of (float32 samples at 16 kHz, Whisper language code)
+
+        Returns:
+            list: Transcripts in the order of batch
+        """
+        import numpy as np
+        from faster_whisper.audio import pad_or_trim
+
+        features = np.stack([
+            pad_or_trim(self.model.feature_extractor(samples)[..., :-1]) for samples, _ in batch
+        ])
+        tokenizers = [self._tokenizer(language) for _, language in batch]
+        prompts = [tokenizer.sot_sequence + [tokenizer.no_timestamps] for tokenizer in tokenizers]
+        results = self.model.model.generate(
+            self.model.encode(features), prompts,
+            beam_size=LOCAL_STT_BEAM_SIZE, max_length=self.model.max_length, suppress_blank=True
+        )
+        return [tokenizer.decode(result.sequences_ids[0]).strip() for tokenizer, result in zip(tokenizers, results)]
+
+    def transcribe(self, samples, language):
+        """Transcribe audio longer than one window with faster-whisper's own windowing"""
+        segments, _ = self.model.transcribe(samples, language=language, beam_size=LOCAL_STT_BEAM_SIZE,
+                                            condition_on_previous_text=False)
+        return ' '.join(segment.text.strip() for segment in segments).strip()
+
+
+LOCAL_STT_BACKENDS = {
+    'faster_whisper': FasterWhisperBackend,
+}
+
+
+def local_stt_languages():
+    """Whisper language codes recognized locally, or None for all"""
+    return None if 'all' in LOCAL_STT_LANGUAGES else LOCAL_STT_LANGUAGES
+
+
+class LocalSTTEngine:
+    """
+    Single background thread that owns the Whisper model and serves utterances in micro-batches.
+
+    Like the local LLM engine, the queue is bounded so a burst of voice
+    notes fails over to Google instead of piling up, and every utterance
+    carries a deadline after which the caller gives up and the engine
+    skips it.
+    """
+
+    def __init__(self, backend_name=LOCAL_STT_BACKEND, model=LOCAL_STT_MODEL, max_batch=LOCAL_STT_MAX_BATCH,
+                 batch_wait=LOCAL_STT_BATCH_WAIT, max_queue=LOCAL_STT_MAX_QUEUE):
+        self.backend_name = backend_name
+        self.model = model
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._backend = None
+        self._load_error = None
+        self._loaded = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {'utterances': 0, 'batches': 0, 'batched_utterances': 0, 'long_utterances': 0, 'errors': 0}
+
+    @property
+    def enabled(self):
+        return self.backend_name in LOCAL_STT_BACKENDS and self._load_error is None
+
+    def handles(self, language):
+        """Whether utterances in a Whisper language code should be recognized locally"""
+        languages = local_stt_languages()
+        return self.enabled and (languages is None or language in languages)
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='local-stt', daemon=True)
+                self._thread.start()
+
+    def load(self, timeout=None):
+        """Start the engine and wait until the model is loaded (used by warm_up)"""
+        if not self.enabled:
+            return False
+        self._ensure_started()
+        self._loaded.wait(timeout)
+        return self._backend is not None
+
+    def transcribe(self, samples, language, timeout=LOCAL_STT_TIMEOUT):
+        """
+        Transcribe one utterance.
+
+        Args:
+            samples: int16 numpy array, mono, 16 kHz
+            language: Whisper language code ("en", "hi", ...)
+            timeout: Seconds to wait before giving up
+
+        Returns:
+            str: Transcript, empty if Whisper heard no words
+
+        Raises:
+            LocalSTTUnavailable: If disabled, the queue is full, loading failed or the deadline passed
+        """
+        if not self.enabled:
+            raise LocalSTTUnavailable(self._load_error or f"Local STT backend '{self.backend_name}' is not enabled")
+
+        self._ensure_started()
+        future = Future()
+        deadline = time.monotonic() + timeout
+        audio = samples.astype('float32') / 32768.0
+        try:
+            self._queue.put_nowait((audio, language, deadline, future))
+        except queue.Full:
+            raise LocalSTTUnavailable("Local STT queue is full")
+
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # The worker drops utterances whose deadline has passed
+            raise LocalSTTUnavailable(f"Local STT did not answer within {timeout}s")
+
+    def _load(self):
+        started = time.monotonic()
+        try:
+            self._backend = run_blocking(LOCAL_STT_BACKENDS[self.backend_name], self.model)
+            print(f"Loaded Whisper '{self.model}' ({LOCAL_STT_COMPUTE_TYPE}) with {self.backend_name} "
+                  f"in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            self._load_error = f"Failed to load Whisper '{self.model}': {e}"
+            print(self._load_error)
+        finally:
+            self._loaded.set()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        batch_deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = batch_deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _count(self, **amounts):
+        with self._stats_lock:
+            for stat, amount in amounts.items():
+                self.stats[stat] += amount
+
+    def _run(self):
+        self._load()
+        while True:
+            if self._backend is None:
+                # Loading failed: fail everything that is (or gets) queued
+                _, _, _, future = self._queue.get()
+                future.set_exception(LocalSTTUnavailable(self._load_error))
+                continue
+
+            batch = self._next_batch()
+            now = time.monotonic()
+            live = []
+            for item in batch:
+                if item[2] <= now:
+                    item[3].set_exception(LocalSTTUnavailable("Local STT utterance expired in queue"))
+                elif item[3].set_running_or_notify_cancel():
+                    live.append(item)
+            if not live:
+                continue
+
+            short = [item for item in live if len(item[0]) <= WINDOW_SECONDS * SAMPLE_RATE]
+            long = [item for item in live if len(item[0]) > WINDOW_SECONDS * SAMPLE_RATE]
+            self._count(utterances=len(live), long_utterances=len(long))
+            if short:
+                try:
+                    texts = run_blocking(self._backend.transcribe_batch, [(item[0], item[1]) for item in short])
+                    self._count(batches=1, batched_utterances=len(short))
+                    for item, text in zip(short, texts):
+                        item[3].set_result(text)
+                except Exception as e:
+                    print(f"Local STT batch error: {e}")
+                    self._count(errors=len(short))
+                    for item in short:
+                        item[3].set_exception(e)
+            for item in long:
+                try:
+                    item[3].set_result(run_blocking(self._backend.transcribe, item[0], item[1]))
+                except Exception as e:
+                    print(f"Local STT error: {e}")
+                    self._count(errors=1)
+                    item[3].set_exception(e)
+
+    def metrics(self):
+        """Utterance and batch counters for this process"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['backend'] = self.backend_name
+        stats['model'] = self.model
+        stats['loaded'] = self._backend is not None
+        stats['avg_batch_size'] = round(stats['batched_utterances'] / stats['batches'], 2) if stats['batches'] else 0.0
+        return stats
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_local_stt():
+    """Return the per-process local STT engine"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = LocalSTTEngine()
+    return _engine
+
+
+def warm_up():
+    """Load the Whisper model now rather than on the first voice request"""
+    engine = get_local_stt()
+    if engine.enabled:
+        engine.load(timeout=LOCAL_STT_TIMEOUT * 10)
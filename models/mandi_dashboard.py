@@ -0,0 +1,67 @@
+def build_dashboard_data(rows, analysis_type='latest'):
+    """
+    Shape mandi_data rows into the dashboard's table and chart series.
+
+    Args:
+        rows: (market, commodity, variety, grade, arrival_date, min_price, max_price, modal_price) tuples
+        analysis_type: 'latest' or 'past' (price trends are only filled for 'past')
+
+    Returns:
+        dict: table_data, price_trends, commodity_distribution, market_comparison and price_ranges
+    """
+    # Process data for different visualizations
+    result = {
+        'table_data': [],
+        'price_trends': {'labels': [], 'modal_prices': []},
+        'commodity_distribution': {'labels': [], 'values': []},
+        'market_comparison': {'labels': [], 'prices': []},
+        'price_ranges': {'labels': [], 'ranges': []}
+    }
+
+    # Process data for table and charts
+    for row in rows:
+        # Table data
+        result['table_data'].append({
+            'market': row[0],
+            'commodity': row[1],
+            'variety': row[2],
+            'grade': row[3],
+            'arrival_date': row[4],
+            'min_price': row[5],
+            'max_price': row[6],
+            'modal_price': row[7]
+        })
+
+        # Price trends (only for past analysis)
+        if analysis_type == 'past':
+            result['price_trends']['labels'].append(row[4].strftime('%Y-%m-%d'))
+            result['price_trends']['modal_prices'].append(float(row[7]))
+
+        # Commodity distribution
+        if row[1] not in result['commodity_distribution']['labels']:
+            result['commodity_distribution']['labels'].append(row[1])
+            result['commodity_distribution']['values'].append(1)
+        else:
+            idx = result['commodity_distribution']['labels'].index(row[1])
+            result['commodity_distribution']['values'][idx] += 1
+
+        # Market comparison
+        if row[0] not in result['market_comparison']['labels']:
+            result['market_comparison']['labels'].append(row[0])
+            result['market_comparison']['prices'].append(float(row[7]))
+        else:
+            idx = result['market_comparison']['labels'].index(row[0])
+            result['market_comparison']['prices'][idx] = (result['market_comparison']['prices'][idx] + float(row[7])) / 2
+
+        # Price ranges
+        if row[1] not in result['price_ranges']['labels']:
+            result['price_ranges']['labels'].append(row[1])
+            result['price_ranges']['ranges'].append([float(row[5]), float(row[7]), float(row[6])])
+        else:
+            idx = result['price_ranges']['labels'].index(row[1])
+            current_range = result['price_ranges']['ranges'][idx]
+            current_range[0] = min(current_range[0], float(row[5]))
+            current_range[1] = (current_range[1] + float(row[7])) / 2
+            current_range[2] = max(current_range[2], float(row[6]))
+
+    return result
@@ -0,0 +1,233 @@
+import os
+import json
+import time
+import zlib
+import hashlib
+import threading
+from concurrent.futures import Future
+
+# fcntl is POSIX-only; on Windows the cross-worker lock is simply disabled
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+# Directory for cross-worker lock/result files (unset = coalesce within this worker only)
+SINGLE_FLIGHT_LOCK_DIR = os.getenv('SINGLE_FLIGHT_LOCK_DIR')
+# How long (seconds) a result written by another worker may be reused
+SINGLE_FLIGHT_RESULT_TTL = float(os.getenv('SINGLE_FLIGHT_RESULT_TTL', '10'))
+# How long (seconds) to wait for another worker's lock before calling upstream anyway
+SINGLE_FLIGHT_LOCK_TIMEOUT = float(os.getenv('SINGLE_FLIGHT_LOCK_TIMEOUT', '60'))
+# Number of lock files per SingleFlight name; keys are spread over them by hash
+SINGLE_FLIGHT_LOCK_STRIPES = int(os.getenv('SINGLE_FLIGHT_LOCK_STRIPES', '256'))
+
+
+def make_key(*parts):
+    """
+    Build a stable coalescing key from the given parts.
+
+    Args:
+        *parts: Strings or bytes that identify a request
+
+    Returns:
+        str: Hex digest of the parts
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into a single upstream call.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait on the same future and receive the same
+    result or exception. When a lock directory is configured, leaders in
+    different worker processes also serialize on a lock file and reuse a
+    recent JSON result written by whichever worker ran first. Keys share a
+    fixed set of lock files (stripes), and result files older than
+    result_ttl are pruned as new ones are written, so the directory does
+    not grow with the number of distinct keys. A stripe is locked once per
+    process through one shared file and released when its last holder is
+    done, so a leader that runs another key of the same stripe (nested or in
+    another thread) does not wait on its own process.
+    """
+
+    def __init__(self, name, lock_dir=SINGLE_FLIGHT_LOCK_DIR, result_ttl=SINGLE_FLIGHT_RESULT_TTL,
+                 lock_timeout=SINGLE_FLIGHT_LOCK_TIMEOUT, lock_stripes=SINGLE_FLIGHT_LOCK_STRIPES):
+        self.name = name
+        self.lock_dir = lock_dir if (lock_dir and FCNTL_AVAILABLE) else None
+        self.result_ttl = result_ttl
+        self.lock_timeout = lock_timeout
+        self.lock_stripes = max(1, lock_stripes)
+        self._last_prune = 0.0
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stripes = {}
+        self.stats = {'leaders': 0, 'followers': 0, 'shared_from_disk': 0}
+
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Run fn(*args, **kwargs) once per key among concurrent callers.
+
+        Args:
+            key: Coalescing key (see make_key)
+            fn: Function performing the upstream call
+
+        Returns:
+            The (shared) result of fn
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+                self.stats['leaders'] += 1
+            else:
+                self.stats['followers'] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = self._run_leader(key, fn, args, kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def _run_leader(self, key, fn, args, kwargs):
+        if not self.lock_dir:
+            return fn(*args, **kwargs)
+
+        # crc32 rather than hash(), which differs between worker processes
+        stripe = zlib.crc32(key.encode('utf-8')) % self.lock_stripes
+        lock_path = os.path.join(self.lock_dir, f"{self.name}.{stripe}.lock")
+        result_path = os.path.join(self.lock_dir, f"{self.name}-{key}.json")
+
+        locked = self._acquire(stripe, lock_path)
+        try:
+            shared = self._read_result(result_path)
+            if shared is not None:
+                with self._lock:
+                    self.stats['shared_from_disk'] += 1
+                return shared['value']
+
+            result = fn(*args, **kwargs)
+            self._write_result(result_path, result)
+            return result
+        finally:
+            if locked:
+                self._release(stripe)
+
+    def _acquire(self, stripe, lock_path):
+        """
+        Take the cross-worker lock of a stripe, giving up after lock_timeout seconds
+
+        Returns:
+            bool: True if the stripe is held (and must be released with _release)
+        """
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            with self._lock:
+                held = self._stripes.get(stripe)
+                if held:
+                    held[1] += 1
+                    return True
+                lock_file = open(lock_path, 'a')
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    self._stripes[stripe] = [lock_file, 1]
+                    return True
+                except OSError:
+                    lock_file.close()
+            if time.monotonic() >= deadline:
+                print(f"Single-flight lock wait timed out for {lock_path}, calling upstream anyway")
+                return False
+            time.sleep(0.05)
+
+    def _release(self, stripe):
+        """Drop one holder of a stripe; the last one unlocks it"""
+        with self._lock:
+            held = self._stripes[stripe]
+            held[1] -= 1
+            if held[1] == 0:
+                del self._stripes[stripe]
+                fcntl.flock(held[0], fcntl.LOCK_UN)
+                held[0].close()
+
+    def _read_result(self, result_path):
+        try:
+            if time.time() - os.path.getmtime(result_path) > self.result_ttl:
+                return None
+            with open(result_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_result(self, result_path, result):
+        tmp_path = f"{result_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'value': result}, f, ensure_ascii=False)
+            os.replace(tmp_path, result_path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Could not share single-flight result for {self.name}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        self._prune()
+
+    def _prune(self):
+        """Delete this name's result files that are too old to be reused (at most once per result_ttl)"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_prune < self.result_ttl:
+                return
+            self._last_prune = now
+
+        prefix = f"{self.name}-"
+        removed = 0
+        try:
+            entries = list(os.scandir(self.lock_dir))
+        except OSError:
+            return
+        for entry in entries:
+            if not entry.name.startswith(prefix) or not entry.name.endswith(('.json', '.tmp')):
+                continue
+            try:
+                # Leftover .tmp files from a crashed writer are given extra time
+                ttl = self.result_ttl if entry.name.endswith('.json') else max(self.result_ttl, 3600)
+                if now - entry.stat().st_mtime > ttl:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                # Another worker pruned it first
+                pass
+        if removed:
+            print(f"Single-flight {self.name}: pruned {removed} expired result files")
@@ -1,12 +1,5 @@
 import os
-import pytesseract
-from PIL import Image
-import pdf2image
-import cv2
-import numpy as np
 import json
-import joblib
-import pandas as pd
 from dotenv import load_dotenv
 import tempfile
 import zipfile
@@ -16,8 +9,9 @@ from io import BytesIO
 
 load_dotenv()
 
-# Ensure pytesseract path is set
-pytesseract.pytesseract.tesseract_cmd = os.getenv('TESSERACT_PATH', r'C:\Program Files\Tesseract-OCR\tesseract.exe')
+# pytesseract, PIL, pdf2image, cv2, numpy, joblib and pandas are imported where
+# they are used so the web workers boot without them; warm_up() preloads them.
+TESSERACT_PATH = os.getenv('TESSERACT_PATH', r'C:\Program Files\Tesseract-OCR\tesseract.exe')
 
 # Load the model
 MODEL_PATH = os.path.join('models', 'crop_prediction_lightgbm new.pkl')
@@ -43,6 +37,17 @@ ACCEPTED_FORMATS = {
     'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet': 'xlsx',  # .xlsx
 }
 
+def _pytesseract():
+    """pytesseract, pointed at the configured tesseract binary"""
+    import pytesseract
+    pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+    return pytesseract
+
+def warm_up():
+    """Import the OCR and model libraries now rather than on the first soil report"""
+    import PIL.Image, pdf2image, cv2, numpy, joblib, pandas  # noqa: F401
+    _pytesseract()
+
 def convert_file_to_image(file_path):
     """
     Convert various file formats to an image that can be processed
@@ -55,6 +60,8 @@ def convert_file_to_image(file_path):
                If success is False, the result contains an error message
     """
     try:
+        import numpy as np
+
         # Get file extension and determine file type
         file_ext = os.path.splitext(file_path)[1].lower()
         mime_type = mimetypes.guess_type(file_path)[0]
@@ -76,6 +83,7 @@ def convert_file_to_image(file_path):
         # Handle based on format type
         if format_type == 'image':
             # Just load the image
+            from PIL import Image
             img = Image.open(file_path)
             
             # Convert from RGBA to RGB if needed
@@ -89,6 +97,7 @@ def convert_file_to_image(file_path):
         elif format_type == 'pdf':
             # Check if PDF has multiple pages
             try:
+                import pdf2image
                 pages = pdf2image.convert_from_path(file_path, poppler_path=POPPLER_PATH)
                 
                 if len(pages) > 1:
@@ -281,6 +290,38 @@ def get_crop_varieties(crop_name):
             "found": False
         }
 
+def crop_model_row(distt, state, ph, ec, oc, av_p, av_k, zinc, cu, iron, mn):
+    """One input row for the crop model, keyed by its training column names"""
+    return {
+        'Distt': distt,
+        'State': state,
+        'pH(1:2)': float(ph),
+        'EC': float(ec),
+        '%OC': float(oc),
+        'Av P(P2O5)': float(av_p),
+        'AvK(K2O)': float(av_k),
+        'Zinc': float(zinc),
+        'Cu': float(cu),
+        'Iron': float(iron),
+        'Mn': float(mn)
+    }
+
+def predict_crops(samples):
+    """
+    Predict crops for several soil samples with one model call
+    
+    Args:
+        samples: Sequence of tuples in predict_crop's argument order
+        
+    Returns:
+        list: Predicted crop name per sample
+    """
+    import joblib
+    import pandas as pd
+    model = joblib.load(MODEL_PATH)
+    input_data = pd.DataFrame([crop_model_row(*sample) for sample in samples])
+    return list(model.predict(input_data))
+
 def predict_crop(distt, state, ph, ec, oc, av_p, av_k, zinc, cu, iron, mn):
     """
     Predicts suitable crop using the LightGBM model
@@ -303,25 +344,15 @@ def predict_crop(distt, state, ph, ec, oc, av_p, av_k, zinc, cu, iron, mn):
     """
     try:
         # Load model pipeline
+        import joblib
+        import pandas as pd
         print("Loading model...")
         model = joblib.load(MODEL_PATH)
 
         print("Model loaded successfully")
         
         # Create input DataFrame with exact column names
-        input_data = pd.DataFrame([{
-            'Distt': distt,
-            'State': state,
-            'pH(1:2)': float(ph),
-            'EC': float(ec),
-            '%OC': float(oc),
-            'Av P(P2O5)': float(av_p),
-            'AvK(K2O)': float(av_k),
-            'Zinc': float(zinc),
-            'Cu': float(cu),
-            'Iron': float(iron),
-            'Mn': float(mn)
-        }])
+        input_data = pd.DataFrame([crop_model_row(distt, state, ph, ec, oc, av_p, av_k, zinc, cu, iron, mn)])
         
         print(input_data)
 
@@ -337,6 +368,7 @@ def predict_crop(distt, state, ph, ec, oc, av_p, av_k, zinc, cu, iron, mn):
 
 def extract_text_from_image(img):
     """Extract text from image using OCR"""
+    import cv2
     
     # Convert to grayscale if needed
     if len(img.shape) == 3:
@@ -348,7 +380,7 @@ def extract_text_from_image(img):
     thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)[1]
     
     # Apply OCR
-    return pytesseract.image_to_string(thresh)
+    return _pytesseract().image_to_string(thresh)
 
 def process_soil_report(report_path, district, state):
     """
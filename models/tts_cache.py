@@ -0,0 +1,233 @@
+"""
+Content-addressed cache for synthesized speech.
+
+Each answer is stored once as static/<TTS_CACHE_DIR>/<key>.mp3, where key is
+a hash of (text, TTS language code, voice), so repeating an answer costs a
+file lookup instead of a gTTS round trip. Files are written atomically and
+the directory can be shared by every worker (docker-compose mounts it as a
+volume). A file's mtime is its last use: hits touch it, and when the
+directory grows past TTS_CACHE_MAX_MB the least recently used files are
+removed until it is back under TTS_CACHE_LOW_WATER of the quota.
+
+Clients that can play Opus get <key>.ogg instead: the MP3 transcoded to mono
+Ogg Opus at TTS_OPUS_BITRATE the first time it is asked for, stored next to
+it and evicted the same way. If the transcode fails the MP3 is served.
+
+Concurrent requests for the same key share one synthesis through
+SingleFlight (across workers as well when SINGLE_FLIGHT_LOCK_DIR is set).
+"""
+import os
+import threading
+from .single_flight import SingleFlight, make_key
+from .audio_decode import encode_opus_file
+
+# Cache directory, relative to static/ so the files can be served directly
+TTS_CACHE_DIR = os.getenv('TTS_CACHE_DIR', os.path.join('storage', 'tts'))
+# Disk quota for cached speech in megabytes (0 disables eviction)
+TTS_CACHE_MAX_MB = float(os.getenv('TTS_CACHE_MAX_MB', '500'))
+# Fraction of the quota eviction brings the directory back down to
+TTS_CACHE_LOW_WATER = float(os.getenv('TTS_CACHE_LOW_WATER', '0.9'))
+# Bitrate of the Opus copies; gTTS MP3 is 32 kbps
+TTS_OPUS_BITRATE = os.getenv('TTS_OPUS_BITRATE', '10k')
+
+# Formats a cached answer can be served in, by file extension
+AUDIO_FORMATS = ('mp3', 'ogg')
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static')
+
+
+class TTSCache:
+    """
+    Disk cache of MP3 (and Opus) files keyed by hash(text, language, voice) with LRU eviction.
+
+    The size of the directory is tracked in memory and re-measured from disk
+    whenever it crosses the quota, so files written by other workers are
+    accounted for at eviction time.
+    """
+
+    def __init__(self, directory=TTS_CACHE_DIR, max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024),
+                 low_water=TTS_CACHE_LOW_WATER):
+        self.directory = directory
+        self.path = os.path.join(STATIC_DIR, directory)
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self._lock = threading.Lock()
+        self._size = None
+        self._flight = SingleFlight('tts')
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'evicted_bytes': 0,
+                      'transcodes': 0, 'transcode_failures': 0}
+
+    def key(self, text, lang_code, voice):
+        return make_key(text, lang_code, voice)
+
+    def url_path(self, key, audio_format='mp3'):
+        """Path of a cached file as served, e.g. static/storage/tts/<key>.mp3"""
+        return '/'.join(['static', self.directory.replace('\\', '/'), f"{key}.{audio_format}"])
+
+    def get_or_create(self, text, lang_code, voice, synthesize, audio_format='mp3'):
+        """
+        Return the static path of the speech for text, synthesizing it on a miss
+
+        Args:
+            text: Text to speak
+            lang_code: TTS language code
+            voice: Voice identifier, part of the key
+            synthesize: Called as synthesize(text, lang_code, file_path) on a miss
+            audio_format: 'mp3' or 'ogg' (Opus); the MP3 is served if the Opus copy cannot be made
+
+        Returns:
+            str: Path like static/storage/tts/<key>.mp3
+        """
+        key = self.key(text, lang_code, voice)
+        file_path = os.path.join(self.path, f"{key}.mp3")
+
+        if audio_format == 'ogg':
+            if self._touch(os.path.join(self.path, f"{key}.ogg")):
+                self._count('hits')
+                return self.url_path(key, 'ogg')
+            # The MP3 is made first, outside the Opus flight, so no worker waits for one lock while holding another
+            mp3_url = self.get_or_create(text, lang_code, voice, synthesize)
+            return self._flight.do(f"{key}.ogg", self._fill_opus, key, mp3_url)
+
+        if self._touch(file_path):
+            self._count('hits')
+            return self.url_path(key)
+
+        self._flight.do(key, self._fill, key, file_path, text, lang_code, synthesize)
+        return self.url_path(key)
+
+    def _fill_opus(self, key, mp3_url):
+        ogg_path = os.path.join(self.path, f"{key}.ogg")
+        if self._touch(ogg_path):
+            return self.url_path(key, 'ogg')
+
+        tmp_path = f"{ogg_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            encode_opus_file(os.path.join(self.path, f"{key}.mp3"), tmp_path, TTS_OPUS_BITRATE)
+            os.replace(tmp_path, ogg_path)
+        except Exception as e:
+            print(f"Opus transcode of {key} failed, serving MP3: {e}")
+            self._count('transcode_failures')
+            return mp3_url
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._count('transcodes')
+        self._added(os.path.getsize(ogg_path))
+        return self.url_path(key, 'ogg')
+
+    def _fill(self, key, file_path, text, lang_code, synthesize):
+        # Another worker may have written it while this one waited for the lock
+        if self._touch(file_path):
+            self._count('hits')
+            return file_path
+
+        self._count('misses')
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            synthesize(text, lang_code, tmp_path)
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._added(os.path.getsize(file_path))
+        return file_path
+
+    def _touch(self, file_path):
+        """Mark a cached file as just used; False if it is not cached"""
+        try:
+            os.utime(file_path)
+            return True
+        except OSError:
+            return False
+
+    def _count(self, stat, amount=1):
+        with self._lock:
+            self.stats[stat] += amount
+
+    def _added(self, size):
+        if not self.max_bytes:
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()[0]
+            else:
+                self._size += size
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _disk_usage(self):
+        """Total bytes and (mtime, size, path) of every cached file"""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.path) as it:
+                for entry in it:
+                    if not entry.name.endswith(tuple(f".{audio_format}" for audio_format in AUDIO_FORMATS)):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        except OSError:
+            pass
+        return total, entries
+
+    def _evict(self):
+        """Remove least recently used files until under the low-water mark (lock held)"""
+        total, entries = self._disk_usage()
+        target = self.max_bytes * self.low_water
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.stats['evictions'] += 1
+                self.stats['evicted_bytes'] += size
+            print(f"TTS cache evicted down to {total / (1024 * 1024):.1f} MB")
+        self._size = total
+
+    def metrics(self):
+        """Hit/miss counters for this process and the current size of the cache"""
+        with self._lock:
+            stats = dict(self.stats)
+            size = self._size
+        # Requests that waited on another request's synthesis of the same text
+        stats['coalesced'] = self._flight.stats['followers']
+        lookups = stats['hits'] + stats['misses'] + stats['coalesced']
+        stats['hit_ratio'] = round((stats['hits'] + stats['coalesced']) / lookups, 4) if lookups else 0.0
+        stats['size_bytes'] = size if size is not None else self._disk_usage()[0]
+        stats['max_bytes'] = self.max_bytes
+        stats['pid'] = os.getpid()
+        return stats
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        stats = self.metrics()
+        lines = [
+            '# TYPE tts_cache_hits_total counter',
+            f"tts_cache_hits_total {stats['hits']}",
+            '# TYPE tts_cache_misses_total counter',
+            f"tts_cache_misses_total {stats['misses']}",
+            '# TYPE tts_cache_coalesced_total counter',
+            f"tts_cache_coalesced_total {stats['coalesced']}",
+            '# TYPE tts_cache_evictions_total counter',
+            f"tts_cache_evictions_total {stats['evictions']}",
+            '# TYPE tts_cache_transcodes_total counter',
+            f"tts_cache_transcodes_total {stats['transcodes']}",
+            '# TYPE tts_cache_size_bytes gauge',
+            f"tts_cache_size_bytes {stats['size_bytes']}",
+        ]
+        return '\n'.join(lines) + '\n'
+
+
+tts_cache = TTSCache()
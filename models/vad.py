@@ -0,0 +1,219 @@
+"""
+Voice activity detection for voice uploads.
+
+Farmers often keep the mic button pressed long after they stop talking, and
+every second of silence is uploaded to the recognizer over a slow link. Before
+recognition the decoded PCM is split into 30 ms frames and each frame is
+classified as speech or not, either by its energy relative to the
+recording's noise floor (default, needs only numpy) or by WebRTC's VAD when
+the optional webrtcvad package is installed and VAD_MODE=webrtc.
+
+Speech regions are padded by VAD_PADDING_MS on both sides; leading and
+trailing silence is cut and internal pauses longer than VAD_MAX_PAUSE_MS are
+shortened to that length.
+"""
+import os
+import threading
+
+# Frame classifier: 'energy', 'webrtc' (needs webrtcvad) or 'off'
+VAD_MODE = os.getenv('VAD_MODE', 'energy').lower()
+# Speech frames must be this many times louder (RMS) than the noise floor
+VAD_ENERGY_RATIO = float(os.getenv('VAD_ENERGY_RATIO', '3.0'))
+# RMS (16-bit scale) below which a frame is always silence, about -50 dBFS
+VAD_MIN_RMS = float(os.getenv('VAD_MIN_RMS', '100'))
+# webrtcvad aggressiveness, 0 (keeps most) to 3 (drops most)
+VAD_AGGRESSIVENESS = int(os.getenv('VAD_AGGRESSIVENESS', '2'))
+# Audio kept on either side of detected speech
+VAD_PADDING_MS = int(os.getenv('VAD_PADDING_MS', '200'))
+# Longer internal pauses are shortened to this
+VAD_MAX_PAUSE_MS = int(os.getenv('VAD_MAX_PAUSE_MS', '500'))
+
+FRAME_MS = 30
+
+# webrtcvad is optional; without it VAD_MODE=webrtc falls back to the energy detector
+try:
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+
+
+def _energy_speech_frames(frames):
+    import numpy as np
+    rms = np.sqrt(np.mean(frames.astype(np.float32) ** 2, axis=1))
+    noise_floor, loud = np.percentile(rms, [10, 95])
+    # Capped at 20 dB below the loud frames, so a recording with no silence at all
+    # (where the "noise floor" is quiet speech) is kept whole rather than chopped
+    threshold = max(VAD_MIN_RMS, min(noise_floor * VAD_ENERGY_RATIO, loud * 0.1))
+    return rms > threshold
+
+
+def _webrtc_speech_frames(frames, sample_rate):
+    import numpy as np
+    vad = webrtcvad.Vad(VAD_AGGRESSIVENESS)
+    return np.array([vad.is_speech(frame.tobytes(), sample_rate) for frame in frames], dtype=bool)
+
+
+def speech_segments(samples, sample_rate, mode=None):
+    """
+    Find the stretches of speech in a recording
+
+    Args:
+        samples: int16 numpy array, mono
+        sample_rate: 8000, 16000, 32000 or 48000 for webrtc mode
+        mode: 'energy' or 'webrtc' (default VAD_MODE)
+
+    Returns:
+        list: (start, end) sample indices of padded speech regions, in order
+    """
+    mode = mode or VAD_MODE
+    frame_len = sample_rate * FRAME_MS // 1000
+    count = len(samples) // frame_len
+    if count == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    frames = samples[:count * frame_len].reshape(count, frame_len)
+    if mode == 'webrtc' and WEBRTCVAD_AVAILABLE:
+        speech = _webrtc_speech_frames(frames, sample_rate)
+    else:
+        speech = _energy_speech_frames(frames)
+
+    padding = sample_rate * VAD_PADDING_MS // 1000
+    segments = []
+    start = None
+    for index, is_speech in enumerate(speech):
+        if is_speech and start is None:
+            start = index
+        elif not is_speech and start is not None:
+            segments.append((start * frame_len, index * frame_len))
+            start = None
+    if start is not None:
+        segments.append((start * frame_len, len(samples)))
+
+    # Pad, then merge regions whose padding overlaps
+    merged = []
+    for seg_start, seg_end in segments:
+        seg_start = max(0, seg_start - padding)
+        seg_end = min(len(samples), seg_end + padding)
+        if merged and seg_start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], seg_end)
+        else:
+            merged.append((seg_start, seg_end))
+    return merged
+
+
+def split_at_pauses(samples, sample_rate, max_seconds):
+    """
+    Cut a recording into pieces no longer than max_seconds, in pauses where possible
+
+    Args:
+        samples: int16 numpy array, mono
+        sample_rate: Sample rate of samples
+        max_seconds: Longest piece
+
+    Returns:
+        list: (start, end) sample indices covering the whole recording, in order
+    """
+    max_len = int(max_seconds * sample_rate)
+    if max_len <= 0 or len(samples) <= max_len:
+        return [(0, len(samples))]
+
+    # Middle of every pause between speech regions; speech longer than
+    # max_seconds with no pause in it is cut where it hits the limit
+    regions = speech_segments(samples, sample_rate, mode='webrtc' if VAD_MODE == 'webrtc' else 'energy')
+    cuts = [(previous[1] + following[0]) // 2 for previous, following in zip(regions, regions[1:])]
+
+    pieces = []
+    start = 0
+    while len(samples) - start > max_len:
+        limit = start + max_len
+        candidates = [cut for cut in cuts if start < cut <= limit]
+        end = candidates[-1] if candidates else limit
+        pieces.append((start, end))
+        start = end
+    pieces.append((start, len(samples)))
+    return pieces
+
+
+class VadStats:
+    """Seconds of audio received and sent on to recognition by this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.recordings = 0
+        self.silent_recordings = 0
+        self.input_seconds = 0.0
+        self.output_seconds = 0.0
+
+    def observe(self, input_seconds, output_seconds):
+        with self._lock:
+            self.recordings += 1
+            if output_seconds == 0:
+                self.silent_recordings += 1
+            self.input_seconds += input_seconds
+            self.output_seconds += output_seconds
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'mode': VAD_MODE if VAD_MODE != 'webrtc' or WEBRTCVAD_AVAILABLE else 'energy',
+                'recordings': self.recordings,
+                'silent_recordings': self.silent_recordings,
+                'input_seconds': round(self.input_seconds, 2),
+                'output_seconds': round(self.output_seconds, 2),
+                'trimmed_ratio': round(1 - self.output_seconds / self.input_seconds, 4) if self.input_seconds else 0.0,
+            }
+
+    def render_prometheus(self):
+        """Metrics in the Prometheus text exposition format"""
+        with self._lock:
+            return '\n'.join([
+                '# TYPE vad_input_seconds_total counter',
+                f'vad_input_seconds_total {self.input_seconds:.3f}',
+                '# TYPE vad_output_seconds_total counter',
+                f'vad_output_seconds_total {self.output_seconds:.3f}',
+                '# TYPE vad_silent_recordings_total counter',
+                f'vad_silent_recordings_total {self.silent_recordings}',
+            ]) + '\n'
+
+
+vad_stats = VadStats()
+
+
+def trim_silence(samples, sample_rate, observe=True):
+    """
+    Cut leading/trailing silence and shorten long pauses
+
+    Args:
+        samples: int16 numpy array, mono
+        sample_rate: Sample rate of samples
+        observe: Count the call as one recording in vad_stats; False for pieces
+                 of a recording whose caller observes the whole
+
+    Returns:
+        tuple: (trimmed int16 samples, which may be empty if no speech was found,
+                fraction of the recording removed)
+    """
+    import numpy as np
+
+    if VAD_MODE == 'off' or len(samples) == 0:
+        return samples, 0.0
+
+    segments = speech_segments(samples, sample_rate)
+    max_pause = sample_rate * VAD_MAX_PAUSE_MS // 1000
+    pieces = []
+    for index, (start, end) in enumerate(segments):
+        if index and start - segments[index - 1][1] > 0:
+            # Keep up to VAD_MAX_PAUSE_MS of the gap so words do not run together
+            gap_start = segments[index - 1][1]
+            pieces.append(samples[gap_start:gap_start + min(start - gap_start, max_pause)])
+        pieces.append(samples[start:end])
+    trimmed = np.concatenate(pieces) if pieces else samples[:0]
+
+    input_seconds = len(samples) / sample_rate
+    output_seconds = len(trimmed) / sample_rate
+    if observe:
+        vad_stats.observe(input_seconds, output_seconds)
+    ratio = 1 - output_seconds / input_seconds
+    print(f"VAD kept {output_seconds:.1f}s of {input_seconds:.1f}s ({ratio:.0%} trimmed, {len(segments)} speech regions)")
+    return trimmed, ratio
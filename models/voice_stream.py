@@ -0,0 +1,178 @@
+"""
+Incremental recognition of a voice message while it is being recorded.
+
+chat.js streams the recording over a WebSocket (/ws/voice) as it is
+encoded: Ogg Opus pages, or WebM chunks from MediaRecorder. The bytes are
+piped into one ffmpeg process (audio_decode.open_stream_decoder) and the
+PCM it produces is end-pointed with the energy VAD: once the open segment
+is at least VOICE_STREAM_MIN_SEGMENT_SECONDS long and ends in
+VOICE_STREAM_ENDPOINT_MS of silence, it is cut in that pause and sent for
+recognition in the STT segment pool (local Whisper or Google, with the
+usual per-segment retries) while the farmer keeps talking. When recording
+stops only the last segment is left to recognize.
+"""
+import os
+import threading
+import traceback
+from .audio_decode import SAMPLE_RATE, STREAMABLE_FORMATS, AudioDecodeError, open_stream_decoder, sniff_stream_format
+from .vad import VAD_MODE, speech_segments, trim_silence, vad_stats
+
+# A pause this long after speech closes a segment
+VOICE_STREAM_ENDPOINT_MS = int(os.getenv('VOICE_STREAM_ENDPOINT_MS', '600'))
+# Segments are not cut shorter than this, so recognition gets some context
+VOICE_STREAM_MIN_SEGMENT_SECONDS = float(os.getenv('VOICE_STREAM_MIN_SEGMENT_SECONDS', '2'))
+# Longest recording accepted over one connection
+VOICE_STREAM_MAX_SECONDS = float(os.getenv('VOICE_STREAM_MAX_SECONDS', '180'))
+
+# Read size from the decoder; also how often end-pointing runs (about 0.25 s of PCM)
+READ_BYTES = SAMPLE_RATE // 2
+
+
+class StreamingRecognizer:
+    """
+    Decodes a recording as it arrives and recognizes it segment by segment.
+
+    feed() is called with each message from the client, finish() once the
+    recording has stopped; partial_text() is what has been recognized so far.
+    """
+
+    def __init__(self, language):
+        from .speech_handler import STT_LANGUAGE_CODES, STT_SEGMENT_MAX_SECONDS
+        self.lang_code = STT_LANGUAGE_CODES.get(language.lower(), language)
+        self.max_segment = int(STT_SEGMENT_MAX_SECONDS * SAMPLE_RATE)
+        self.audio_format = None
+        self.recording = bytearray()
+        self._decoder = None
+        self._reader = None
+        self._pcm = bytearray()
+        self._segment_start = 0
+        self._segments = []
+        self._trimmed_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def seconds(self):
+        return len(self._pcm) / (2 * SAMPLE_RATE)
+
+    def feed(self, data):
+        """Pass the next piece of the container to the decoder"""
+        if self._decoder is None:
+            self.audio_format = sniff_stream_format(bytes(data[:64]))
+            if self.audio_format not in STREAMABLE_FORMATS:
+                raise AudioDecodeError('unsupported_format', f"cannot stream {self.audio_format or 'unknown'} audio")
+            self._decoder = open_stream_decoder(self.audio_format)
+            self._reader = threading.Thread(target=self._read, name='voice-stream', daemon=True)
+            self._reader.start()
+        if self.seconds > VOICE_STREAM_MAX_SECONDS:
+            raise AudioDecodeError('decode_failed', f"recording is longer than {VOICE_STREAM_MAX_SECONDS:.0f}s")
+        self.recording += data
+        self._decoder.stdin.write(data)
+
+    def _read(self):
+        while True:
+            chunk = self._decoder.stdout.read(READ_BYTES)
+            if not chunk:
+                return
+            with self._lock:
+                self._pcm += chunk
+                self._endpoint()
+
+    def _endpoint(self):
+        """Cut the open segment at a pause (or at the length limit) and submit it (lock held)"""
+        import numpy as np
+        samples = np.frombuffer(bytes(self._pcm[self._segment_start * 2:]), dtype=np.int16)
+        if len(samples) < VOICE_STREAM_MIN_SEGMENT_SECONDS * SAMPLE_RATE:
+            return
+
+        endpoint = SAMPLE_RATE * VOICE_STREAM_ENDPOINT_MS // 1000
+        regions = speech_segments(samples, SAMPLE_RATE, mode='energy')
+        if regions and len(samples) - regions[-1][1] >= endpoint:
+            cut = regions[-1][1] + (len(samples) - regions[-1][1]) // 2
+        elif len(samples) >= self.max_segment:
+            # No pause yet: cut in the last one, or where the limit is reached
+            pauses = [(previous[1] + following[0]) // 2 for previous, following in zip(regions, regions[1:])]
+            cut = pauses[-1] if pauses else len(samples)
+        else:
+            return
+        self._submit(samples[:cut])
+        self._segment_start += cut
+
+    def _submit(self, samples):
+        from .speech_handler import get_stt_pool, recognize_segment
+        import speech_recognition as sr
+        # vad_stats counts the whole stream once, in finish()
+        trimmed, _ = trim_silence(samples, SAMPLE_RATE, observe=False)
+        self._trimmed_seconds += len(trimmed) / SAMPLE_RATE
+        index = len(self._segments)
+        if len(trimmed) == 0:
+            self._segments.append(None)
+            return
+        print(f"Streaming segment {index}: {len(samples) / SAMPLE_RATE:.1f}s")
+        audio = sr.AudioData(trimmed.tobytes(), SAMPLE_RATE, 2)
+        self._segments.append(get_stt_pool().submit(recognize_segment, audio, self.lang_code, index))
+
+    def partial_text(self):
+        """Transcript of the leading segments that are already recognized"""
+        texts = []
+        with self._lock:
+            segments = list(self._segments)
+        for future in segments:
+            if future is None:
+                continue
+            if not future.done() or future.exception():
+                break
+            if future.result():
+                texts.append(future.result())
+        return ' '.join(texts)
+
+    def finish(self):
+        """
+        Close the stream, recognize what is left and return the whole transcript
+
+        Returns:
+            str: Transcript in the format speech_to_text returns
+        """
+        if self._decoder is None:
+            return "❌ Could not understand the audio"
+        try:
+            self._decoder.stdin.close()
+        except OSError:
+            pass
+        self._reader.join()
+        self._decoder.wait()
+
+        import numpy as np
+        with self._lock:
+            tail = np.frombuffer(bytes(self._pcm[self._segment_start * 2:]), dtype=np.int16)
+            if len(tail):
+                self._submit(tail)
+            segments = list(self._segments)
+
+        if VAD_MODE != 'off' and self._pcm:
+            vad_stats.observe(self.seconds, self._trimmed_seconds)
+        if not self._pcm:
+            print("Streaming decode produced no audio")
+            error_msg = "Audio preprocessing failed" if self.lang_code.startswith("en") else "ऑडियो प्रीप्रोसेसिंग विफल हुई"
+            return f"[{error_msg}]"
+
+        import speech_recognition as sr
+        texts = []
+        try:
+            for future in segments:
+                if future is not None:
+                    texts.append(future.result())
+        except sr.RequestError as e:
+            return f"❌ Request Error: {e}"
+        except Exception:
+            print(f"Streaming recognition error: {traceback.format_exc()}")
+            error_msg = "Audio processing error" if self.lang_code.startswith("en") else "ऑडियो प्रोसेसिंग त्रुटि"
+            return f"[{error_msg}]"
+
+        text = ' '.join(text for text in texts if text)
+        print(f"Streamed {self.seconds:.1f}s of {self.audio_format} in {len(segments)} segments: {text}")
+        return text or "❌ Could not understand the audio"
+
+    def close(self):
+        """Stop the decoder if the connection went away before finish()"""
+        if self._decoder is not None and self._decoder.poll() is None:
+            self._decoder.kill()
@@ -0,0 +1,53 @@
+"""
+Explicit warmup for the libraries the models import lazily.
+
+speech_handler and soil_report import torch, librosa, pandas, OpenCV and
+friends on first use so a web worker boots in well under a second, and the
+local Whisper model (LOCAL_STT_BACKEND) loads on the first voice note. A worker
+that would rather pay that cost up front than on its first voice or soil
+request lists the subsystems in WARMUP_MODULES (gunicorn runs this from
+post_worker_init; job_worker.py always warms everything).
+"""
+import os
+import time
+import importlib
+
+# Subsystems to load when a worker starts: comma separated names from WARMUP_TARGETS, or 'all'
+WARMUP_MODULES = [
+    name.strip().lower() for name in os.getenv('WARMUP_MODULES', '').split(',') if name.strip()
+]
+
+WARMUP_TARGETS = {
+    'speech': 'models.speech_handler',
+    'soil': 'models.soil_report',
+    'stt': 'models.local_stt',
+}
+
+def warm_up(names=None):
+    """
+    Import the heavy dependencies of the named subsystems
+
+    Args:
+        names: Subsystem names (default WARMUP_MODULES); 'all' selects every target
+
+    Returns:
+        dict: Seconds spent per subsystem that warmed up successfully
+    """
+    names = WARMUP_MODULES if names is None else names
+    if 'all' in names:
+        names = list(WARMUP_TARGETS)
+
+    timings = {}
+    for name in names:
+        if name not in WARMUP_TARGETS:
+            print(f"Unknown warmup module '{name}', expected one of {', '.join(WARMUP_TARGETS)}")
+            continue
+        start = time.time()
+        try:
+            importlib.import_module(WARMUP_TARGETS[name]).warm_up()
+        except ImportError as e:
+            print(f"Could not warm up {name}: {e}")
+            continue
+        timings[name] = time.time() - start
+        print(f"Warmed up {name} in {timings[name]:.2f}s")
+    return timings
@@ -464,6 +464,10 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    // Spoken answers are fetched as Ogg Opus (several times smaller than MP3)
+    // when this browser can play it
+    const SPOKEN_AUDIO_FORMAT = audioPlayer.canPlayType('audio/ogg; codecs="opus"') ? 'ogg' : 'mp3';
+
     // Play audio
     function playAudio(url) {
         console.log("Playing audio", url)
@@ -473,10 +477,50 @@ document.addEventListener('DOMContentLoaded', function () {
         audioPlayer.play();
     }
 
+    // Spoken voice answers arrive as a playlist of sentence chunks that grows
+    // while the server is still synthesizing; play them back to back, starting
+    // as soon as the first one is ready
+    let audioQueue = [];
+    let playlistQueued = 0;
+
+    function resetPlaylist() {
+        audioQueue = [];
+        playlistQueued = 0;
+    }
+
+    function queuePlaylist(playlist) {
+        if (!playlist || playlist.length <= playlistQueued) return;
+        const idle = audioQueue.length === 0 && (audioPlayer.paused || audioPlayer.ended);
+        audioQueue.push(...playlist.slice(playlistQueued));
+        playlistQueued = playlist.length;
+        if (idle) playNextInQueue();
+    }
+
+    function playNextInQueue() {
+        const url = audioQueue.shift();
+        if (url) playAudio(url);
+    }
+
+    audioPlayer.addEventListener('ended', playNextInQueue);
+
 
     // Voice recording logic
-    let mediaRecorder;
-    let audioChunks = [];
+    // Where supported, the microphone is resampled to 16 kHz mono in an
+    // AudioWorklet (static/js/pcm16k-worklet.js) and encoded as low-bitrate
+    // Opus with WebCodecs, then wrapped in Ogg: a few kB per second instead
+    // of a full-rate WebM. Other browsers fall back to MediaRecorder at a
+    // reduced bitrate. Either way the recording is streamed to /ws/voice
+    // while the farmer speaks, so the server recognizes it pause by pause and
+    // has the transcript moments after recording stops; the finished file is
+    // uploaded instead when streaming is not available.
+    const CAPTURE_SAMPLE_RATE = 16000;
+    const OPUS_BITRATE = 16000;
+    const OPUS_CONFIG = { codec: 'opus', sampleRate: CAPTURE_SAMPLE_RATE, numberOfChannels: 1, bitrate: OPUS_BITRATE };
+    // Packets per Ogg page (WebCodecs Opus packets are 20 ms) and MediaRecorder
+    // chunk length: how often a piece of the recording is streamed
+    const OGG_PACKETS_PER_PAGE = 25;
+    const STREAM_CHUNK_MS = 500;
+    let recorder = null;
     let isRecording = false;
 
     // If readAloud is changed, play the audio
@@ -485,23 +529,279 @@ document.addEventListener('DOMContentLoaded', function () {
     //     playAudio("static/storage/tts_1745416644.mp3")
     // });
 
-    // Start recording
-    function startRecording() {
-        navigator.mediaDevices.getUserMedia({ audio: true })
-            .then(stream => {
-                mediaRecorder = new MediaRecorder(stream);
+    const OGG_CRC_TABLE = (() => {
+        const table = new Uint32Array(256);
+        for (let i = 0; i < 256; i++) {
+            let r = i << 24;
+            for (let j = 0; j < 8; j++) {
+                r = (r & 0x80000000) ? ((r << 1) ^ 0x04c11db7) : (r << 1);
+            }
+            table[i] = r >>> 0;
+        }
+        return table;
+    })();
+
+    // One Ogg page holding whole packets; flags 2 = first page, 4 = last page
+    function oggPage(packets, granule, serial, sequence, flags) {
+        const lacing = [];
+        for (const packet of packets) {
+            let size = packet.length;
+            while (size >= 255) {
+                lacing.push(255);
+                size -= 255;
+            }
+            lacing.push(size);
+        }
+        const bodyLength = packets.reduce((total, packet) => total + packet.length, 0);
+        const page = new Uint8Array(27 + lacing.length + bodyLength);
+        const view = new DataView(page.buffer);
+        page.set([0x4f, 0x67, 0x67, 0x53]);  // "OggS"
+        page[5] = flags;
+        view.setUint32(6, granule % 0x100000000, true);
+        view.setUint32(10, Math.floor(granule / 0x100000000), true);
+        view.setUint32(14, serial, true);
+        view.setUint32(18, sequence, true);
+        page[26] = lacing.length;
+        page.set(lacing, 27);
+        let offset = 27 + lacing.length;
+        for (const packet of packets) {
+            page.set(packet, offset);
+            offset += packet.length;
+        }
+        let crc = 0;
+        for (let i = 0; i < page.length; i++) {
+            crc = ((crc << 8) ^ OGG_CRC_TABLE[((crc >>> 24) ^ page[i]) & 0xff]) >>> 0;
+        }
+        view.setUint32(22, crc, true);
+        return page;
+    }
 
-                mediaRecorder.ondataavailable = (event) => {
-                    audioChunks.push(event.data);
-                };
+    // Ogg Opus (RFC 7845) written page by page as packets arrive; onPage gets
+    // each page in order and finish() writes the last one and returns the file
+    function createOggOpusWriter(inputSampleRate, onPage) {
+        const serial = Math.floor(Math.random() * 0xffffffff);
+        const pages = [];
+        let group = [];
+        // Granule positions count 48 kHz samples
+        let granule = 0;
+
+        const emit = (packets, flags) => {
+            const page = oggPage(packets, granule, serial, pages.length, flags);
+            pages.push(page);
+            if (onPage) onPage(page);
+        };
+
+        const writeHeaders = () => {
+            const head = new Uint8Array(19);
+            const headView = new DataView(head.buffer);
+            head.set(new TextEncoder().encode('OpusHead'));
+            head[8] = 1;  // version
+            head[9] = 1;  // channels
+            headView.setUint16(10, 312, true);  // pre-skip at 48 kHz, the encoder's usual lookahead
+            headView.setUint32(12, inputSampleRate, true);
+            const vendor = new TextEncoder().encode('webcodecs');
+            const tags = new Uint8Array(8 + 4 + vendor.length + 4);
+            tags.set(new TextEncoder().encode('OpusTags'));
+            new DataView(tags.buffer).setUint32(8, vendor.length, true);
+            tags.set(vendor, 12);
+            emit([head], 2);
+            emit([tags], 0);
+        };
+
+        return {
+            addPacket(packet) {
+                if (pages.length === 0) writeHeaders();
+                group.push(packet.data);
+                granule += Math.round(packet.duration * 48000 / 1e6);
+                if (group.length === OGG_PACKETS_PER_PAGE) {
+                    emit(group, 0);
+                    group = [];
+                }
+            },
+            finish() {
+                if (pages.length === 0) writeHeaders();
+                emit(group, 4);
+                group = [];
+                return new Blob(pages, { type: 'audio/ogg' });
+            }
+        };
+    }
 
-                mediaRecorder.onstop = () => {
-                    const audioBlob = new Blob(audioChunks, { type: 'audio/webm' });
-                    sendAudioToServer(audioBlob);
-                };
+    async function opusCaptureSupported() {
+        if (typeof AudioWorkletNode === 'undefined' || typeof AudioEncoder === 'undefined') {
+            return false;
+        }
+        try {
+            return (await AudioEncoder.isConfigSupported(OPUS_CONFIG)).supported;
+        } catch (error) {
+            return false;
+        }
+    }
+
+    // Microphone -> 16 kHz worklet -> WebCodecs Opus; Ogg pages go to onData as
+    // they fill and stop() resolves with the whole Ogg Opus Blob
+    async function startOpusCapture(stream, onData) {
+        const context = new AudioContext();
+        await context.audioWorklet.addModule('/static/js/pcm16k-worklet.js');
+        const source = context.createMediaStreamSource(stream);
+        const resampler = new AudioWorkletNode(context, 'pcm16k-processor', {
+            numberOfOutputs: 0,
+            processorOptions: { targetRate: CAPTURE_SAMPLE_RATE }
+        });
+
+        const writer = createOggOpusWriter(CAPTURE_SAMPLE_RATE, onData);
+        const encoder = new AudioEncoder({
+            output: chunk => {
+                const data = new Uint8Array(chunk.byteLength);
+                chunk.copyTo(data);
+                writer.addPacket({ data, duration: chunk.duration });
+            },
+            error: error => console.error('Opus encoder error:', error)
+        });
+        encoder.configure(OPUS_CONFIG);
+
+        let timestamp = 0;
+        resampler.port.onmessage = (event) => {
+            const samples = event.data;
+            encoder.encode(new AudioData({
+                format: 'f32',
+                sampleRate: CAPTURE_SAMPLE_RATE,
+                numberOfFrames: samples.length,
+                numberOfChannels: 1,
+                timestamp,
+                data: samples
+            }));
+            timestamp += samples.length * 1e6 / CAPTURE_SAMPLE_RATE;
+        };
+        source.connect(resampler);
+
+        return {
+            stream,
+            stop: async () => {
+                source.disconnect();
+                resampler.port.onmessage = null;
+                await encoder.flush();
+                encoder.close();
+                await context.close();
+                return writer.finish();
+            }
+        };
+    }
+
+    // MediaRecorder at a low Opus bitrate where the browser allows it, handing
+    // onData a chunk every STREAM_CHUNK_MS
+    function startMediaRecorderCapture(stream, onData) {
+        const mimeType = ['audio/webm;codecs=opus', 'audio/ogg;codecs=opus']
+            .find(type => window.MediaRecorder && MediaRecorder.isTypeSupported(type));
+        const mediaRecorder = new MediaRecorder(stream, mimeType ? { mimeType, audioBitsPerSecond: OPUS_BITRATE } : {});
+        const audioChunks = [];
+        mediaRecorder.ondataavailable = (event) => {
+            audioChunks.push(event.data);
+            if (onData && event.data.size) onData(event.data);
+        };
+        mediaRecorder.start(onData ? STREAM_CHUNK_MS : undefined);
+
+        return {
+            stream,
+            stop: () => new Promise(resolve => {
+                mediaRecorder.onstop = () => resolve(new Blob(audioChunks, { type: mediaRecorder.mimeType || 'audio/webm' }));
+                mediaRecorder.stop();
+            })
+        };
+    }
 
-                audioChunks = [];
-                mediaRecorder.start();
+    // WebSocket to /ws/voice for one recording, if the server serves it
+    // (the page sets data-voice-streaming only under gevent workers or
+    // VOICE_STREAMING=true). send() forwards pieces of the recording (queued
+    // until the socket opens), onPartial gets the text recognized so far, and
+    // finish(onStage) resolves with the same body /api/process_voice returns,
+    // polling the voice job the server queued with the transcript. It rejects
+    // if the socket closes first; the error's transcribed flag says whether
+    // the server had already started answering, in which case uploading the
+    // recording again would repeat it.
+    let voiceStreamingAvailable = recordButton.dataset.voiceStreaming === 'true' && 'WebSocket' in window;
+
+    function openVoiceStream(onPartial) {
+        if (!voiceStreamingAvailable) return null;
+
+        const params = new URLSearchParams({
+            language: languageSelector.value,
+            chat_id: getCurrentChatId(),
+            audio_format: SPOKEN_AUDIO_FORMAT
+        });
+        const socket = new WebSocket(`${location.protocol === 'https:' ? 'wss' : 'ws'}://${location.host}/ws/voice?${params}`);
+        const queued = [];
+        let opened = false;
+        let transcribed = false;
+        let onStage = null;
+        let settle = null;
+        const result = new Promise((resolve, reject) => { settle = { resolve, reject }; });
+
+        socket.onopen = () => {
+            opened = true;
+            queued.splice(0).forEach(data => socket.send(data));
+        };
+        socket.onmessage = (event) => {
+            const message = JSON.parse(event.data);
+            if (message.type === 'partial') {
+                onPartial(message.text);
+            } else if (message.type === 'transcript') {
+                transcribed = true;
+                if (onStage) onStage('transcribed', { transcribed_text: message.text });
+            } else if (message.type === 'result' && message.status === 202) {
+                settle.resolve(waitForJob(message.body.status_url, onStage).then(response => response.json()));
+            } else if (message.type === 'result') {
+                settle.resolve(message.body);
+            }
+        };
+        socket.onclose = () => {
+            if (!opened) {
+                // The server does not serve /ws/voice; upload recordings from now on
+                voiceStreamingAvailable = false;
+            }
+            const error = new Error('Voice stream closed before the answer');
+            error.transcribed = transcribed;
+            settle.reject(error);
+        };
+
+        const send = (data) => {
+            if (opened) {
+                socket.send(data);
+            } else {
+                queued.push(data);
+            }
+        };
+
+        return {
+            send,
+            finish(stageCallback) {
+                onStage = stageCallback;
+                send(JSON.stringify({ type: 'stop' }));
+                return result;
+            }
+        };
+    }
+
+    // Start recording
+    function startRecording() {
+        navigator.mediaDevices.getUserMedia({ audio: { channelCount: 1, echoCancellation: true, noiseSuppression: true } })
+            .then(async stream => {
+                // Show what has been recognized so far while still recording
+                const voiceStream = openVoiceStream(text => {
+                    if (isRecording && text) recordStatus.textContent = text;
+                });
+                const onData = voiceStream ? data => voiceStream.send(data) : null;
+                if (await opusCaptureSupported()) {
+                    try {
+                        recorder = await startOpusCapture(stream, onData);
+                    } catch (error) {
+                        console.warn('Opus capture unavailable, using MediaRecorder:', error);
+                        recorder = startMediaRecorderCapture(stream, onData);
+                    }
+                } else {
+                    recorder = startMediaRecorderCapture(stream, onData);
+                }
+                recorder.voiceStream = voiceStream;
                 isRecording = true;
 
                 // Update UI
@@ -529,9 +829,20 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Stop recording
     function stopRecording() {
-        if (mediaRecorder && isRecording) {
-            mediaRecorder.stop();
+        if (recorder && isRecording) {
+            const current = recorder;
+            recorder = null;
             isRecording = false;
+            current.stop()
+                .then(audioBlob => current.voiceStream ? finishVoiceStream(current.voiceStream, audioBlob) : sendAudioToServer(audioBlob))
+                .catch(error => {
+                    console.error('Error finishing recording:', error);
+                    recordStatus.textContent = "Error processing audio";
+                })
+                .finally(() => {
+                    // Stop all tracks
+                    current.stream.getTracks().forEach(track => track.stop());
+                });
 
             // Update UI
             recordButton.classList.remove('bg-red-600', 'hover:bg-red-700');
@@ -544,9 +855,6 @@ document.addEventListener('DOMContentLoaded', function () {
             const ripple = recordButton.querySelector('.voice-ripple');
             if (ripple) ripple.remove();
 
-            // Stop all tracks
-            mediaRecorder.stream.getTracks().forEach(track => track.stop());
-
             // Set character back to idle while processing
             if (farmerCharacter) {
                 farmerCharacter.setState(farmerCharacter.states.IDLE);
@@ -563,56 +871,127 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    // Shows a voice answer as it arrives: the transcript, the text answer,
+    // then the spoken chunks. showStage takes job stages, showResult the
+    // final body and showError a failed request.
+    function createVoiceAnswerView() {
+        let transcriptShown = false;
+        let responseShown = false;
+
+        const showStage = (stage, partial) => {
+            if (partial.transcribed_text && !transcriptShown) {
+                transcriptShown = true;
+                hideTypingIndicator();
+                addMessage(partial.transcribed_text, true);
+                showTypingIndicator();
+            }
+            if (partial.response && !responseShown) {
+                responseShown = true;
+                hideTypingIndicator();
+                addMessage(partial.response);
+                recordStatus.textContent = "Preparing audio...";
+            }
+            if (partial.audio_playlist) {
+                queuePlaylist(partial.audio_playlist);
+            }
+        };
+
+        const showResult = (data) => {
+            console.log("API response", data)
+            hideTypingIndicator();
+
+            // Add transcribed text as user message
+            if (data.transcribed_text && !transcriptShown) {
+                addMessage(data.transcribed_text, true);
+            }
+
+            // Add bot response
+            if (data.response && !responseShown) {
+                addMessage(data.response);
+            } else if (data.error && !data.response) {
+                addMessage(data.error);
+            }
+
+            // Play audio response (the rest of the playlist, if playback already started)
+            if (data.audio_playlist) {
+                queuePlaylist(data.audio_playlist);
+            } else if (data.audio_url) {
+                console.log(data.audio_url)
+                playAudio(data.audio_url);
+            } else if (data.audio_pending && data.audio_status_url) {
+                // The speech is still being synthesized; play chunks as they arrive
+                waitForJob(data.audio_status_url, showStage)
+                    .then(speech => speech.json())
+                    .then(speech => {
+                        if (speech.audio_playlist) {
+                            queuePlaylist(speech.audio_playlist);
+                        }
+                    })
+                    .catch(error => console.error('Error fetching spoken answer:', error));
+            }
+
+            recordStatus.textContent = "Press to start recording";
+
+            // Reload chat history
+            loadChatHistory();
+        };
+
+        const showError = (error) => {
+            console.error('Error:', error);
+            hideTypingIndicator();
+            recordStatus.textContent = "Error processing audio";
+            addMessage("Sorry, there was an error processing your voice. Please try again.");
+
+            // Set character back to idle on error
+            if (farmerCharacter) {
+                farmerCharacter.setState(farmerCharacter.states.IDLE);
+            }
+        };
+
+        return { showStage, showResult, showError };
+    }
+
     // Send audio to server
     function sendAudioToServer(audioBlob) {
         const formData = new FormData();
-        formData.append('audio', audioBlob);
+        formData.append('audio', audioBlob, audioBlob.type.startsWith('audio/ogg') ? 'voice.ogg' : 'voice.webm');
         formData.append('language', languageSelector.value);
         formData.append('chat_id', getCurrentChatId());
+        formData.append('audio_format', SPOKEN_AUDIO_FORMAT);
+        formData.append('async', 'true');
 
         // Show typing indicator
         showTypingIndicator();
+        resetPlaylist();
 
-        fetch('/api/process_voice', {
+        // Show the transcript and the answer as soon as they are ready, before the speech
+        const view = createVoiceAnswerView();
+        fetchWithJob('/api/process_voice', {
             method: 'POST',
             body: formData
-        })
+        }, view.showStage)
             .then(response => response.json())
-            .then(data => {
-                console.log("API response", data)
-                hideTypingIndicator();
-
-                // Add transcribed text as user message
-                if (data.transcribed_text) {
-                    addMessage(data.transcribed_text, true);
-                }
-
-                // Add bot response
-                if (data.response) {
-                    addMessage(data.response);
-                }
-
-                // Play audio response
-                if (data.audio_url) {
-                    console.log(data.audio_url)
-                    playAudio(data.audio_url);
-                }
+            .then(view.showResult)
+            .catch(view.showError);
+    }
 
-                recordStatus.textContent = "Press to start recording";
+    // End a streamed recording and show its answer; if the stream broke
+    // before the server started answering, upload the recording instead
+    function finishVoiceStream(voiceStream, audioBlob) {
+        showTypingIndicator();
+        resetPlaylist();
 
-                // Reload chat history
-                loadChatHistory();
-            })
+        const view = createVoiceAnswerView();
+        return voiceStream.finish(view.showStage)
+            .then(view.showResult)
             .catch(error => {
-                console.error('Error:', error);
-                hideTypingIndicator();
-                recordStatus.textContent = "Error processing audio";
-                addMessage("Sorry, there was an error processing your voice. Please try again.");
-
-                // Set character back to idle on error
-                if (farmerCharacter) {
-                    farmerCharacter.setState(farmerCharacter.states.IDLE);
+                if (error.transcribed) {
+                    view.showError(error);
+                    return;
                 }
+                console.warn('Voice streaming failed, uploading the recording:', error);
+                hideTypingIndicator();
+                sendAudioToServer(audioBlob);
             });
     }
 
@@ -639,9 +1018,11 @@ document.addEventListener('DOMContentLoaded', function () {
         formData.append('image', imageFile);
         formData.append('language', languageSelector.value);
         formData.append('need_audio', readAloud.checked);
+        formData.append('audio_format', SPOKEN_AUDIO_FORMAT);
         formData.append('chat_id', getCurrentChatId());
+        formData.append('async', 'true');
 
-        fetch('/api/process_image', {
+        fetchWithJob('/api/process_image', {
             method: 'POST',
             body: formData
         })
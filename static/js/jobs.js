@@ -0,0 +1,53 @@
+// Background jobs for the voice, image and soil report endpoints.
+// Requests sent with async=true get a 202 with a job id instead of waiting
+// for the whole chain of upstream calls; fetchWithJob polls the job and
+// resolves with a Response holding the final body, so callers can treat it
+// like a normal fetch. onStage(stage, partial) is called as each stage
+// (e.g. the voice transcript) becomes available. waitForJob polls a job the
+// server started on its own, such as the speech for a voice answer that was
+// returned as text first (audio_status_url).
+const JOB_POLL_MIN_MS = 500;
+const JOB_POLL_MAX_MS = 3000;
+const JOB_WAIT_LIMIT_MS = 10 * 60 * 1000;
+
+async function fetchWithJob(url, options, onStage) {
+    const response = await fetch(url, options);
+    if (response.status !== 202) {
+        return response;
+    }
+
+    const job = await response.json();
+    return waitForJob(job.status_url, onStage);
+}
+
+async function waitForJob(statusUrl, onStage) {
+    const deadline = Date.now() + JOB_WAIT_LIMIT_MS;
+    let delay = JOB_POLL_MIN_MS;
+    let lastStage = null;
+
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, delay));
+
+        const statusResponse = await fetch(statusUrl);
+        if (!statusResponse.ok) {
+            throw new Error(`Job status error: ${statusResponse.status}`);
+        }
+        const status = await statusResponse.json();
+
+        if (onStage && status.stage && status.stage !== lastStage) {
+            lastStage = status.stage;
+            onStage(status.stage, status.partial || {});
+        }
+
+        if (status.status === 'done' || status.status === 'failed') {
+            return new Response(JSON.stringify(status.result || {}), {
+                status: status.status_code || 500,
+                headers: { 'Content-Type': 'application/json' }
+            });
+        }
+
+        delay = Math.min(delay * 1.5, JOB_POLL_MAX_MS);
+    }
+
+    throw new Error('Timed out waiting for the server to finish processing');
+}
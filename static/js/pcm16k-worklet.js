@@ -0,0 +1,61 @@
+// AudioWorklet that turns microphone input into 16 kHz mono for upload.
+// Channels are averaged, then every output sample is the mean of the input
+// samples it covers (a box filter, enough to keep speech from aliasing when
+// decimating 44.1/48 kHz to 16 kHz). Output is posted to the main thread in
+// Float32Array chunks of CHUNK_MS.
+const CHUNK_MS = 20;
+
+class Pcm16kProcessor extends AudioWorkletProcessor {
+    constructor(options) {
+        super();
+        const processorOptions = (options && options.processorOptions) || {};
+        this.targetRate = processorOptions.targetRate || 16000;
+        // Input samples per output sample; sampleRate is the context's rate
+        this.step = sampleRate / this.targetRate;
+        this.pending = new Float32Array(0);
+        this.position = 0;
+        this.chunk = new Float32Array(Math.round(this.targetRate * CHUNK_MS / 1000));
+        this.filled = 0;
+    }
+
+    process(inputs) {
+        const input = inputs[0];
+        if (!input || input.length === 0) {
+            return true;
+        }
+
+        const frames = input[0].length;
+        const buffer = new Float32Array(this.pending.length + frames);
+        buffer.set(this.pending);
+        for (const channel of input) {
+            for (let i = 0; i < frames; i++) {
+                buffer[this.pending.length + i] += channel[i] / input.length;
+            }
+        }
+
+        let position = this.position;
+        while (position + this.step <= buffer.length) {
+            const start = Math.floor(position);
+            const end = Math.max(start + 1, Math.floor(position + this.step));
+            let sum = 0;
+            for (let i = start; i < end; i++) {
+                sum += buffer[i];
+            }
+            this.chunk[this.filled++] = sum / (end - start);
+            if (this.filled === this.chunk.length) {
+                const length = this.chunk.length;
+                this.port.postMessage(this.chunk, [this.chunk.buffer]);
+                this.chunk = new Float32Array(length);
+                this.filled = 0;
+            }
+            position += this.step;
+        }
+
+        const consumed = Math.floor(position);
+        this.pending = buffer.slice(consumed);
+        this.position = position - consumed;
+        return true;
+    }
+}
+
+registerProcessor('pcm16k-processor', Pcm16kProcessor);
@@ -496,12 +496,13 @@ document.addEventListener('DOMContentLoaded', function() {
         formData.append('district', district);
         formData.append('state', state);
         formData.append('language', currentLanguage);
+        formData.append('async', 'true');
         console.log("Form data prepared with language:", currentLanguage);
         
         // Process with API call
         try {
             console.log("Sending API request to analyze soil report");
-            const response = await fetch('/api/analyze_soil_report', {
+            const response = await fetchWithJob('/api/analyze_soil_report', {
                 method: 'POST',
                 body: formData
             });